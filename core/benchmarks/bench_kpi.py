@@ -0,0 +1,93 @@
+"""
+Benchmark of the batch KPI engine against the per product KPI functions, with a stored baseline.
+
+The batch engine runs over the whole generated catalogue; the scalar loop runs
+over a sample of it and is extrapolated to the same size. The speedup of the
+batch engine over the scalar loop does not depend on the machine, so a baseline
+recorded on one machine can gate runs on another:
+
+    cd core && python -m benchmarks.bench_kpi [-n 1000000] [--sample 50000] [--tolerance 0.2]
+    cd core && python -m benchmarks.bench_kpi --save-baseline
+
+The run exits with status 1 when the speedup is lower than its baseline, for the
+same number of rows, by more than the tolerance.
+"""
+import argparse
+import json
+import pathlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from sellgo_core.utils.kpi import calculate_kpis_batch, calculate_product_kpis
+
+BASELINE = pathlib.Path(__file__).parent / 'baseline.json'
+
+
+def make_catalogue(rows, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def maybe_missing(values, missing):
+        return np.where(rng.random(rows) < missing, np.nan, values)
+
+    return pd.DataFrame({
+        'price': maybe_missing(np.round(rng.uniform(1, 200, rows), 2), 0.05),
+        'fees': np.round(rng.uniform(0, 50, rows), 2),
+        'product_cost': maybe_missing(np.round(rng.uniform(0, 150, rows), 2), 0.4),
+        'daily_est_sales': np.round(rng.uniform(0, 100, rows), 3),
+        'monthly_est_sales': np.round(rng.uniform(0, 3000, rows), 3),
+        'rank': rng.integers(1, 1_000_000, rows),
+        'package_quantity': rng.choice([1, 2, 6], rows),
+        'number_of_items': rng.choice([1, 3], rows),
+        'inbound_shipping': maybe_missing(np.round(rng.uniform(0, 3, rows), 2), 0.7),
+        'vat_perc': maybe_missing(np.round(rng.uniform(0, 25, rows)), 0.6),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--rows', type=int, default=1_000_000)
+    parser.add_argument('--sample', type=int, default=50_000, help='rows timed with the scalar functions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed speedup loss, 0.2 for 20%%')
+    parser.add_argument('--baseline', type=pathlib.Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='record this run as the new baseline')
+    args = parser.parse_args()
+
+    catalogue = make_catalogue(args.rows)
+
+    start = time.perf_counter()
+    calculate_kpis_batch(catalogue)
+    batch = time.perf_counter() - start
+
+    sample = catalogue.head(args.sample).astype(object).where(catalogue.head(args.sample).notna(), None)
+    records = sample.to_dict(orient='records')
+    start = time.perf_counter()
+    for params in records:
+        calculate_product_kpis(params)
+    scalar = (time.perf_counter() - start) * args.rows / len(records)
+
+    print(f'rows:   {args.rows}')
+    print(f'scalar: {scalar:.2f}s (extrapolated from {len(records)} rows)')
+    print(f'batch:  {batch:.2f}s')
+    print(f'speedup: {scalar / batch:.1f}x')
+
+    name = f'calculate_kpis_batch[{args.rows}]'
+    result = {'speedup': round(scalar / batch, 2), 'batch_sec': round(batch, 3)}
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    reference = baseline.get('cases', {}).get(name)
+    if args.save_baseline:
+        baseline.setdefault('cases', {})[name] = result
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print(f'baseline saved to {args.baseline}')
+    elif reference:
+        ratio = result['speedup'] / reference['speedup']
+        print(f'vs baseline: {ratio - 1:+.1%}')
+        if ratio < 1 - args.tolerance:
+            print(f'regressed by more than {args.tolerance:.0%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,16 @@
 #!/usr/bin/env python
 
+import asyncio
 import datetime
 import logging
 import time
 
+import aiohttp
+
 from sellgo_core.utils.formatter import formatted_date
-from sellgo_core.webcrawl.cloud import AWS
+from sellgo_core.webcrawl.cloud import AWS, BackgroundUploader
 from sellgo_core.webcrawl.proxies import ProxyCrawl
-from sellgo_core.webcrawl.scrapers import AmazonScraper
+from sellgo_core.webcrawl.scrapers import AmazonScraper, AsyncAmazonScraper
 from sellgo_core.webcrawl.scrapers import InvalidASINError, BadStatusCodeError, EmptyDocumentError
 
 
@@ -27,8 +30,10 @@ class AmazonWebCrawl:
     logger = None
     scraper = None
     upload_to_s3 = False
+    upload_workers = 0
     aws = None
     aws_storage_bucket_name = 'some_default_bucket_name'
+    crawl_timings = None
 
     def __init__(self, **kwargs):
         self.init_logger(logger=kwargs.get('logger', None))
@@ -38,6 +43,8 @@ class AmazonWebCrawl:
         )
         self.init_scraper()
         self.upload_to_s3 = kwargs.get('upload_to_s3', False)
+        # with upload workers, `crawl` uploads in the background while it scrapes the next products
+        self.upload_workers = kwargs.get('upload_workers', 0)
         self.aws_storage_bucket_name = kwargs.get('aws_storage_bucket_name', 'some_default_bucket_name')
 
     def init_logger(self, logger=None):
@@ -74,7 +81,7 @@ class AmazonWebCrawl:
     def scrape(self, asin):
         item = None
         try:
-            item = self.scraper.scrape(asin)
+            item = self.scraper.scrape(asin, raw_html=bool(self.upload_to_s3))
         except InvalidASINError:
             self.logger.error('[ERROR] ASIN# %s - Invalid - SKIP' % asin)
         except BadStatusCodeError as ex:
@@ -84,6 +91,19 @@ class AmazonWebCrawl:
         finally:
             return item
 
+    async def scrape_async(self, scraper, asin):
+        try:
+            return await scraper.scrape(asin, raw_html=bool(self.upload_to_s3))
+        except InvalidASINError:
+            self.logger.error('[ERROR] ASIN# %s - Invalid - SKIP' % asin)
+        except BadStatusCodeError as ex:
+            self.logger.error('[ERROR] ASIN# %s - BadStatusCode: %s - SKIP' % (asin, ex))
+        except EmptyDocumentError:
+            self.logger.error('[ERROR] ASIN# %s - EmptyDocument - SKIP' % asin)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            self.logger.error('[ERROR] ASIN# %s - %r - SKIP' % (asin, ex))
+        return None
+
     def scrape_offer_sellers_by_page(self, asin, page=1):
         item = None
         try:
@@ -97,7 +117,8 @@ class AmazonWebCrawl:
         finally:
             return item
 
-    def upload_to_s3(self, item, target_file_name, aws_storage_bucket_name=None):
+    def _upload_html(self, item, target_file_name, aws_storage_bucket_name=None):
+        # not named upload_to_s3, which the flag of the same name shadows on instances
         if not aws_storage_bucket_name:
             aws_storage_bucket_name = self.aws_storage_bucket_name
 
@@ -108,10 +129,24 @@ class AmazonWebCrawl:
             except Exception as ex:
                 self.logger.error(ex)  # something is wrong if upload to s3 fails
                 return False
+        return False
+
+    def _upload_item(self, item, target_file_name):
+        # drops the page source as soon as it is uploaded, a queued item is the only one holding it
+        try:
+            upload_s3_success = self._upload_html(item, target_file_name)
+            if upload_s3_success:
+                item['s3_file_name'] = target_file_name
+            return upload_s3_success
+        finally:
+            item.pop('raw_html', None)
 
     def crawl(self, products_to_crawl):
         """
             Crawl products on amazon, upload scraped HTML to s3, and return product crawl histories.
+            With `upload_workers`, the uploads run on a bounded pool of background threads while the next products
+            are scraped; every upload is finished before `crawl` returns. The time spent in each stage is logged
+            and kept in `crawl_timings`.
             :param products_to_crawl: a dictionary containing 'asin' and 'product_id', or a list of such dictionaries.
             :return: dictionary or list of dictionaries containing info on product crawl.
         """
@@ -126,46 +161,118 @@ class AmazonWebCrawl:
 
         self.logger.info('Crawling ...')
         product_crawl_histories = []
+        crawl_started = time.time()
+        scrape_time = 0.0
+        upload_time = 0.0
 
         if not isinstance(products_to_crawl, list):
             products_to_crawl = [products_to_crawl]
 
-        for product in products_to_crawl:
-            if isinstance(product, dict):
-                asin = product['asin']
-                product_id = product['product_id']
-            elif isinstance(product, object):
-                asin = product.asin
-                product_id = product.product_id
-
-            # scrape
-            _temp_time = time.time()
-            item = self.scrape(asin)
-            _scrape_time = int(time.time() - _temp_time)
-
-            if not item:  # can't find item when scraping
-                continue
+        uploader = None
+        if self.upload_to_s3 and self.upload_workers:
+            uploader = BackgroundUploader(self._upload_item, max_workers=self.upload_workers)
 
-            datetime_now = datetime.datetime.now()
-            target_file_name = '%s-%s' % (asin, formatted_date(datetime_now))
+        try:
+            for product in products_to_crawl:
+                asin, product_id = self._product_key(product)
 
-            # upload HTML to S3, if applicable
-            _s3_upload_time = 0
-            if self.upload_to_s3:
+                # scrape
                 _temp_time = time.time()
-                upload_s3_success = self.upload_to_s3(item, target_file_name)
-                if upload_s3_success:
-                    item['s3_file_name'] = target_file_name
-                _s3_upload_time = int(time.time() - _temp_time)
+                item = self.scrape(asin)
+                scrape_time += time.time() - _temp_time
+                _scrape_time = int(time.time() - _temp_time)
+
+                if not item:  # can't find item when scraping
+                    continue
 
-            # create dict containing info on the product crawl
-            product_crawl_history = __create_product_crawl_history__(item, product_id, datetime_now)
-            product_crawl_histories.append(product_crawl_history)
+                product_crawl_history, _s3_upload_time = self._crawl_history(
+                    asin, product_id, item, _scrape_time, uploader)
+                upload_time += _s3_upload_time
+                product_crawl_histories.append(product_crawl_history)
+        finally:
+            if uploader is not None:
+                # flush every pending upload before returning
+                uploader.close()
+                upload_time = uploader.upload_time
 
-            self.logger.info('ASIN# %s\n\tscrape time: %ss\n\ts3 upload time: %ss'
-                             % (asin, _scrape_time, _s3_upload_time))
+        self.crawl_timings = {
+            'products': len(product_crawl_histories),
+            'total_time': time.time() - crawl_started,
+            'scrape_time': scrape_time,
+            's3_upload_time': upload_time,
+        }
+        self.logger.info('Crawled %(products)s products in %(total_time).1fs: scrape %(scrape_time).1fs, '
+                         's3 upload %(s3_upload_time).1fs' % self.crawl_timings)
 
         if len(product_crawl_histories) == 1:
             product_crawl_histories = product_crawl_histories[0]
 
         return product_crawl_histories
+
+    async def crawl_many(self, products_to_crawl, concurrency=None, rate=None):
+        """
+            Asynchronous `crawl` of many products, yielding each product crawl history as soon as it is done.
+            Up to `concurrency` requests are in flight, started at no more than `rate` per second
+            (both default to ProxyCrawlConst.MAX_REQUESTS_PER_SECOND). Products that fail to scrape are skipped.
+
+                async for product_crawl_history in webcrawl.crawl_many(products):
+                    ...
+            :param products_to_crawl: a dictionary containing 'asin' and 'product_id', or a list of such dictionaries.
+        """
+        if not products_to_crawl:
+            self.logger.warning("No products were passed in to crawl")
+            return
+
+        if not isinstance(products_to_crawl, list):
+            products_to_crawl = [products_to_crawl]
+
+        self.logger.info('Crawling %s products ...' % len(products_to_crawl))
+        loop = asyncio.get_running_loop()
+
+        async with AsyncAmazonScraper(self.proxy, concurrency=concurrency, rate=rate) as scraper:
+            async def crawl_one(product):
+                asin, product_id = self._product_key(product)
+                _temp_time = time.time()
+                item = await self.scrape_async(scraper, asin)
+                _scrape_time = int(time.time() - _temp_time)
+                if not item:
+                    return None
+                product_crawl_history, _ = await loop.run_in_executor(
+                    None, self._crawl_history, asin, product_id, item, _scrape_time)
+                return product_crawl_history
+
+            tasks = [asyncio.ensure_future(crawl_one(product)) for product in products_to_crawl]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    product_crawl_history = await task
+                    if product_crawl_history:
+                        yield product_crawl_history
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    @staticmethod
+    def _product_key(product):
+        if isinstance(product, dict):
+            return product['asin'], product['product_id']
+        return product.asin, product.product_id
+
+    def _crawl_history(self, asin, product_id, item, _scrape_time, uploader=None):
+        datetime_now = datetime.datetime.now()
+        target_file_name = '%s-%s' % (asin, formatted_date(datetime_now))
+
+        # upload HTML to S3, if applicable
+        _s3_upload_time = 0
+        if self.upload_to_s3 and uploader is not None:
+            uploader.submit(item, target_file_name)
+        elif self.upload_to_s3:
+            _temp_time = time.time()
+            self._upload_item(item, target_file_name)
+            _s3_upload_time = time.time() - _temp_time
+
+        # create dict containing info on the product crawl
+        product_crawl_history = __create_product_crawl_history__(item, product_id, datetime_now)
+
+        self.logger.info('ASIN# %s\n\tscrape time: %ss\n\ts3 upload time: %ss'
+                         % (asin, _scrape_time, int(_s3_upload_time)))
+        return product_crawl_history, _s3_upload_time
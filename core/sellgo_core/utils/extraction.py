@@ -0,0 +1,161 @@
+"""
+Declarative extraction specs and the HTML backends they run on.
+
+A spec maps output fields to CSS selectors. The same spec runs on the parsel
+backend (the default, libxml2 through `scrapy.Selector`) or on the selectolax
+backend (lexbor HTML5 parser), chosen by name with `get_backend`.
+"""
+import functools
+from collections import namedtuple
+
+from parsel import Selector, SelectorList
+from parsel.csstranslator import HTMLTranslator
+
+from sellgo_core.utils.parser import to_selector
+
+DEFAULT_BACKEND = 'parsel'
+
+
+class Field(namedtuple('Field', ['css', 'value', 'attr', 'contains'])):
+    """One value read from the first element matching `css`.
+
+    `value` is one of:
+        'text'   first descendant text node of the matches, like `.css('::text').get()`
+        'own'    first child text node of the matches, like `.xpath('text()').get()`
+        'attr'   attribute `attr` of the first match
+        'exists' whether anything matches
+
+    With `contains`, only elements whose first child text node contains it match,
+    like the XPath predicate `[contains(text(), contains)]`; `css` must then be a
+    single selector, not a group.
+    """
+
+    def __new__(cls, css, value='text', attr=None, contains=None):
+        return super().__new__(cls, css, value, attr, contains)
+
+
+@functools.lru_cache(maxsize=None)
+def css_to_xpath(css, contains=None):
+    xpath = HTMLTranslator().css_to_xpath(css)
+    if contains is not None:
+        xpath += '[contains(text(), {})]'.format(HTMLTranslator().xpath_literal(contains))
+    return xpath
+
+
+class ParselBackend:
+    name = 'parsel'
+
+    @staticmethod
+    def parse(source):
+        return to_selector(source)
+
+    @staticmethod
+    def select(node, css, contains=None):
+        return node.xpath(css_to_xpath(css, contains))
+
+    @staticmethod
+    def first_text(node):
+        return node.xpath('descendant-or-self::text()').get()
+
+    @staticmethod
+    def first_own_text(node):
+        return node.xpath('text()').get()
+
+    @staticmethod
+    def attr(node, name):
+        return node.attrib.get(name)
+
+
+class SelectolaxBackend:
+    name = 'selectolax'
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser, LexborNode
+        except ImportError:
+            raise ImportError('The selectolax HTML backend requires the selectolax package') from None
+        self.parser = LexborHTMLParser
+        self.node = LexborNode
+
+    def parse(self, source):
+        if isinstance(source, self.parser):
+            return source.root
+        if isinstance(source, self.node):
+            return source
+        if isinstance(source, (Selector, SelectorList)):
+            source = source.get()
+        elif hasattr(source, 'body'):
+            source = source.body
+        return self.parser(source).root
+
+    def select(self, node, css, contains=None):
+        matches = node.css(css)
+        if contains is not None:
+            matches = [match for match in matches if contains in (self.first_own_text(match) or '')]
+        return matches
+
+    @staticmethod
+    def first_text(node):
+        for child in node.traverse(include_text=True):
+            if child.tag == '-text':
+                return child.text_content
+        return None
+
+    @staticmethod
+    def first_own_text(node):
+        for child in node.iter(include_text=True):
+            if child.tag == '-text':
+                return child.text_content
+        return None
+
+    @staticmethod
+    def attr(node, name):
+        return node.attributes.get(name)
+
+
+HTML_BACKENDS = {
+    ParselBackend.name: ParselBackend,
+    SelectolaxBackend.name: SelectolaxBackend,
+}
+_backends = {}
+
+
+def get_backend(name=None):
+    """Return the shared backend instance registered under `name`."""
+    name = name or DEFAULT_BACKEND
+    if name not in _backends:
+        try:
+            _backends[name] = HTML_BACKENDS[name]()
+        except KeyError:
+            raise ValueError(f'Unknown HTML backend {name!r}, expected one of {sorted(HTML_BACKENDS)}') from None
+    return _backends[name]
+
+
+def backend_for(node):
+    """Backend of an already parsed `node`; anything else goes through the parsel backend."""
+    if type(node).__module__.startswith('selectolax'):
+        return get_backend(SelectolaxBackend.name)
+    return get_backend(ParselBackend.name)
+
+
+def extract_field(field, node, backend):
+    matches = backend.select(node, field.css, field.contains)
+
+    if field.value == 'exists':
+        return bool(len(matches))
+    if field.value == 'attr':
+        return backend.attr(matches[0], field.attr) if len(matches) else None
+
+    first_text = backend.first_own_text if field.value == 'own' else backend.first_text
+    for match in matches:
+        text = first_text(match)
+        if text is not None:
+            return text
+    return None
+
+
+def extract(spec, node, backend=None):
+    """Read every field of `spec`, a dict of output name to `Field`, from `node`."""
+    backend = backend or backend_for(node)
+    node = backend.parse(node)
+    return {name: extract_field(field, node, backend) for name, field in spec.items()}
@@ -1,3 +1,6 @@
+import numpy as np
+import pandas as pd
+
 from sellgo_core.utils.constants import KpiConst
 
 
@@ -126,3 +129,182 @@ def calculate_advance_roi(multipack_cost, advance_profit):
     multipack_cost = 0 if not multipack_cost else float(multipack_cost)
     advance_profit = 0 if not advance_profit else float(advance_profit)
     return calculate_multipack_roi(multipack_cost, advance_profit)
+
+
+KPI_FLAG_COLUMNS = ['is_variation', 'multi_asin', 'num_variations', 'is_variation_size', 'is_variation_color',
+                    'is_variation_packagequantity', 'buybox_suppressed']
+ADVANCE_COLUMNS = ['inbound_shipping', 'outbound_shipping', 'prep_fee', 'sourcing_tax', 'vat_registered', 'vat_perc',
+                   'custom_charge', 'custom_discount']
+
+
+def calculate_product_kpis(params):
+    """`calculate_kpis` plus the multipack and advance KPIs of one product, the row `calculate_kpis_batch` computes."""
+    kpis = calculate_kpis(params)
+    quantity = calculate_multipack_quantity(params.get('package_quantity'), params.get('number_of_items'))
+    cost = calculate_multipack_cost(quantity, params.get('product_cost'),
+                                    float(KpiConst.DEFAULT_COST_PERCENTAGE * kpis['price']))
+    profit = calculate_multipack_profit(cost, params.get('price'), params.get('fees'))
+    advance_profit = calculate_advance_profit(profit, quantity, cost, params.get('price'), params.get('fees'),
+                                              *[params.get(column) for column in ADVANCE_COLUMNS])
+    kpis.update({
+        'multipack_quantity': quantity,
+        'multipack_cost': cost,
+        'multipack_profit': profit,
+        'multipack_margin': calculate_multipack_margin(profit, params.get('price')),
+        'multipack_roi': calculate_multipack_roi(cost, profit),
+        'advance_profit': advance_profit,
+        'advance_margin': calculate_advance_margin(advance_profit, params.get('price')),
+        'advance_roi': calculate_advance_roi(cost, advance_profit),
+    })
+    return kpis
+
+
+def round_like_python(values, ndigits):
+    """Vectorised `round(value, ndigits)` with the exact results of Python's `round`.
+
+    `np.round` scales, rounds and unscales, which only differs from Python's
+    correctly rounded `round` when the scaled value sits on a rounding tie. Those
+    elements are rounded again one by one with Python's `round`.
+    """
+    values = np.asarray(values, dtype=float)
+    scale = 10.0 ** ndigits
+    rounded = np.round(values, ndigits)
+
+    with np.errstate(invalid='ignore'):
+        scaled = values * scale
+        near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    near_tie &= np.isfinite(values)
+    if near_tie.any():
+        rounded[near_tie] = [round(value, ndigits) for value in values[near_tie].tolist()]
+    return rounded
+
+
+def _column(df, column):
+    """`float(value) if value else 0` over a column; a missing column, NaN or '' is read as None."""
+    if column not in df:
+        return np.zeros(len(df.index))
+    values = df[column]
+    if not pd.api.types.is_numeric_dtype(values):
+        # not replace('', None), which pads with the previous value on older pandas
+        values = pd.to_numeric(values.replace('', np.nan))
+    return values.astype(float).fillna(0).to_numpy()
+
+
+def _is_set(df, column):
+    """`value is not None` over a column, NaN being read as None."""
+    if column not in df:
+        return np.zeros(len(df.index), dtype=bool)
+    return df[column].notna().to_numpy()
+
+
+def _lowest_offer_listings(df):
+    keys = ['num_fba_new_offers', 'low_new_fba_price', 'num_fbm_new_offers', 'low_new_fbm_price']
+    offers = {key: np.zeros(len(df.index)) for key in keys}
+    if 'lowest_offer_listings' not in df:
+        return offers
+
+    for row, listings in enumerate(df['lowest_offer_listings'].tolist()):
+        if not isinstance(listings, list):
+            continue
+        for lol in listings:
+            if lol['condition'] == 'New' and lol['fulfillment'] == 'Amazon':
+                offers['num_fba_new_offers'][row] = int(lol['num_offers'])
+                offers['low_new_fba_price'][row] = float(lol['landed_price_amount'])
+            elif lol['condition'] == 'New' and lol['fulfillment'] == 'Merchant':
+                offers['num_fbm_new_offers'][row] = int(lol['num_offers'])
+                offers['low_new_fbm_price'][row] = float(lol['landed_price_amount'])
+
+    offers['num_fba_new_offers'] = offers['num_fba_new_offers'].astype(int)
+    offers['num_fbm_new_offers'] = offers['num_fbm_new_offers'].astype(int)
+    return offers
+
+
+def calculate_kpis_batch(products):
+    """Columnar `calculate_kpis` plus the multipack and advance KPIs.
+
+    `products` is a DataFrame, or a dict of equal length arrays, with the
+    `calculate_kpis` params as columns, and optionally `package_quantity`,
+    `number_of_items` and the `calculate_advance_profit` extras. Missing columns
+    and NaN are read as None. Every row gets the values `calculate_product_kpis`
+    returns for it; `margin` and `roi` are object columns holding None where
+    `calculate_kpis` does.
+    """
+    df = products if isinstance(products, pd.DataFrame) else pd.DataFrame(products)
+    kpis = pd.DataFrame(index=df.index)
+
+    price = _column(df, 'price')
+    fees = _column(df, 'fees')
+    product_cost_value = _column(df, 'product_cost')
+    default_cost = KpiConst.DEFAULT_COST_PERCENTAGE * price
+    product_cost = np.where(product_cost_value != 0, product_cost_value, default_cost)
+
+    kpis['price'] = price
+    kpis['fees'] = fees
+    profit = np.where(price > 0, price - fees - product_cost, 0)
+    kpis['profit'] = profit
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.where(price > 0, round_like_python((profit / price) * 100, 2), 0)
+        roi = round_like_python((profit / product_cost) * 100, 2)
+    has_cost = product_cost > 0
+    kpis['margin'] = pd.Series(margin, index=df.index, dtype=object).where(has_cost, None)
+    kpis['roi'] = pd.Series(roi, index=df.index, dtype=object).where(has_cost, None)
+
+    kpis['daily_sales'] = round_like_python(_column(df, 'daily_est_sales'), 2)
+    kpis['monthly_sales'] = round_like_python(round_like_python(_column(df, 'monthly_est_sales'), 1) * 30, 2)
+
+    kpis['rank'] = np.trunc(_column(df, 'rank')).astype(int)
+    kpis['fba_fee'] = _column(df, 'fba_fee')
+    kpis['referral_fee'] = _column(df, 'referral_fee')
+    kpis['variable_closing_fee'] = _column(df, 'variable_closing_fee')
+
+    for key, values in _lowest_offer_listings(df).items():
+        kpis[key] = values
+
+    for column in KPI_FLAG_COLUMNS:
+        kpis[column] = df[column] if column in df else None
+
+    # Multipack
+    package_quantity = np.trunc(_column(df, 'package_quantity')).astype(int)
+    number_of_items = np.trunc(_column(df, 'number_of_items')).astype(int)
+    multipack_quantity = np.maximum(np.where(package_quantity != 0, package_quantity, 1),
+                                    np.where(number_of_items != 0, number_of_items, 1))
+    multipack_cost = np.where(product_cost_value != 0, multipack_quantity * product_cost_value, default_cost)
+    multipack_profit = np.where(price != 0, round_like_python(price - fees - multipack_cost, 2), 0)
+
+    kpis['multipack_quantity'] = multipack_quantity
+    kpis['multipack_cost'] = multipack_cost
+    kpis['multipack_profit'] = multipack_profit
+    kpis['multipack_margin'] = _margin(multipack_profit, price)
+    kpis['multipack_roi'] = _roi(multipack_cost, multipack_profit)
+
+    # Advance
+    advance = {column: _column(df, column) for column in ADVANCE_COLUMNS}
+    has_advance = np.logical_or.reduce([_is_set(df, column) for column in ADVANCE_COLUMNS])
+    vat_registered = advance['vat_registered'] != 0
+
+    common = multipack_profit - (advance['inbound_shipping'] * multipack_quantity) - (
+            advance['outbound_shipping'] * multipack_quantity) - (advance['prep_fee'] * multipack_quantity) - (
+                     (advance['sourcing_tax'] / 100) * multipack_cost)
+    vat_perc = advance['vat_perc']
+    vat = np.where(vat_registered, price - (price / (1 + (vat_perc / 100))), fees * vat_perc / 100)
+    advance_profit = common - vat - advance['custom_charge'] + ((advance['custom_discount'] / 100) * multipack_cost)
+    advance_profit = np.where(has_advance, round_like_python(advance_profit, 2), multipack_profit)
+
+    kpis['advance_profit'] = advance_profit
+    kpis['advance_margin'] = _margin(advance_profit, price)
+    kpis['advance_roi'] = _roi(multipack_cost, advance_profit)
+
+    return kpis
+
+
+def _margin(profit, price):
+    """Vectorised `calculate_multipack_margin`."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(price > 0, round_like_python(100 * profit / price, 2), 0)
+
+
+def _roi(cost, profit):
+    """Vectorised `calculate_multipack_roi`."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(cost > 0, round_like_python(100 * profit / cost, 2), 0)
@@ -3,14 +3,82 @@ import re
 import urllib.parse as urlparse
 from urllib.parse import parse_qs
 
-import lxml
+import lxml.html
+import pandas as pd
 import scrapy
+from lxml import etree
 from parsel import Selector
+from parsel.csstranslator import HTMLTranslator
+from scrapy.http import TextResponse
 
 from sellgo_core.constants import AmazonMarketplacesConst
 from sellgo_core.webcrawl.scrapy.utils import clean
 
 
+# Product detail page
+PT_NON_NUMERALS = re.compile(r"\D+")
+PT_CUSTOMER_RATING = re.compile(r"([\d\.]+) out of 5 stars")
+PT_BSR = re.compile(r"#([\d].*) in (.*)")
+PT_NR_OF_SELLERS = re.compile(r"New \(([\d\.]+)\) from")
+
+XP_ANSWERED_QUESTIONS = etree.XPath('//a[@id="askATFLink"]/span')
+XP_CUSTOMER_REVIEWS = etree.XPath('//span[@id="acrCustomerReviewText"]')
+XP_CUSTOMER_RATING = etree.XPath('//span[@id="acrPopover"]//span[@class="a-icon-alt"]')
+XP_AMAZON_CHOICE = etree.XPath(
+    '//div[@id="acBadge_feature_div"]//span[@class="ac-keyword-link"]/a'
+)
+XP_BSR_TOP_100 = etree.XPath('//a[contains(text(), "See Top 100 in ")]//..')
+XP_BSR_TOP_100_SPAN = etree.XPath('//a[contains(text(), "See Top 100 in ")]//..//span')
+XP_BSR_TABLE_SPAN = etree.XPath('//th[contains(text(), "Best Sellers Rank")]//..//span')
+XP_BSR_TABLE_CATEGORY = etree.XPath(
+    '//th[contains(text(), "Best Sellers Rank")]//..//span//a'
+)
+XP_BSR_ZG_RANK = etree.XPath('//span[@class="zg_hrsr_rank"]')
+XP_BSR_ZG_LADDER = etree.XPath('//span[@class="zg_hrsr_ladder"]//a')
+XP_MBC_MERCHANT_NAME = etree.XPath('//span[@class="a-size-small mbcMerchantName"]')
+XP_MBC_PRICE = etree.XPath(
+    '//span[@class="a-size-small mbcMerchantName"]//..//..//'
+    'span[@class="a-size-medium a-color-price"]'
+)
+XP_NEW_BUY_BOX_PRICE = etree.XPath(
+    '//div[@id="buyBoxAccordion"]//span[@id="newBuyBoxPrice"]'
+)
+XP_PRICE_INSIDE_BUY_BOX = etree.XPath('//span[@id="price_inside_buybox"]')
+XP_PRICE = etree.XPath('//span[@id="price"]')
+XP_USED_PRICE = etree.XPath('//span[@id="gsbbUsedPrice"]')
+XP_BEST_SELLER = etree.XPath('//a[@class="badge-link"]')
+XP_SUBSCRIBE_SAVE = etree.XPath('//span[contains(text(), "Subscribe & Save:")]')
+XP_UPCS = etree.XPath('//span[contains(text(), "UPC\n:\n")]')
+XP_UPCS_SPANS = etree.XPath('//span[contains(text(), "UPC\n:\n")]/../span')
+XP_NUMBER_OF_SELLERS = etree.XPath('//span[contains(text(), "New (")]')
+
+# Text of the buy-box sections, as `Selector.css("<section> ::text")` selects it
+XP_BUY_BOX_TEXT = {
+    name: etree.XPath(HTMLTranslator().css_to_xpath(css), smart_strings=False)
+    for name, css in {
+        "buy_box": ".buybox-tabular-column ::text, #moreBuyingChoices_feature_div ::text,"
+        " #newAccordionRow ::text, #tabular-buybox ::text",
+        "more_buying_choices": "#moreBuyingChoices_feature_div ::text",
+        "new_accordion_row": "#newAccordionRow ::text",
+        "tabular_buy_box": "#tabular-buybox ::text",
+        "seller_profile": "#sellerProfileTriggerId ::text",
+    }.items()
+}
+
+
+def to_selector(source):
+    """Return a Selector over `source`.
+
+    A Scrapy response or an existing Selector is reused with its already parsed
+    tree; raw HTML (str or bytes) is parsed into a new Selector.
+    """
+    if isinstance(source, Selector):
+        return source
+    if isinstance(source, TextResponse):
+        return source.selector
+    return scrapy.Selector(text=source)
+
+
 def parse_data(cp, offer_listing_list, price_list, sales_rank_list, product_id):
     if isinstance(cp, (list,)):
         for i in cp:
@@ -35,7 +103,8 @@ def parse_single(offer_listing_list, price_list, i, sales_rank_list, product_id)
 
     # OfferListings
     if "OfferListingCount" in c_pricing["NumberOfOfferListings"]:
-        offer_listings = c_pricing["NumberOfOfferListings"]["OfferListingCount"]
+        # a single offer listing count comes as a dict, not a list of one
+        offer_listings = as_list(c_pricing["NumberOfOfferListings"]["OfferListingCount"])
         for offer_listing in offer_listings:
             offer_l_dict = {}
             offer_l_dict["count"] = offer_listing["value"]
@@ -87,6 +156,108 @@ def competitive_pricing_single(j, product_id):
     return price_dict
 
 
+PRICE_COLUMNS = [
+    "condition",
+    "subcondition",
+    "competitive_price_id",
+    "landed_price_currency",
+    "landed_price_amount",
+    "listing_price_currency",
+    "listing_price_amount",
+    "shipping_currency",
+    "shipping_amount",
+    "cdate",
+    "udate",
+    "product_id",
+]
+OFFER_LISTING_COLUMNS = ["count", "condition", "cdate", "udate", "product_id"]
+SALES_RANK_COLUMNS = ["product_category_id", "rank", "cdate", "udate", "product_id"]
+INVENTORY_COLUMNS = [
+    "vendor_id",
+    "merchant_name",
+    "merchant_id",
+    "condition",
+    "price",
+    "fulfillment",
+    "inventory",
+    "cdate",
+    "udate",
+    "product_id",
+]
+
+
+def as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def to_frame(columns, names, now):
+    """DataFrame of the `columns` lists in `names` order, stamped with one `now`."""
+    df = pd.DataFrame(columns, columns=[name for name in names if name in columns])
+    df["cdate"] = df["udate"] = pd.Timestamp(now)
+    return df[names]
+
+
+def parse_data_batch(batch, now=None):
+    """Columnar `parse_data` over a whole MWS competitive pricing batch.
+
+    `batch` yields ``(product_id, cp)`` pairs, `cp` being what `parse_data` takes.
+    Returns the ``(offer_listings, prices, sales_ranks)`` DataFrames with the
+    columns of the dicts `parse_single` builds; every row gets the same `now`
+    (default: the time of the call) as cdate and udate.
+    """
+    now = now or datetime.datetime.now()
+    offer_listings = {name: [] for name in OFFER_LISTING_COLUMNS[:2] + ["product_id"]}
+    prices = {name: [] for name in PRICE_COLUMNS[:-3] + ["product_id"]}
+    sales_ranks = {name: [] for name in SALES_RANK_COLUMNS[:2] + ["product_id"]}
+
+    for product_id, cp in batch:
+        for i in as_list(cp):
+            c_pricing = i["Product"]["CompetitivePricing"]
+
+            if "CompetitivePrice" in c_pricing["CompetitivePrices"]:
+                for j in as_list(c_pricing["CompetitivePrices"]["CompetitivePrice"]):
+                    price = j["Price"]
+                    prices["condition"].append(j["condition"]["value"])
+                    prices["subcondition"].append(j["subcondition"]["value"])
+                    prices["competitive_price_id"].append(
+                        j["CompetitivePriceId"]["value"]
+                    )
+                    for prefix, key in (
+                        ("landed_price", "LandedPrice"),
+                        ("listing_price", "ListingPrice"),
+                        ("shipping", "Shipping"),
+                    ):
+                        prices[f"{prefix}_currency"].append(
+                            price[key]["CurrencyCode"]["value"]
+                        )
+                        prices[f"{prefix}_amount"].append(price[key]["Amount"]["value"])
+                    prices["product_id"].append(product_id)
+
+            if "OfferListingCount" in c_pricing["NumberOfOfferListings"]:
+                for offer_listing in as_list(
+                    c_pricing["NumberOfOfferListings"]["OfferListingCount"]
+                ):
+                    offer_listings["count"].append(offer_listing["value"])
+                    offer_listings["condition"].append(
+                        offer_listing["condition"]["value"]
+                    )
+                    offer_listings["product_id"].append(product_id)
+
+            if "SalesRank" in i["Product"]["SalesRankings"]:
+                for sales_rank in as_list(i["Product"]["SalesRankings"]["SalesRank"]):
+                    sales_ranks["product_category_id"].append(
+                        sales_rank["ProductCategoryId"]["value"]
+                    )
+                    sales_ranks["rank"].append(sales_rank["Rank"]["value"])
+                    sales_ranks["product_id"].append(product_id)
+
+    return (
+        to_frame(offer_listings, OFFER_LISTING_COLUMNS, now),
+        to_frame(prices, PRICE_COLUMNS, now),
+        to_frame(sales_ranks, SALES_RANK_COLUMNS, now),
+    )
+
+
 def parse_sales_estimation(sales_estimation_data):
     sales_estimation_dict = {}
     if sales_estimation_data["result_1day"]:
@@ -153,6 +324,19 @@ def parse_inventory_monitoring_report(monitoring_report, asin_id_map):
     return inventory_list
 
 
+def parse_inventory_monitoring_report_batch(monitoring_report, asin_id_map, now=None):
+    """Columnar `parse_inventory_monitoring_report`, with one `now` for every row."""
+    now = now or datetime.datetime.now()
+    rows = [(asin_id_map[i[0]], i[2]) for i in monitoring_report if i[0] in asin_id_map]
+    columns = {
+        "product_id": [product_id for product_id, _ in rows],
+        "inventory": [inventory_count for _, inventory_count in rows],
+    }
+    for name in INVENTORY_COLUMNS[:6]:
+        columns[name] = [None] * len(rows)
+    return to_frame(columns, INVENTORY_COLUMNS, now)
+
+
 def parse_fees_estimate(fees_estimate_parsed):
     total_amount = float(
         fees_estimate_parsed["FeesEstimate"]["TotalFeesEstimate"]["Amount"]["value"]
@@ -174,7 +358,7 @@ def parse_fees_estimate(fees_estimate_parsed):
 
 
 def parse_offer_sellers_page_count(response_text):
-    selector = Selector(response_text)
+    selector = to_selector(response_text)
     pinned_count = 0
     pinned_offers = selector.css("#aod-pinned-offer")
     for ind, pinned_offer in enumerate(pinned_offers):
@@ -191,14 +375,8 @@ def parse_offer_sellers_page_count(response_text):
 def parse_amazon_product_listing_page(response_text):
     tree = lxml.html.fromstring(response_text)
 
-    # regular expressions
-    PT_NON_NUMERALS = re.compile(r"\D+")
-    PT_CUSTOMER_RATING = re.compile(r"([\d\.]+) out of 5 stars")
-    PT_BSR = re.compile(r"#([\d].*) in (.*)")
-    PT_NR_OF_SELLERS = re.compile(r"New \(([\d\.]+)\) from")
-
     try:
-        answered_questions_text = tree.xpath('//a[@id="askATFLink"]/span')
+        answered_questions_text = XP_ANSWERED_QUESTIONS(tree)
         answered_questions_text = (
             answered_questions_text[0].text.replace("answered questions", "").strip()
         )
@@ -208,7 +386,7 @@ def parse_amazon_product_listing_page(response_text):
         answered_questions = 0
 
     try:
-        customer_reviews_text = tree.xpath('//span[@id="acrCustomerReviewText"]')
+        customer_reviews_text = XP_CUSTOMER_REVIEWS(tree)
         customer_reviews_text = (
             customer_reviews_text[0].text.replace("customer reviews", "").strip()
         )
@@ -218,18 +396,14 @@ def parse_amazon_product_listing_page(response_text):
         customer_reviews = 0
 
     try:
-        customer_rating_text = tree.xpath(
-            '//span[@id="acrPopover"]//span[@class="a-icon-alt"]'
-        )[0].text.strip()
+        customer_rating_text = XP_CUSTOMER_RATING(tree)[0].text.strip()
         match = PT_CUSTOMER_RATING.search(customer_rating_text)
         customer_rating = match and float(match.group(1))
     except (IndexError, ValueError):
         customer_rating = 0
 
     try:
-        amazon_choice_keyword = tree.xpath(
-            '//div[@id="acBadge_feature_div"]//span[@class="ac-keyword-link"]/a'
-        )[0].text.strip()
+        amazon_choice_keyword = XP_AMAZON_CHOICE(tree)[0].text.strip()
         amazon_choice = amazon_choice_keyword
     except (IndexError, ValueError):
         amazon_choice = None
@@ -238,82 +412,59 @@ def parse_amazon_product_listing_page(response_text):
         bsr_text = ""
         rank = None
         category = None
-        if tree.xpath('//a[contains(text(), "See Top 100 in ")]//..'):
-            bsr_element = tree.xpath('//a[contains(text(), "See Top 100 in ")]//..')[0]
+        bsr_elements = XP_BSR_TOP_100(tree)
+        if bsr_elements:
+            bsr_element = bsr_elements[0]
             if bsr_element.tag == "li":
                 bsr_text = (
                     bsr_element[0].tail.replace("\n", "").replace("(", "").strip()
                 )
             elif bsr_element.tag in ("span", "td"):
                 bsr_text = bsr_element.text.replace("\n", "").replace("(", "").strip()
-            if not bsr_text and tree.xpath(
-                '//a[contains(text(), "See Top 100 in ")]//..//span'
-            ):
-                bsr_element = tree.xpath(
-                    '//a[contains(text(), "See Top 100 in ")]//..//span'
-                )
-                bsr_text = (
-                    bsr_element[0].tail.replace("\n", "").replace("(", "").strip()
-                )
+            if not bsr_text:
+                bsr_element = XP_BSR_TOP_100_SPAN(tree)
+                if bsr_element:
+                    bsr_text = (
+                        bsr_element[0].tail.replace("\n", "").replace("(", "").strip()
+                    )
             match = PT_BSR.search(bsr_text)
             rank = match and int(match.group(1).replace(",", ""))
             category = match and match.group(2)
-        elif tree.xpath('//th[contains(text(), "Best Sellers Rank")]//..//span'):
-            bsr_text = (
-                tree.xpath('//th[contains(text(), "Best Sellers Rank")]//..//span')[1]
-                .text.replace("\n", "")
-                .replace("(", "")
-            )
+        elif (table_spans := XP_BSR_TABLE_SPAN(tree)):
+            bsr_text = table_spans[1].text.replace("\n", "").replace("(", "")
             match = PT_BSR.search(bsr_text)
             rank = match and int(match.group(1).replace(",", ""))
-            category = tree.xpath(
-                '//th[contains(text(), "Best Sellers Rank")]//..//span//a'
-            )[0].text.strip()
-        elif tree.xpath('//span[@class="zg_hrsr_rank"]'):
-            rank = int(
-                tree.xpath('//span[@class="zg_hrsr_rank"]')[0]
-                .text.replace("#", "")
-                .strip()
-            )
-            category = tree.xpath('//span[@class="zg_hrsr_ladder"]//a')[0].text.strip()
+            category = XP_BSR_TABLE_CATEGORY(tree)[0].text.strip()
+        elif (zg_ranks := XP_BSR_ZG_RANK(tree)):
+            rank = int(zg_ranks[0].text.replace("#", "").strip())
+            category = XP_BSR_ZG_LADDER(tree)[0].text.strip()
     except (IndexError, ValueError):
         rank = None
         category = None
 
-    selector = Selector(response_text)
     is_amazon_selling = False
     amazon_price = None
-    buy_box_css = (
-        ".buybox-tabular-column ::text, #moreBuyingChoices_feature_div ::text, #newAccordionRow ::text,"
-        " #tabular-buybox ::text"
-    )
     sold_by_amazon_text = ["sold by amazon.com", "sold by: amazon.com"]
+    buy_box_text = {name: None for name in XP_BUY_BOX_TEXT}
 
-    if (
-        any(
-            t in clean(" ".join(selector.css(buy_box_css).getall())).lower()
-            for t in sold_by_amazon_text
-        )
-        or "amazon warehouse"
-        in clean(
-            " ".join(selector.css("#sellerProfileTriggerId ::text").getall())
-        ).lower()
+    def get_buy_box_text(name):
+        """Cleaned, lowercased text of a buy-box section, built on first use."""
+        if buy_box_text[name] is None:
+            buy_box_text[name] = clean(" ".join(XP_BUY_BOX_TEXT[name](tree))).lower()
+        return buy_box_text[name]
+
+    def sold_by_amazon(name):
+        text = get_buy_box_text(name)
+        return any(t in text for t in sold_by_amazon_text)
+
+    if sold_by_amazon("buy_box") or "amazon warehouse" in get_buy_box_text(
+        "seller_profile"
     ):
         is_amazon_selling = True
 
         try:
-            if any(
-                t
-                in clean(
-                    " ".join(
-                        selector.css("#moreBuyingChoices_feature_div ::text").getall()
-                    )
-                ).lower()
-                for t in sold_by_amazon_text
-            ):
-                merchant_name_paths = tree.xpath(
-                    '//span[@class="a-size-small mbcMerchantName"]'
-                )
+            if sold_by_amazon("more_buying_choices"):
+                merchant_name_paths = XP_MBC_MERCHANT_NAME(tree)
                 if merchant_name_paths:
                     ix = 0
                     found = False
@@ -323,53 +474,25 @@ def parse_amazon_product_listing_page(response_text):
                             break
                         ix += 1
                     if found:
-                        amazon_price_path = tree.xpath(
-                            '//span[@class="a-size-small mbcMerchantName"]//..//..//'
-                            'span[@class="a-size-medium a-color-price"]'
-                        )
+                        amazon_price_path = XP_MBC_PRICE(tree)
                         if amazon_price_path:
                             amazon_price = float(
                                 amazon_price_path[ix]
                                 .text.replace("\n", "")
                                 .replace("$", "")
                             )
-            elif any(
-                t
-                in clean(
-                    " ".join(selector.css("#newAccordionRow ::text").getall())
-                ).lower()
-                for t in sold_by_amazon_text
-            ):
-                amazon_price_path = tree.xpath(
-                    '//div[@id="buyBoxAccordion"]//span[@id="newBuyBoxPrice"]'
-                )
+            elif sold_by_amazon("new_accordion_row"):
+                amazon_price_path = XP_NEW_BUY_BOX_PRICE(tree)
                 if amazon_price_path:
                     amazon_price = float(amazon_price_path[0].text.replace("$", ""))
-            elif any(
-                t
-                in clean(
-                    " ".join(selector.css("#tabular-buybox ::text").getall())
-                ).lower()
-                for t in sold_by_amazon_text
-            ):
-                amazon_price_path = tree.xpath('//span[@id="price_inside_buybox"]')
+            elif sold_by_amazon("tabular_buy_box"):
+                amazon_price_path = XP_PRICE_INSIDE_BUY_BOX(tree) or XP_PRICE(tree)
                 if amazon_price_path:
                     amazon_price = float(
                         amazon_price_path[0].text.replace("\n", "").replace("$", "")
                     )
-                else:
-                    amazon_price_path = tree.xpath('//span[@id="price"]')
-                    if amazon_price_path:
-                        amazon_price = float(
-                            amazon_price_path[0].text.replace("\n", "").replace("$", "")
-                        )
-            elif (
-                "amazon warehouse"
-                in clean(
-                    " ".join(selector.css("#sellerProfileTriggerId ::text").getall())
-                ).lower()
-            ):
-                amazon_price_path = tree.xpath('//span[@id="gsbbUsedPrice"]')
+            elif "amazon warehouse" in get_buy_box_text("seller_profile"):
+                amazon_price_path = XP_USED_PRICE(tree)
                 if amazon_price_path:
                     amazon_price = float(
                         amazon_price_path[0].text.replace("\n", "").replace("$", "")
@@ -379,7 +502,7 @@ def parse_amazon_product_listing_page(response_text):
 
     try:
         best_seller = None
-        bs_path = tree.xpath('//a[@class="badge-link"]')
+        bs_path = XP_BEST_SELLER(tree)
         if bs_path:
             if "title" in bs_path[0].attrib:
                 best_seller = bs_path[0].attrib["title"]
@@ -388,7 +511,7 @@ def parse_amazon_product_listing_page(response_text):
 
     try:
         subscribe_save = None
-        sns_path = tree.xpath('//span[contains(text(), "Subscribe & Save:")]')
+        sns_path = XP_SUBSCRIBE_SAVE(tree)
         if sns_path and sns_path[0].attrib["class"] == "a-text-bold":
             subscribe_save = True
     except (IndexError, ValueError):
@@ -396,9 +519,9 @@ def parse_amazon_product_listing_page(response_text):
 
     try:
         upcs = None
-        upcs_path = tree.xpath('//span[contains(text(), "UPC\n:\n")]')
+        upcs_path = XP_UPCS(tree)
         if upcs_path and upcs_path[0].attrib["class"] == "a-text-bold":
-            upcs_path = tree.xpath('//span[contains(text(), "UPC\n:\n")]/../span')
+            upcs_path = XP_UPCS_SPANS(tree)
         if upcs_path:
             upcs = upcs_path[1].text
     except (IndexError, ValueError):
@@ -406,7 +529,7 @@ def parse_amazon_product_listing_page(response_text):
 
     try:
         number_of_sellers = None
-        number_of_sellers_path = tree.xpath('//span[contains(text(), "New (")]')
+        number_of_sellers_path = XP_NUMBER_OF_SELLERS(tree)
         if number_of_sellers_path:
             number_of_sellers_text = number_of_sellers_path[0].text
             match = PT_NR_OF_SELLERS.search(number_of_sellers_text)
@@ -432,8 +555,14 @@ def parse_amazon_product_listing_page(response_text):
 
 
 def get_offer(asin, raw_html):
-    selector = scrapy.Selector(text=raw_html)
-    seller = selector.xpath("//div[@id='aod-offer-soldBy']")
+    return parse_offer(asin, to_selector(raw_html))
+
+
+def parse_offer(asin, offer):
+    """Parse one offer from `offer`, the Selector of an offer element or of a whole
+    offer fragment. Every XPath is relative to it, so the page is never re-parsed.
+    """
+    seller = offer.xpath("descendant-or-self::div[@id='aod-offer-soldBy']")
     data = {
         "asin": asin,
         "seller_name": None,
@@ -446,32 +575,37 @@ def get_offer(asin, raw_html):
     }
 
     data["price"] = (
-        selector.xpath("//span[@class='a-price']/span[@class='a-offscreen']")
+        offer.xpath(
+            "descendant-or-self::span[@class='a-price']/span[@class='a-offscreen']"
+        )
         .css("::text")
         .get()
     )
     data["condition"] = (
-        selector.xpath("//div[@id='aod-offer-heading']/h5").css("::text").get()
+        offer.xpath("descendant-or-self::div[@id='aod-offer-heading']/h5")
+        .css("::text")
+        .get()
     )
     data["condition"] = (
         data["condition"].replace("\n", "") if data.get("condition") else None
     )
 
-    # Normal Seller
-    seller_name = "".join(
-        seller.xpath("//div[@class='a-fixed-left-grid-col a-col-right']/a")
-        .css("::text")
-        .extract()
+    # The seller lookups span the whole offer, but only once it has a "sold by" block
+    seller_column = (
+        offer.xpath(
+            "descendant-or-self::div[@class='a-fixed-left-grid-col a-col-right']"
+        )
+        if seller
+        else seller
     )
+
+    # Normal Seller
+    seller_name = "".join(seller_column.xpath("a").css("::text").extract())
     seller_name = seller_name.replace("\n", "")
 
     # Amazon as Seller
     if not seller_name:
-        seller_name = "".join(
-            seller.xpath("//div[@class='a-fixed-left-grid-col a-col-right']")
-            .css("::text")
-            .extract()
-        )
+        seller_name = "".join(seller_column.css("::text").extract())
         seller_name = seller_name.replace("\n", "")
     data["seller_name"] = seller_name if seller_name else None
 
@@ -489,7 +623,7 @@ def get_offer(asin, raw_html):
     if data.get("amazon_as_seller"):
         return data
 
-    seller = seller.xpath("//a[@role='link']")
+    seller = offer.xpath("descendant-or-self::a[@role='link']") if seller else seller
     seller_url = f"https://www.amazon.com{seller.xpath('@href').get()}"
 
     url_params = urlparse.urlparse(seller_url)
@@ -518,28 +652,46 @@ def get_offer(asin, raw_html):
     return data
 
 
-def get_offers(asin, raw_html):
-    response = scrapy.Selector(text=raw_html)
-    obj = response.xpath("//div[@id='aod-offer-list']/div[@id='aod-offer']").extract()
-    sellers = []
-    for seller in obj:
-        sellers.append(get_offer(asin, seller))
+def parse_offers(asin, selector):
+    """Offers of the offer list of `selector`, without the pinned offer."""
+    offers = [
+        parse_offer(asin, offer)
+        for offer in selector.xpath("//div[@id='aod-offer-list']/div[@id='aod-offer']")
+    ]
+    return [x for x in offers if x.get("seller_name")]
+
 
-    return [x for x in sellers if x.get("seller_name")]
+def parse_pinned_offer(asin, selector):
+    """Pinned offer of `selector`, or None. The offer list is not read."""
+    pinned_offer = selector.xpath("//div[@id='aod-pinned-offer']")
+    if pinned_offer:
+        return parse_offer(asin, pinned_offer[0])
+    return None
+
+
+def parse_offer_listing(asin, source):
+    """Return ``(offers, pinned_offer)`` of an offer-listing page, reading every offer
+    from the one tree of `source` (see `to_selector`). `offers` and `pinned_offer`
+    match `get_offers` and `get_pinned_offer`.
+    """
+    selector = to_selector(source)
+    return parse_offers(asin, selector), parse_pinned_offer(asin, selector)
+
+
+def get_offers(asin, raw_html):
+    return parse_offers(asin, to_selector(raw_html))
 
 
 def get_pinned_offer(asin, raw_html):
-    response = scrapy.Selector(text=raw_html)
-    pinned_seller = response.xpath("//div[@id='aod-pinned-offer']")
-    if pinned_seller:
-        return get_offer(asin, pinned_seller.get())
+    return parse_pinned_offer(asin, to_selector(raw_html))
 
 
 def get_all_offers(asin, raw_html):
     offers = []
 
+    other_offers, pinned_offer_raw = parse_offer_listing(asin, to_selector(raw_html))
+
     # Get pinned offer
-    pinned_offer_raw = get_pinned_offer(asin, raw_html)
     if pinned_offer_raw.get("seller_name"):
         pinned_offer = dict()
         pinned_offer["merchant_name"] = pinned_offer_raw["seller_name"]
@@ -549,7 +701,6 @@ def get_all_offers(asin, raw_html):
         pinned_offer["fulfillment"] = pinned_offer_raw["fulfillment"]
         offers.append(pinned_offer)
 
-    other_offers = get_offers(asin, raw_html)
     for offer in other_offers:
         data = {
             "merchant_name": offer["seller_name"],
@@ -1,3 +1,4 @@
+import functools
 import os
 
 import numpy as np
@@ -9,25 +10,66 @@ CURR_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(CURR_DIR, 'data')
 DATA_FILE_NAME = os.path.join(DATA_DIR, 'sales_estimation_lookup.csv')
 
+COEFFICIENTS = ['a', 'b', 'bsr_1', 'slope_150']
+
 
 def is_valid_marketplace(marketplace_id):
     return marketplace_id.isalnum()
 
 
-def calculate_sales_estimation(rank: int, marketplace_id: str, category: str):
+@functools.lru_cache(maxsize=None)
+def get_sales_estimation_table():
+    """Coefficients indexed by (marketplace_id, amazon_category_name), read once per process.
+    Missing coefficients are 0 and the first row of a duplicated key wins.
+    """
     df = pd.read_csv(DATA_FILE_NAME)
     df.fillna(0, inplace=True)
-    values = df.loc[(df['marketplace_id'] == marketplace_id) & (df['amazon_category_name'] == category)].to_dict()
+    df = df.drop_duplicates(['marketplace_id', 'amazon_category_name'])
+    return df.set_index(['marketplace_id', 'amazon_category_name'])[COEFFICIENTS].astype(float)
+
+
+@functools.lru_cache(maxsize=None)
+def get_sales_estimation_lookup():
+    """`get_sales_estimation_table` as a ``(marketplace_id, category) -> (a, b, bsr_1, slope_150)`` dict."""
+    table = get_sales_estimation_table()
+    return dict(zip(table.index, table.itertuples(index=False, name=None)))
+
+
+def calculate_sales_estimation(rank: int, marketplace_id: str, category: str):
     try:
-        key = list(values['marketplace_id'].keys())[0]
-        a = float(values['a'][key])
-        b = float(values['b'][key])
-        bsr_1 = float(values['bsr_1'][key])
-        slope_150 = float(values['slope_150'][key])
-        if rank <= 150 and marketplace_id == AmazonMarketplacesConst.US['id'] and bsr_1 and slope_150:
-            sales = round(float(bsr_1) - (float(slope_150) * rank), 1)
-        else:
-            sales = round(np.exp(float(a)) * np.power(rank, float(b)), 1)
-    except (KeyError, IndexError):
-        sales = None
+        a, b, bsr_1, slope_150 = get_sales_estimation_lookup()[(marketplace_id, category)]
+    except KeyError:
+        return None
+
+    if rank <= 150 and marketplace_id == AmazonMarketplacesConst.US['id'] and bsr_1 and slope_150:
+        sales = round(bsr_1 - (slope_150 * rank), 1)
+    else:
+        sales = round(np.exp(a) * np.power(rank, b), 1)
+    return sales
+
+
+def calculate_sales_estimation_batch(ranks, marketplace_ids, categories):
+    """Vectorised `calculate_sales_estimation` over equal length sequences.
+
+    Returns a float array with the same values as the per-rank function, and NaN
+    where it would return None.
+    """
+    ranks = np.asarray(ranks, dtype=float)
+    marketplace_ids = np.asarray(marketplace_ids, dtype=object)
+    keys = pd.MultiIndex.from_arrays([marketplace_ids, np.asarray(categories, dtype=object)])
+    a, b, bsr_1, slope_150 = get_sales_estimation_table().reindex(keys).to_numpy().T
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        sales = np.round(np.exp(a) * np.power(ranks, b), 1)
+        linear = (
+            (ranks <= 150)
+            & (marketplace_ids == AmazonMarketplacesConst.US['id'])
+            & (bsr_1 != 0)
+            & (slope_150 != 0)
+            & ~np.isnan(bsr_1)
+        )
+        linear_sales = bsr_1[linear] - (slope_150[linear] * ranks[linear])
+
+    # Top ranks are few; Python's round keeps them identical to the scalar path
+    sales[linear] = [round(value, 1) for value in linear_sales.tolist()]
     return sales
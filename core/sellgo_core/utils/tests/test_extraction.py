@@ -0,0 +1,74 @@
+import importlib.util
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from sellgo_core.utils.extraction import Field, extract, get_backend, backend_for
+
+BACKENDS = ['parsel', pytest.param('selectolax', marks=pytest.mark.skipif(
+    importlib.util.find_spec('selectolax') is None, reason='selectolax is not installed'))]
+
+PAGE = '''
+<html><body>
+<div class="card">
+  <a class="title link" href="/dp/B000000001/ref=x">Title <b>bold</b></a>
+  <span class="badge">Best Seller</span>
+  <span class="price"><span class="a-offscreen">$9.99</span>$9.99</span>
+  <span class="name">Widget<i>!</i> tail</span>
+</div>
+<div class="card">
+  <a class="title" href="/dp/B000000002/ref=x">Other</a>
+  <span class="badge">Amazon's Choice</span>
+</div>
+</body></html>
+'''
+
+SPEC = {
+    'href': Field("a[class='title link']", 'attr', 'href'),
+    'title': Field('a.title'),
+    'price': Field("span[class='price']"),
+    'name': Field("span[class='name']", 'own'),
+    'best_seller': Field('span', 'exists', contains='Best Seller'),
+    'choice': Field('span', 'exists', contains='Choice'),
+    'missing': Field('table'),
+    'missing_href': Field('table', 'attr', 'href'),
+}
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_extract(name):
+    backend = get_backend(name)
+    cards = backend.select(backend.parse(PAGE), "div[class='card']")
+    assert len(cards) == 2
+
+    first = extract(SPEC, cards[0], backend)
+    assert first == {
+        'href': '/dp/B000000001/ref=x',
+        'title': 'Title ',
+        'price': '$9.99',
+        'name': 'Widget',
+        'best_seller': True,
+        'choice': False,
+        'missing': None,
+        'missing_href': None,
+    }
+
+    second = extract(SPEC, cards[1])
+    assert second['href'] is None
+    assert second['title'] == 'Other'
+    assert second['best_seller'] is False and second['choice'] is True
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_backend_parse(name):
+    backend = get_backend(name)
+    response = HtmlResponse(url='https://www.amazon.com/s?me=A1', body=PAGE.encode('utf-8'), encoding='utf-8')
+
+    assert extract(SPEC, response, backend) == extract(SPEC, PAGE, backend)
+    assert backend_for(backend.parse(PAGE)) is backend
+    assert get_backend(name) is backend
+
+
+def test_get_backend_unknown():
+    with pytest.raises(ValueError):
+        get_backend('html5lib')
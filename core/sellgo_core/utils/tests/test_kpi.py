@@ -1,12 +1,16 @@
+import math
 import os
+import random
 from distutils import dir_util
 
+import numpy as np
+import pandas as pd
 from pytest import fixture
 
 from sellgo_core.utils.constants import KpiConst
 from sellgo_core.utils.kpi import calculate_kpis, calculate_multipack_cost, calculate_multipack_quantity, \
     calculate_multipack_profit, calculate_multipack_margin, calculate_multipack_roi, calculate_advance_margin, \
-    calculate_advance_roi, calculate_advance_profit
+    calculate_advance_roi, calculate_advance_profit, calculate_kpis_batch, calculate_product_kpis, round_like_python
 
 
 @fixture
@@ -131,3 +135,72 @@ def test_calculate_advance_margin(datadir):
 def test_calculate_advance_roi():
     advance_roi = calculate_advance_roi(23.22, 10.2)
     assert advance_roi == 43.93
+
+
+def assert_batch_parity(rows, batch):
+    for index, params in enumerate(rows):
+        for key, value in calculate_product_kpis(params).items():
+            batch_value = batch[key].iloc[index]
+            if value is None:
+                assert batch_value is None or (isinstance(batch_value, float) and math.isnan(batch_value)), \
+                    (index, key)
+            else:
+                assert batch_value == value, (index, key, value, batch_value)
+
+
+def test_calculate_kpis_batch(datadir):
+    i = eval(open(datadir.join('kpi.json')).read())
+    rows = [i, dict(i, product_cost=None), dict(i, price='19.69', fees='6.14', product_cost='30.54'),
+            dict(i, price='', fees='6.14', product_cost=''), dict(i, price=0, daily_est_sales=None),
+            dict(i, package_quantity=2, number_of_items=6, inbound_shipping=1),
+            dict(i, inbound_shipping=1, vat_registered=True, vat_perc=10, custom_charge=1, custom_discount=20), {}]
+    batch = calculate_kpis_batch(pd.DataFrame(rows))
+
+    assert len(batch) == len(rows)
+    assert batch['profit'].iloc[0] == - 16.99
+    assert batch['margin'].iloc[1] is None
+    assert batch['low_new_fbm_price'].iloc[0] == 19.69
+    # a blank cell is read as None, never as the value of the row before it
+    assert batch['price'].iloc[3] == 0
+    assert_batch_parity(rows, batch)
+
+
+def test_calculate_kpis_batch_random():
+    rnd = random.Random(11)
+
+    def value(low, high, ndigits=2, missing=0.2):
+        return None if rnd.random() < missing else round(rnd.uniform(low, high), ndigits)
+
+    rows = [{
+        'price': value(-5, 200),
+        'fees': value(0, 50),
+        'product_cost': value(0, 150, missing=0.4),
+        'daily_est_sales': value(0, 100, 3),
+        'monthly_est_sales': value(0, 3000, 3),
+        'rank': rnd.choice([None, 1, 1511, 99999]),
+        'package_quantity': rnd.choice([None, 0, 1, 2, 6]),
+        'number_of_items': rnd.choice([None, 1, 3]),
+        'inbound_shipping': value(0, 3, missing=0.7),
+        'sourcing_tax': value(0, 10, 1, missing=0.8),
+        'vat_registered': rnd.choice([None, True, False]),
+        'vat_perc': value(0, 25, 0, missing=0.6),
+        'custom_discount': value(0, 30, 0, missing=0.8),
+    } for _ in range(2000)]
+    assert_batch_parity(rows, calculate_kpis_batch(pd.DataFrame(rows)))
+
+
+def test_calculate_kpis_batch_arrays():
+    batch = calculate_kpis_batch({'price': np.array([19.69, 0.0]), 'fees': np.array([6.14, 1.0]),
+                                  'product_cost': np.array([30.54, np.nan])})
+    profit = calculate_kpis({'price': 19.69, 'fees': 6.14, 'product_cost': 30.54})['profit']
+    assert batch['profit'].tolist() == [profit, 0]
+    assert batch['margin'].tolist() == [- 86.29, None]
+    assert batch['multipack_quantity'].tolist() == [1, 1]
+    assert batch['is_variation'].isna().all()
+
+
+def test_round_like_python():
+    values = [0.125, 0.375, 2.675, 1.005, - 0.125, 1e16 + 0.5, 12345.675]
+    values += [value / 1000 for value in range(-5000, 5000, 7)]
+    assert round_like_python(values, 2).tolist() == [round(value, 2) for value in values]
+    assert np.isnan(round_like_python([np.nan], 2)[0])
@@ -1,11 +1,16 @@
+import datetime
 import os
 from distutils import dir_util
 
+import scrapy
 from pytest import fixture
+from scrapy.http import HtmlResponse
 
+from sellgo_core.utils import parser
 from sellgo_core.utils.parser import parse_single, parse_inventory_monitoring_report, parse_sales_estimation, \
     parse_data, competitive_pricing_single, sales_rank_single, parse_fees_estimate, parse_offer_sellers_page_count, \
-    get_all_offers, parse_amazon_product_listing_page
+    get_all_offers, parse_amazon_product_listing_page, get_offer, parse_offer_listing, \
+    to_selector, parse_data_batch, parse_inventory_monitoring_report_batch
 
 
 @fixture
@@ -87,6 +92,55 @@ def test_parse_inventory_monitoring_report(datadir):
     assert len(i_list) == 5
 
 
+def test_parse_data_batch(datadir):
+    cp = eval(open(datadir.join('competitive_pricing.txt')).read())
+    offer_listing_list = []
+    price_list = []
+    sales_rank_list = []
+    parse_data(cp, offer_listing_list, price_list, sales_rank_list, 3000014041)
+    parse_data([cp, cp], offer_listing_list, price_list, sales_rank_list, 3000003321)
+
+    now = datetime.datetime(2021, 8, 14, 12, 0)
+    offer_listings, prices, sales_ranks = parse_data_batch([(3000014041, cp), (3000003321, [cp, cp])], now)
+
+    for expected, df in ((offer_listing_list, offer_listings), (price_list, prices), (sales_rank_list, sales_ranks)):
+        for row in expected:
+            row['cdate'] = row['udate'] = now
+        assert list(df.columns) == list(expected[0])
+        assert df.to_dict(orient='records') == expected
+
+    assert len(parse_data_batch([])[1]) == 0
+
+
+def test_parse_data_batch_single_offer_listing(datadir):
+    cp = eval(open(datadir.join('competitive_pricing.txt')).read())
+    offer_listing_counts = cp['Product']['CompetitivePricing']['NumberOfOfferListings']
+    offer_listing_counts['OfferListingCount'] = offer_listing_counts['OfferListingCount'][0]
+
+    offer_listing_list = []
+    parse_single(offer_listing_list, [], cp, [], 3000014041)
+
+    now = datetime.datetime(2021, 8, 14, 12, 0)
+    offer_listings = parse_data_batch([(3000014041, cp)], now)[0]
+
+    for row in offer_listing_list:
+        row['cdate'] = row['udate'] = now
+    assert len(offer_listing_list) == 1
+    assert offer_listings.to_dict(orient='records') == offer_listing_list
+
+
+def test_parse_inventory_monitoring_report_batch(datadir):
+    i = eval(open(datadir.join('inventory_check.txt')).read())['data']['body']
+    asin_id_map = {'B075K7W3BB': 1, 'B009FUF6DM': 2, 'B003TTL0TE': 3, 'B01MXIE9RT': 4, 'B000CITK8S': 5}
+    now = datetime.datetime(2021, 8, 14, 12, 0)
+    expected = parse_inventory_monitoring_report(i, asin_id_map)
+    for row in expected:
+        row['cdate'] = row['udate'] = now
+
+    df = parse_inventory_monitoring_report_batch(i, asin_id_map, now)
+    assert df.to_dict(orient='records') == expected
+
+
 def test_parse_sales_estimation(datadir):
     i = eval(open(datadir.join('sales_estimation.txt')).read())
     se_dict = parse_sales_estimation(i)
@@ -148,3 +202,62 @@ def test_parse_amazon_product_listing_page(datadir):
     product = parse_amazon_product_listing_page(product_page_text)
     assert product is not None and type(product) == dict
     assert len(product) == 13
+
+
+def test_parse_amazon_product_listing_page_buy_box():
+    page = '<html><body>{}</body></html>'
+    product = parse_amazon_product_listing_page(page.format(
+        '<div id="tabular-buybox">Sold by: Amazon.com</div><span id="price">\n$12.50</span>'
+        '<ul><li><b>Rank:</b> #1,234 in Toys (<a>See Top 100 in Toys</a>)</li></ul>'))
+    assert product['is_amazon_selling'] is True
+    assert product['amazon_price'] == 12.5
+    assert product['rank'] == 1234 and product['category'] == 'Toys'
+
+    product = parse_amazon_product_listing_page(page.format(
+        '<a id="sellerProfileTriggerId">Amazon Warehouse</a><span id="gsbbUsedPrice">$3.10</span>'
+        '<span>New (12) from</span>'))
+    assert product['is_amazon_selling'] is True
+    assert product['amazon_price'] == 3.1
+    assert product['number_of_sellers'] == 12
+
+    product = parse_amazon_product_listing_page(page.format('<div id="tabular-buybox">Sold by Acme</div>'))
+    assert product['is_amazon_selling'] is False
+    assert product['amazon_price'] is None
+
+
+def test_parse_offer_listing(datadir):
+    sellers_page_text = open(datadir.join('aod_sellers_onepage.txt')).read()
+    selector = scrapy.Selector(text=sellers_page_text)
+    offers, pinned_offer = parse_offer_listing("SOMEASIN", selector)
+
+    fragments = selector.xpath("//div[@id='aod-offer-list']/div[@id='aod-offer']").extract()
+    expected_offers = [get_offer("SOMEASIN", fragment) for fragment in fragments]
+    assert offers == [x for x in expected_offers if x.get("seller_name")]
+    assert pinned_offer == get_offer("SOMEASIN", selector.xpath("//div[@id='aod-pinned-offer']").get())
+    assert pinned_offer["seller_id"] == "A8Y74GVD15XGJ"
+
+
+def test_get_offers_and_pinned_offer_parse_only_their_nodes(datadir, monkeypatch):
+    sellers_page_text = open(datadir.join('aod_sellers_onepage.txt')).read()
+    offers, pinned_offer = parse_offer_listing("SOMEASIN", sellers_page_text)
+
+    parsed = []
+    parse_offer = parser.parse_offer
+    monkeypatch.setattr(parser, 'parse_offer', lambda asin, offer: parsed.append(offer) or parse_offer(asin, offer))
+
+    assert parser.get_pinned_offer("SOMEASIN", sellers_page_text) == pinned_offer
+    assert len(parsed) == 1
+
+    del parsed[:]
+    assert parser.get_offers("SOMEASIN", sellers_page_text) == offers
+    assert not any(offer.attrib.get('id') == 'aod-pinned-offer' for offer in parsed)
+
+
+def test_to_selector(datadir):
+    sellers_page_text = open(datadir.join('aod_sellers_onepage.txt')).read()
+    response = HtmlResponse(url="https://www.amazon.com/gp/aod/ajax", body=sellers_page_text.encode("utf-8"),
+                            encoding="utf-8")
+
+    assert to_selector(response) is response.selector
+    assert to_selector(response.selector) is response.selector
+    assert get_all_offers("SOMEASIN", response) == get_all_offers("SOMEASIN", sellers_page_text)
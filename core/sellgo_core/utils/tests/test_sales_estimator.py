@@ -1,5 +1,8 @@
+import numpy as np
+
 from sellgo_core import AmazonMarketplacesConst
-from sellgo_core.utils.sales_estimator import calculate_sales_estimation, is_valid_marketplace
+from sellgo_core.utils.sales_estimator import calculate_sales_estimation, calculate_sales_estimation_batch, \
+    get_sales_estimation_lookup, is_valid_marketplace
 
 
 def test_calculate_sales_estimation():
@@ -37,6 +40,19 @@ def test_calculate_sales_estimation():
     assert sales_correct_exact == 0.0
 
 
+def test_calculate_sales_estimation_batch():
+    keys = list(get_sales_estimation_lookup()) + [(AmazonMarketplacesConst.US['id'], 'Shoes & Bags')]
+    rows = [(rank, marketplace_id, category) for marketplace_id, category in keys
+            for rank in (1, 89, 150, 151, 1000, 48061, 1004036, 1000000000)]
+    ranks, marketplace_ids, categories = zip(*rows)
+
+    sales = calculate_sales_estimation_batch(ranks, marketplace_ids, categories)
+
+    expected = [calculate_sales_estimation(*row) for row in rows]
+    assert np.array_equal(sales, np.array([np.nan if x is None else x for x in expected]), equal_nan=True)
+    assert np.isnan(sales[-1])
+
+
 def test_is_valid_marketplace():
     all_num = '1234567890'
     assert is_valid_marketplace(all_num) is True
@@ -1,3 +1,7 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
 
 
@@ -10,19 +14,70 @@ class AWS(object):
             region_name=region_name
         )
         self.resources = {}
+        self.lock = threading.Lock()
 
     def upload_to_s3(self, bucket_name,
                      target_file_name, source_file_path=None, source_text=None):
-        resource = self._s3_resource()
         if source_file_path is not None:
-            bucket = resource.Bucket(bucket_name)
+            bucket = self._s3_resource().Bucket(bucket_name)
             bucket.upload_file(source_file_path, bucket_name, target_file_name)
         elif source_text is not None:
-            resource.Object(bucket_name, target_file_name).put(Body=source_text)
+            self._s3_client().put_object(Bucket=bucket_name, Key=target_file_name, Body=source_text)
         else:
             raise Exception('either of params "source_file_path" or "source_text" is required')
 
+    def _s3_client(self):
+        # unlike resources, clients are thread-safe, so uploads from worker threads share this one
+        with self.lock:
+            if 's3_client' not in self.resources:
+                self.resources['s3_client'] = self.session.client('s3')
+        return self.resources['s3_client']
+
     def _s3_resource(self):
         if 's3' not in self.resources:
             self.resources['s3'] = self.session.resource('s3')
         return self.resources['s3']
+
+
+class BackgroundUploader(object):
+    """Runs `upload(*args)` calls on a pool of `max_workers` threads.
+
+    At most `max_pending` uploads are queued or running; `submit` blocks beyond
+    that, so a fast producer cannot pile up documents in memory. `close` waits
+    for every upload and returns ``(args, result)`` pairs in submission order.
+    """
+
+    def __init__(self, upload, max_workers=4, max_pending=None):
+        self.upload = upload
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pending = threading.BoundedSemaphore(max_pending or 2 * max_workers)
+        self.lock = threading.Lock()
+        self.jobs = []
+        self.upload_time = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self, args):
+        started = time.time()
+        try:
+            return self.upload(*args)
+        finally:
+            with self.lock:
+                self.upload_time += time.time() - started
+            self.pending.release()
+
+    def submit(self, *args):
+        self.pending.acquire()
+        try:
+            self.jobs.append((args, self.executor.submit(self._run, args)))
+        except BaseException:
+            self.pending.release()
+            raise
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        return [(args, future.result()) for args, future in self.jobs]
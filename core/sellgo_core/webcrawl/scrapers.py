@@ -1,12 +1,15 @@
+import asyncio
 import re
 import time
 import urllib.parse
 
+import aiohttp
 import requests
 
 from sellgo_core.utils.constants import WebCrawlConst
 from sellgo_core.utils.parser import parse_offer_sellers_page_count, \
     parse_amazon_product_listing_page, get_all_offers
+from sellgo_core.webcrawl.scrapy.constants import ProxyCrawlConst
 
 
 class AmazonScraper(object):
@@ -35,7 +38,7 @@ class AmazonScraper(object):
         if self.proxy is not None:
             self.proxy.set_session(self.session)
 
-    def scrape(self, asin):
+    def scrape(self, asin, raw_html=False):
         # prepare URL and proxy/session
         url = AmazonScraper.PRODUCT_DP_URL % asin
         target = self.proxy if self.proxy is not None else self.session
@@ -59,6 +62,8 @@ class AmazonScraper(object):
         # extract data
         result = parse_amazon_product_listing_page(response.text)
         result['asin'] = asin
+        if raw_html:
+            result['raw_html'] = response.text
 
         return result
 
@@ -93,6 +98,127 @@ class AmazonScraper(object):
         return sellers, page_count
 
 
+class TokenBucket(object):
+    """Asyncio rate limiter: at most `rate` acquisitions per second, in bursts of at most `capacity`."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+
+class AsyncAmazonScraper(object):
+    """Asyncio counterpart of `AmazonScraper`, for scraping many ASINs concurrently.
+
+    Requests share one pooled aiohttp session, at most `concurrency` are in
+    flight, and together they start at no more than `rate` per second (both
+    default to ProxyCrawlConst.MAX_REQUESTS_PER_SECOND). Retries
+    back off exponentially without blocking the other requests. Pages are parsed
+    in `executor` (the loop's default thread pool when None) to keep the event
+    loop responsive.
+
+        async with AsyncAmazonScraper(proxy) as scraper:
+            result = await scraper.scrape(asin)
+    """
+    MARKETPLACE_ID = AmazonScraper.MARKETPLACE_ID
+    PRODUCT_DP_URL = AmazonScraper.PRODUCT_DP_URL
+    PRODUCT_OFFERS_URL = AmazonScraper.PRODUCT_OFFERS_URL
+    COMMON_HTTP_HEADERS = AmazonScraper.COMMON_HTTP_HEADERS
+    MAX_RETRY_SLEEP = 30
+
+    def __init__(self, proxy=None, concurrency=None, rate=None, retry_sleep=WebCrawlConst.PROXYCRAWL_RETRY_SLEEP,
+                 executor=None):
+        self.proxy = proxy
+        self.concurrency = concurrency or ProxyCrawlConst.MAX_REQUESTS_PER_SECOND
+        self.rate = rate or ProxyCrawlConst.MAX_REQUESTS_PER_SECOND
+        self.retry_sleep = retry_sleep
+        self.executor = executor
+        self.session = None
+        self.semaphore = None
+        self.bucket = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self.session = aiohttp.ClientSession(connector=connector, headers=self.COMMON_HTTP_HEADERS)
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.bucket = TokenBucket(self.rate)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch(self, url, asin):
+        """Text of `url`, retried like `AmazonScraper` with exponential backoff."""
+        if self.proxy is not None:
+            url = self.proxy._url(url)
+
+        retry = 0
+        while True:
+            async with self.semaphore:
+                await self.bucket.acquire()
+                async with self.session.get(url) as response:
+                    text = await response.text()
+                    status = response.status
+
+            if 'Page Not Found' in text:
+                raise InvalidASINError(asin)
+            elif status != 200:
+                retry += 1
+                if retry == WebCrawlConst.PROXYCRAWL_MAX_RETRY:
+                    raise BadStatusCodeError(status)
+                await asyncio.sleep(min(self.retry_sleep * 2 ** (retry - 1), self.MAX_RETRY_SLEEP))
+            elif not text:
+                raise EmptyDocumentError()
+            else:
+                return text
+
+    async def _parse(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def scrape(self, asin, raw_html=False):
+        text = await self.fetch(self.PRODUCT_DP_URL % asin, asin)
+
+        result = await self._parse(parse_amazon_product_listing_page, text)
+        result['asin'] = asin
+        if raw_html:
+            result['raw_html'] = text
+        return result
+
+    async def scrape_offer_sellers_by_page(self, asin, page=1):
+        text = await self.fetch(urllib.parse.quote(self.PRODUCT_OFFERS_URL.format(asin)), asin)
+
+        sellers = await self._parse(get_all_offers, asin, text)
+
+        page_count = None
+        if page == 1:
+            page_count = await self._parse(parse_offer_sellers_page_count, text)
+
+        return sellers, page_count
+
+
 class InvalidASINError(Exception):
     pass
 
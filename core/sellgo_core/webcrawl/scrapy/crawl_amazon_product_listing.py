@@ -1,29 +1,32 @@
 import datetime
+import itertools
 import logging
 import math
 import re
-from multiprocessing import Process, cpu_count
+from multiprocessing import cpu_count
 
 import scrapy
-from scrapy.crawler import CrawlerProcess
 from scrapy_proxycrawl import ProxyCrawlRequest
 
 from sellgo_core import AmazonMarketplacesConst
 from sellgo_core.utils.parser import parse_amazon_product_listing_page
 from sellgo_core.webcrawl.scrapy.constants import CrawlUrlsConst, ProxyCrawlConst
 from sellgo_core.webcrawl.scrapy.exceptions import InvalidASINError, EmptyDocumentError
+from sellgo_core.webcrawl.scrapy.process_pool import CrawlResult, ProductQueueMixin, crawl_in_process_pool, \
+    run_crawler
 from sellgo_core.webcrawl.scrapy.scrapy_common_settings import common_settings
 from sellgo_core.webcrawl.scrapy.utils import get_product_identifiers, update_spider_with_proxycrawl
 
 
 def crawl(products_to_crawl, marketplace=AmazonMarketplacesConst.US, custom_settings=None, enable_proxycrawl=False,
           proxycrawl_token=None, enable_multiproc=False, multiproc_enable_threshold=100,
-          multiproc_min_urls_per_proc=50, enable_s3=False, aws_access_key_id=None, aws_secret_access_key=None,
-          aws_region=None, aws_bucket_name=None):
+          multiproc_min_urls_per_proc=50, multiproc_batch_size=20, collect_items=True, enable_s3=False,
+          aws_access_key_id=None, aws_secret_access_key=None, aws_region=None, aws_bucket_name=None):
     """
     Crawls the Amazon product listing page using AmazonProductListingSpider based on Scrapy.
     :param products_to_crawl:
-        A list of 1) asin strings, 2) dicts of asin & product_id, or 3) objects with asin & product_id
+        A list, or any iterable such as a generator, of 1) asin strings, 2) dicts of asin & product_id, or 3) objects
+        with asin & product_id. An iterable is consumed lazily.
     :param marketplace:
         One of the country dicts in AmazonMarketplacesConst
     :param custom_settings:
@@ -38,6 +41,10 @@ def crawl(products_to_crawl, marketplace=AmazonMarketplacesConst.US, custom_sett
         Minimum urls to begin using more than 1 process
     :param multiproc_min_urls_per_proc:
         Minimum urls each process should have
+    :param multiproc_batch_size:
+        Number of urls a process takes from the shared queue at a time
+    :param collect_items:
+        Return the scraped items, set to False when they are only stored by the item pipelines.
     :param enable_s3:
         store parsed items to json files in s3
     :param aws_access_key_id:
@@ -48,6 +55,8 @@ def crawl(products_to_crawl, marketplace=AmazonMarketplacesConst.US, custom_sett
         Required for storing to s3.
     :param aws_bucket_name:
         Required for storing to s3.
+    :return:
+        A CrawlResult of the scraped items, the merged Scrapy stats and the exit code of each Scrapy process.
     :raise ValueError:
         If products_to_crawl is empty.
         If enable_proxycrawl is True and no proxycrawl_token is provided.
@@ -57,11 +66,13 @@ def crawl(products_to_crawl, marketplace=AmazonMarketplacesConst.US, custom_sett
     logger = logging.getLogger(__name__)
     logger.setLevel(level=logging.INFO)
 
-    if not (products_to_crawl and isinstance(products_to_crawl, list) and len(
-            products_to_crawl) >= 1 and not get_product_identifiers(products_to_crawl[0]) == (None, None)):
+    products_to_crawl = iter(products_to_crawl or ())
+    first_product = next(products_to_crawl, None)
+    if first_product is None or get_product_identifiers(first_product) == (None, None):
         raise ValueError(
-            "products_to_crawl must be provided as a list of " +
+            "products_to_crawl must be provided as a list of "
             "1) asin strings, 2) dicts of asin & product_id, or 3) objects with asin & product_id")
+    products_to_crawl = itertools.chain([first_product], products_to_crawl)
 
     updated_settings = common_settings.copy()
 
@@ -73,35 +84,32 @@ def crawl(products_to_crawl, marketplace=AmazonMarketplacesConst.US, custom_sett
     if custom_settings:
         updated_settings.update(custom_settings)
 
-    AmazonProductListingSpider.custom_settings = updated_settings
-
-    def start_crawl(spider, *args):
-        crawler_process = CrawlerProcess()
-        crawler_process.crawl(spider, *args)
-        crawler_process.start()
-
-    if enable_multiproc and len(products_to_crawl) >= multiproc_enable_threshold:
-        ideal_num_proc = math.ceil(len(products_to_crawl) / multiproc_min_urls_per_proc)
-        actual_num_proc = ideal_num_proc if ideal_num_proc < cpu_count() else cpu_count()
-        chunk_size = math.ceil(len(products_to_crawl) / actual_num_proc)
-        product_chunks = [products_to_crawl[x:x + chunk_size] for x in range(0, len(products_to_crawl), chunk_size)]
-
-        def start_crawl_proc(*args):
-            process = Process(target=start_crawl, args=args)
-            process.start()
-            return process
-
-        # adjust download delay based on number of processes
-        logger.info(f'Number of Scrapy Processes: {actual_num_proc}')
-        AmazonProductListingSpider.custom_settings[
-            'DOWNLOAD_DELAY'] = 1.0 / ProxyCrawlConst.MAX_REQUESTS_PER_SECOND * actual_num_proc
-
-        map(lambda x: x.join(), [
-            start_crawl_proc(AmazonProductListingSpider, chunk, marketplace) for chunk in
-            product_chunks
-        ])
+    num_proc = 1
+    if enable_multiproc:
+        # only the products needed to size the pool are read ahead, the rest stay in the iterable
+        look_ahead = list(itertools.islice(products_to_crawl, max(multiproc_enable_threshold,
+                                                                  multiproc_min_urls_per_proc * cpu_count())))
+        products_to_crawl = itertools.chain(look_ahead, products_to_crawl)
+        if len(look_ahead) >= multiproc_enable_threshold:
+            num_proc = min(math.ceil(len(look_ahead) / multiproc_min_urls_per_proc), cpu_count())
+
+    if num_proc > 1:
+        # the processes share the global request rate, so each one waits num_proc times longer between requests
+        global_delay = updated_settings.get('DOWNLOAD_DELAY', 1.0 / ProxyCrawlConst.MAX_REQUESTS_PER_SECOND)
+        updated_settings['DOWNLOAD_DELAY'] = global_delay * num_proc
+        logger.info(f'Number of Scrapy Processes: {num_proc}')
+        result = crawl_in_process_pool(AmazonProductListingSpider, updated_settings, products_to_crawl, num_proc,
+                                       multiproc_batch_size, collect_items=collect_items, marketplace=marketplace,
+                                       enable_proxycrawl=AmazonProductListingSpider.enable_proxycrawl)
     else:
-        start_crawl(AmazonProductListingSpider, products_to_crawl, marketplace)
+        items = []
+        stats = run_crawler(AmazonProductListingSpider, updated_settings,
+                            on_item=items.append if collect_items else None,
+                            products_to_crawl=products_to_crawl, marketplace=marketplace)
+        result = CrawlResult(items, stats, [])
+
+    logger.info(f'Crawled {result.stats.get("item_scraped_count", 0)} products')
+    return result
 
 
 def update_settings_with_s3(updated_settings, enable_s3, aws_access_key_id, aws_secret_access_key, aws_region,
@@ -121,7 +129,7 @@ def update_settings_with_s3(updated_settings, enable_s3, aws_access_key_id, aws_
         })
 
 
-class AmazonProductListingSpider(scrapy.Spider):
+class AmazonProductListingSpider(ProductQueueMixin, scrapy.Spider):
     name = "amazonproductlisting"
     enable_proxycrawl = True
 
@@ -130,21 +138,24 @@ class AmazonProductListingSpider(scrapy.Spider):
     PT_CUSTOMER_RATING = re.compile(r'([\d\.]+) out of 5 stars')
     PT_BSR = re.compile(r'#([\d].*) in (.*)')
 
-    def __init__(self, products_to_crawl, marketplace, *args, **kwargs):
+    def __init__(self, products_to_crawl, marketplace, product_queue=None, *args, **kwargs):
         self.products_to_crawl = products_to_crawl
         self.marketplace = marketplace
+        self.product_queue = product_queue
         super().__init__(*args, **kwargs)
 
     def start_requests(self):
         for product in self.products_to_crawl:
-            asin, product_id = get_product_identifiers(product)
-            url = CrawlUrlsConst.AMAZON_PRODUCT_DP_URL % (self.marketplace['extension'], asin)
-            meta = {'product': product}
-
-            if self.enable_proxycrawl:
-                yield ProxyCrawlRequest(url, callback=self.handle_response, meta=meta)
-            else:
-                yield scrapy.Request(url, callback=self.handle_response, meta=meta)
+            yield self.make_product_request(product)
+
+    def make_product_request(self, product):
+        asin, product_id = get_product_identifiers(product)
+        url = CrawlUrlsConst.AMAZON_PRODUCT_DP_URL % (self.marketplace['extension'], asin)
+        meta = {'product': product}
+
+        if self.enable_proxycrawl:
+            return ProxyCrawlRequest(url, callback=self.handle_response, meta=meta)
+        return scrapy.Request(url, callback=self.handle_response, meta=meta)
 
     def handle_response(self, response):
         product = response.meta.get('product')
@@ -1,12 +1,33 @@
 import gzip
+import logging
 import uuid
 from datetime import datetime
 from io import BytesIO
 from urllib.parse import urlparse
 
 import boto3
-from botocore.exceptions import ClientError
-from scrapy.exporters import JsonItemExporter
+from scrapy.exporters import JsonLinesItemExporter
+from scrapy.utils.log import failure_to_exc_info
+from twisted.internet import defer, threads
+
+logger = logging.getLogger(__name__)
+
+
+class UriParams(dict):
+    """
+    Parameters of the S3 object key template. Anything not set explicitly is read from the spider attribute of the
+    same name, only when the template uses it.
+    """
+
+    def __init__(self, spider, **params):
+        super().__init__(**params)
+        self.spider = spider
+
+    def __missing__(self, key):
+        try:
+            return getattr(self.spider, key)
+        except AttributeError:
+            raise KeyError(key) from None
 
 
 class S3Pipeline:
@@ -15,6 +36,9 @@ class S3Pipeline:
     Unlike FeedExporter, the pipeline has the following features:
     * The pipeline stores items by chunk.
     * Support GZip compression.
+    * Chunks are serialized and uploaded on a background thread, so the crawl goes on during uploads. At most
+      S3PIPELINE_MAX_PENDING_CHUNKS chunks wait or upload at once, beyond that the pipeline holds back items until
+      one is done.
     """
 
     def __init__(self, settings, stats):
@@ -34,6 +58,10 @@ class S3Pipeline:
         self.items = []
         self.chunk_number = 0
 
+        self.upload_slots = defer.DeferredSemaphore(settings.getint('S3PIPELINE_MAX_PENDING_CHUNKS', 2))
+        self.uploads = set()
+        self.run_in_thread = threads.deferToThread
+
     @classmethod
     def from_crawler(cls, crawler):
         return cls(crawler.settings, crawler.stats)
@@ -45,7 +73,8 @@ class S3Pipeline:
         """
         self.items.append(item)
         if len(self.items) >= self.max_chunk_size:
-            self._upload_chunk(spider)
+            # only waits when every upload slot is taken
+            return self._upload_chunk(spider).addCallback(lambda _: item)
 
         return item
 
@@ -60,56 +89,63 @@ class S3Pipeline:
         """
         Callback function when spider is closed.
         """
-        # Upload remained items to S3.
-        self._upload_chunk(spider)
+        # Upload remained items to S3, and wait for every upload to finish.
+        d = self._upload_chunk(spider)
+        d.addCallback(lambda _: defer.DeferredList(list(self.uploads)))
+        return d
 
     def _upload_chunk(self, spider):
         """
-        Do upload items to S3.
+        Hand the items over to a background upload. The returned Deferred fires once the upload has started.
         """
 
         if not self.items:
-            return  # Do nothing when items is empty.
+            return defer.succeed(None)  # Do nothing when items is empty.
 
-        f = self._make_fileobj()
+        items, self.items = self.items, []
 
         # Build object key by replacing variables in object key template.
-        object_key = self.object_key_template.format(**self._get_uri_params(spider))
+        object_key = self.object_key_template.format_map(self._get_uri_params(spider))
+        self.chunk_number += len(items)
 
-        try:
-            self.s3.upload_fileobj(f, self.bucket_name, object_key)
-        except ClientError:
-            self.stats.inc_value('pipeline/s3/fail')
-            raise
-        else:
-            self.stats.inc_value('pipeline/s3/success')
-        finally:
-            # Prepare for the next chunk
-            self.chunk_number += len(self.items)
-            self.items = []
+        return self.upload_slots.acquire().addCallback(self._start_upload, items, object_key)
 
-    def _get_uri_params(self, spider):
-        params = {}
-        for key in dir(spider):
-            params[key] = getattr(spider, key)
+    def _start_upload(self, _, items, object_key):
+        d = self.run_in_thread(self._upload, items, object_key)
+        self.uploads.add(d)
+        d.addCallbacks(self._upload_succeeded, self._upload_failed, errbackArgs=(object_key,))
+        d.addBoth(self._upload_done, d)
+
+    def _upload(self, items, object_key):
+        self.s3.upload_fileobj(self._make_fileobj(items), self.bucket_name, object_key)
 
-        params['uuid'] = str(uuid.uuid4())
-        params['chunk'] = self.chunk_number
-        params['time'] = self.ts
-        return params
+    def _upload_succeeded(self, _):
+        self.stats.inc_value('pipeline/s3/success')
+
+    def _upload_failed(self, failure, object_key):
+        self.stats.inc_value('pipeline/s3/fail')
+        logger.error(f'Failed to upload {object_key} to S3: {failure.getErrorMessage()}',
+                     exc_info=failure_to_exc_info(failure))
+
+    def _upload_done(self, _, d):
+        self.uploads.discard(d)
+        self.upload_slots.release()
+
+    def _get_uri_params(self, spider):
+        return UriParams(spider, uuid=str(uuid.uuid4()), chunk=self.chunk_number, time=self.ts)
 
-    def _make_fileobj(self):
+    def _make_fileobj(self, items):
         """
-        Build file object from items.
+        Build file object from items, streaming the JSON lines into the GZip compressor.
         """
 
         bio = BytesIO()
         f = gzip.GzipFile(mode='wb', fileobj=bio) if self.use_gzip else bio
 
         # Build file object using ItemExporter
-        exporter = JsonItemExporter(f)
+        exporter = JsonLinesItemExporter(f)
         exporter.start_exporting()
-        for item in self.items:
+        for item in items:
             exporter.export_item(item)
         exporter.finish_exporting()
 
@@ -0,0 +1,244 @@
+import datetime
+import inspect
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+from collections import namedtuple
+
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import DontCloseSpider
+from twisted.internet import task
+
+logger = logging.getLogger(__name__)
+
+QUEUE_POLL_INTERVAL = 1
+
+# stats set with max_value or set_value rather than inc_value, merged by taking the largest value
+GAUGE_STATS = {'memusage/max', 'memusage/startup', 'elapsed_time_seconds'}
+
+
+class CrawlResult(namedtuple('CrawlResult', ['items', 'stats', 'exit_codes', 'complete'], defaults=[True])):
+    """
+    Outcome of a crawl: the scraped items, the Scrapy stats merged over every process, the exit code of each worker
+    process (empty when the crawl ran in the calling process), and whether every product was handed to a spider.
+    """
+
+    @property
+    def failed(self):
+        return not self.complete or any(exit_code != 0 for exit_code in self.exit_codes)
+
+
+def batched(iterable, batch_size):
+    """Yields lists of up to batch_size items, consuming the iterable lazily."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def merge_stats(stats_list):
+    """
+    Merges the stats of several crawls: counters are summed, gauges and durations take the largest value, start times
+    the earliest value, other datetimes the latest, and any other value is kept from the last crawl. None values,
+    e.g. the rates of a crawl that ended before any response, are skipped.
+    """
+    merged = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if merged.get(key) is None:
+                merged[key] = value
+            elif value is None:
+                continue
+            elif key in GAUGE_STATS or key.endswith('_per_minute'):
+                merged[key] = max(merged[key], value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] += value
+            elif isinstance(value, datetime.datetime):
+                merged[key] = min(merged[key], value) if key.endswith('start_time') else max(merged[key], value)
+            else:
+                merged[key] = value
+    return merged
+
+
+class ProductQueueMixin:
+    """
+    Lets a spider take its products from a multiprocessing queue of product batches, next to its static
+    products_to_crawl. Every PRODUCT_QUEUE_CHECK_INTERVAL seconds, and on spider_idle, the spider takes batches while
+    fewer than PRODUCT_QUEUE_LOW_WATERMARK requests (default: CONCURRENT_REQUESTS) are scheduled or downloading, so a
+    fast worker takes more batches than a slow one and never drains before the next one comes. The queue is only
+    read without waiting, the reactor is never blocked on it. A None batch marks the end of the queue.
+    """
+    product_queue = None
+    product_queue_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if spider.product_queue is not None:
+            crawler.signals.connect(spider.open_product_queue, signal=signals.spider_opened)
+            crawler.signals.connect(spider.close_product_queue, signal=signals.spider_closed)
+            crawler.signals.connect(spider.take_next_batch, signal=signals.spider_idle)
+        return spider
+
+    def open_product_queue(self):
+        settings = self.crawler.settings
+        self.product_queue_low_watermark = settings.getint('PRODUCT_QUEUE_LOW_WATERMARK',
+                                                           settings.getint('CONCURRENT_REQUESTS'))
+        self.product_queue_loop = task.LoopingCall(self.take_batches)
+        self.product_queue_loop.start(settings.getfloat('PRODUCT_QUEUE_CHECK_INTERVAL', 0.5))
+
+    def close_product_queue(self):
+        if self.product_queue_loop is not None and self.product_queue_loop.running:
+            self.product_queue_loop.stop()
+
+    def backlog(self):
+        engine = self.crawler.engine
+        # `slot` became `_slot` in Scrapy 2.6
+        slot = engine._slot if hasattr(engine, '_slot') else engine.slot
+        if slot is None:
+            return None
+        return len(slot.scheduler) + len(engine.downloader.active)
+
+    def next_batch(self):
+        """The next batch, or None when none is queued right now."""
+        try:
+            batch = self.product_queue.get_nowait()
+        except queue.Empty:
+            return None
+        if batch is None:
+            self.product_queue = None
+            self.close_product_queue()
+            return None
+        self.crawler.stats.inc_value('product_queue/batches')
+        return batch
+
+    def take_batches(self):
+        """Schedules queued batches until the backlog reaches the low watermark or no batch is queued."""
+        engine = self.crawler.engine
+        # Scrapy < 2.6 takes the spider as a second argument
+        takes_spider = 'spider' in inspect.signature(engine.crawl).parameters
+        while self.product_queue is not None:
+            backlog = self.backlog()
+            if backlog is None or backlog >= self.product_queue_low_watermark:
+                return
+            batch = self.next_batch()
+            if not batch:
+                return
+            for product in batch:
+                request = self.make_product_request(product)
+                if takes_spider:
+                    engine.crawl(request, self)
+                else:
+                    engine.crawl(request)
+
+    def take_next_batch(self):
+        if self.product_queue is None:
+            return
+
+        self.take_batches()
+        if self.product_queue is not None:
+            raise DontCloseSpider
+
+
+def run_crawler(spider_cls, settings, on_item=None, **spider_kwargs):
+    """Runs spider_cls with settings in this process, calling on_item for every scraped item, and returns its stats."""
+    crawler_process = CrawlerProcess(settings)
+    crawler = crawler_process.create_crawler(spider_cls)
+
+    def item_scraped(item):
+        on_item(dict(item))
+
+    if on_item is not None:
+        crawler.signals.connect(item_scraped, signal=signals.item_scraped)
+    crawler_process.crawl(crawler, **spider_kwargs)
+    crawler_process.start()
+    return crawler.stats.get_stats()
+
+
+def _crawl_worker(spider_cls, settings, task_queue, result_queue, collect_items, spider_kwargs):
+    def send_item(item):
+        result_queue.put(('item', item))
+
+    stats = run_crawler(spider_cls, settings, on_item=send_item if collect_items else None,
+                        products_to_crawl=(), product_queue=task_queue, **spider_kwargs)
+    result_queue.put(('stats', stats))
+
+
+def _feed_batches(task_queue, batches, workers, feed):
+    # ends the queue with one None per worker; gives up once no worker is left to take a batch
+    for batch in itertools.chain(batches, [None] * len(workers)):
+        if batch is None:
+            feed['exhausted'] = True
+        while True:
+            try:
+                task_queue.put(batch, timeout=QUEUE_POLL_INTERVAL)
+                break
+            except queue.Full:
+                if not any(worker.is_alive() for worker in workers):
+                    return
+        if batch is not None:
+            feed['batches'] += 1
+
+
+def crawl_in_process_pool(spider_cls, settings, products, num_proc, batch_size, collect_items=True,
+                          **spider_kwargs):
+    """
+    Crawls products with spider_cls on num_proc worker processes. The products are consumed lazily and handed out in
+    batches of batch_size through a bounded queue, so every worker keeps taking batches until the queue is drained.
+    Items and stats are sent back and merged in the returned CrawlResult, which is incomplete when the workers ended
+    before taking every batch.
+    """
+    # spawned, not forked: the workers must not inherit a reactor or spider class state of the calling process
+    context = multiprocessing.get_context('spawn')
+    task_queue = context.Queue(maxsize=2 * num_proc)
+    result_queue = context.Queue()
+
+    workers = [
+        context.Process(target=_crawl_worker,
+                        args=(spider_cls, settings, task_queue, result_queue, collect_items, spider_kwargs))
+        for _ in range(num_proc)
+    ]
+    for worker in workers:
+        worker.start()
+
+    feed = {'batches': 0, 'exhausted': False}
+    feeder = threading.Thread(target=_feed_batches,
+                              args=(task_queue, batched(products, batch_size), workers, feed), daemon=True)
+    feeder.start()
+
+    items = []
+    stats_list = []
+    while len(stats_list) < num_proc:
+        try:
+            kind, payload = result_queue.get(timeout=QUEUE_POLL_INTERVAL)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers) and result_queue.empty():
+                break
+            continue
+        if kind == 'item':
+            items.append(payload)
+        else:
+            stats_list.append(payload)
+
+    for worker in workers:
+        worker.join()
+    # with every worker gone, the feeder gives up at the latest once the queue is full
+    feeder.join()
+
+    exit_codes = [worker.exitcode for worker in workers]
+    for index, exit_code in enumerate(exit_codes):
+        if exit_code != 0:
+            logger.error(f'Scrapy process {index} exited with code {exit_code}')
+
+    stats = merge_stats(stats_list)
+    taken = stats.get('product_queue/batches', 0)
+    complete = feed['exhausted'] and taken >= feed['batches']
+    if not complete:
+        unread = '' if feed['exhausted'] else ', more products were left unread'
+        logger.error(f'Scrapy processes took {taken} of {feed["batches"]} batches{unread}')
+    return CrawlResult(items, stats, exit_codes, complete)
@@ -1,3 +1,19 @@
+import pytest
+
+
+class MockStats:
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+@pytest.fixture
+def stats():
+    return MockStats()
+
+
 def pytest_addoption(parser):
     parser.addoption(
         "--proxycrawl_token",
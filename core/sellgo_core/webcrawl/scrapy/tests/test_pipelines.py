@@ -0,0 +1,126 @@
+import gzip
+import json
+
+from scrapy.settings import Settings
+from twisted.internet import defer
+
+from sellgo_core.webcrawl.scrapy.pipelines import S3Pipeline
+
+
+class MockS3:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, fileobj, bucket_name, object_key):
+        if 'fail' in object_key:
+            raise IOError('upload failed')
+        self.objects[(bucket_name, object_key)] = fileobj.read()
+
+
+class MockSpider:
+    name = 'amazonproductlisting'
+
+    @property
+    def expensive(self):
+        raise AssertionError('only the attributes used by the object key are read')
+
+
+class ManualThread:
+    """Runs the queued uploads only when the test says so, like a busy upload thread."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, func, *args):
+        d = defer.Deferred()
+        self.calls.append((d, func, args))
+        return d
+
+    def run_next(self):
+        d, func, args = self.calls.pop(0)
+        try:
+            result = func(*args)
+        except Exception as ex:
+            d.errback(ex)
+        else:
+            d.callback(result)
+
+
+def make_pipeline(stats, url='s3://bucket/{name}/raw/{chunk}.json.gz', **settings):
+    settings = Settings(dict({
+        'S3PIPELINE_URL': url,
+        'S3PIPELINE_MAX_CHUNK_SIZE': 2,
+        'AWS_REGION_NAME': 'us-east-1',
+        'AWS_ACCESS_KEY_ID': 'key',
+        'AWS_SECRET_ACCESS_KEY': 'secret',
+    }, **settings))
+    pipeline = S3Pipeline(settings, stats)
+    pipeline.s3 = MockS3()
+    pipeline.run_in_thread = ManualThread()
+    pipeline.open_spider(MockSpider())
+    return pipeline
+
+
+def read_lines(data):
+    return [json.loads(line) for line in gzip.decompress(data).decode('utf-8').splitlines()]
+
+
+def test_s3_pipeline_uploads_in_background(stats):
+    pipeline = make_pipeline(stats, S3PIPELINE_MAX_PENDING_CHUNKS=1)
+    spider = MockSpider()
+    thread = pipeline.run_in_thread
+
+    # the first chunk is handed over without holding back the crawl
+    assert pipeline.process_item({'asin': 'A'}, spider) == {'asin': 'A'}
+    d = pipeline.process_item({'asin': 'B'}, spider)
+    assert d.called and d.result == {'asin': 'B'}
+    assert len(thread.calls) == 1 and not pipeline.s3.objects
+
+    # the second full chunk waits for the upload slot
+    pipeline.process_item({'asin': 'C'}, spider)
+    d = pipeline.process_item({'asin': 'D'}, spider)
+    assert not d.called
+
+    thread.run_next()
+    assert d.called and d.result == {'asin': 'D'}
+    assert read_lines(pipeline.s3.objects[('bucket', 'amazonproductlisting/raw/0.json.gz')]) == [
+        {'asin': 'A'}, {'asin': 'B'}]
+
+    # close_spider flushes the remaining items and waits for every upload
+    pipeline.process_item({'asin': 'E'}, spider)
+    closed = pipeline.close_spider(spider)
+    assert not closed.called
+    thread.run_next()
+    thread.run_next()
+    assert closed.called
+    assert read_lines(pipeline.s3.objects[('bucket', 'amazonproductlisting/raw/2.json.gz')]) == [
+        {'asin': 'C'}, {'asin': 'D'}]
+    assert read_lines(pipeline.s3.objects[('bucket', 'amazonproductlisting/raw/4.json.gz')]) == [{'asin': 'E'}]
+    assert stats.values == {'pipeline/s3/success': 3}
+    assert not pipeline.uploads
+
+
+def test_s3_pipeline_upload_failure(stats):
+    pipeline = make_pipeline(stats, url='s3://bucket/{name}/fail/{uuid}.json')
+    spider = MockSpider()
+
+    pipeline.process_item({'asin': 'A'}, spider)
+    closed = pipeline.close_spider(spider)
+    pipeline.run_in_thread.run_next()
+
+    assert closed.called
+    assert stats.values == {'pipeline/s3/fail': 1}
+    assert not pipeline.s3.objects
+
+
+def test_s3_pipeline_json_lines(stats):
+    pipeline = make_pipeline(stats, url='s3://bucket/{name}/raw/{time}.json')
+    spider = MockSpider()
+
+    pipeline.process_item({'asin': 'A', 'price': 1.5}, spider)
+    pipeline.close_spider(spider)
+    pipeline.run_in_thread.run_next()
+
+    [(key, data)] = pipeline.s3.objects.items()
+    assert key == ('bucket', 'amazonproductlisting/raw/%s.json' % pipeline.ts)
+    assert data == b'{"asin": "A", "price": 1.5}\n'
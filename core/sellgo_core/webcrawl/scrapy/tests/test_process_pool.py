@@ -0,0 +1,236 @@
+import datetime
+import http.server
+import os
+import queue
+import threading
+
+import pytest
+import scrapy
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.test import get_crawler
+
+from sellgo_core import AmazonMarketplacesConst
+from sellgo_core.webcrawl.scrapy.crawl_amazon_product_listing import AmazonProductListingSpider, crawl
+from sellgo_core.webcrawl.scrapy.process_pool import CrawlResult, ProductQueueMixin, batched, crawl_in_process_pool, \
+    merge_stats, run_crawler
+from sellgo_core.webcrawl.scrapy.utils import get_product_identifiers
+
+PRODUCT_LISTING = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'utils', 'tests', 'test_parser',
+                               'product_listing.txt')
+
+
+def test_batched():
+    assert list(batched(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
+
+
+def test_merge_stats():
+    start = datetime.datetime(2020, 1, 1)
+    merged = merge_stats([
+        {'item_scraped_count': 3, 'start_time': start, 'finish_time': start, 'finish_reason': 'finished'},
+        {'item_scraped_count': 4, 'start_time': start - datetime.timedelta(seconds=5),
+         'finish_time': start + datetime.timedelta(seconds=9), 'finish_reason': 'finished',
+         'downloader/response_count': 2},
+    ])
+    assert merged == {
+        'item_scraped_count': 7,
+        'start_time': start - datetime.timedelta(seconds=5),
+        'finish_time': start + datetime.timedelta(seconds=9),
+        'finish_reason': 'finished',
+        'downloader/response_count': 2,
+    }
+
+
+def test_merge_stats_gauges():
+    merged = merge_stats([
+        {'item_scraped_count': 3, 'memusage/max': 100, 'elapsed_time_seconds': 9.5, 'items_per_minute': None},
+        {'item_scraped_count': 4, 'memusage/max': 80, 'elapsed_time_seconds': 12.0, 'items_per_minute': 20.0},
+        {'item_scraped_count': 0, 'memusage/max': 90, 'elapsed_time_seconds': 1.0, 'items_per_minute': None},
+    ])
+    assert merged == {
+        'item_scraped_count': 7,
+        'memusage/max': 100,
+        'elapsed_time_seconds': 12.0,
+        'items_per_minute': 20.0,
+    }
+
+
+def test_crawl_rejects_empty_generator():
+    with pytest.raises(ValueError):
+        crawl(asin for asin in [])
+
+
+class LocalProductListingSpider(AmazonProductListingSpider):
+    """Takes the product pages from product_url; at module level, so that spawned workers can import it."""
+    enable_proxycrawl = False
+    product_url = None
+
+    def make_product_request(self, product):
+        asin, product_id = get_product_identifiers(product)
+        return scrapy.Request(self.product_url % asin, callback=self.handle_response, meta={'product': product})
+
+
+class ClosingSpider(LocalProductListingSpider):
+    """Closes on its first idle without taking any batch."""
+
+    def open_product_queue(self):
+        pass
+
+    def take_next_batch(self):
+        pass
+
+
+@pytest.fixture
+def product_url():
+    page = open(PRODUCT_LISTING, 'rb').read()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%d/dp/%%s' % server.server_port
+    server.shutdown()
+
+
+def products(count, consumed):
+    for index in range(count):
+        consumed.append(index)
+        yield {'asin': 'B%09d' % index, 'product_id': index}
+
+
+def test_crawl_in_process_pool(product_url):
+    consumed = []
+    result = crawl_in_process_pool(LocalProductListingSpider, {'LOG_LEVEL': 'WARNING'}, products(30, consumed), 2, 4,
+                                   marketplace=AmazonMarketplacesConst.US, product_url=product_url)
+
+    assert result.exit_codes == [0, 0]
+    assert not result.failed
+    assert len(consumed) == 30
+    assert sorted(item['product_id'] for item in result.items) == list(range(30))
+    assert all(item['asin'] == 'B%09d' % item['product_id'] for item in result.items)
+    assert result.stats['item_scraped_count'] == 30
+    assert result.stats['product_queue/batches'] == 8
+
+
+def test_crawl_in_process_pool_reports_uncrawled_batches(product_url):
+    # the spiders close early, yet the workers exit cleanly
+    result = crawl_in_process_pool(ClosingSpider, {'LOG_LEVEL': 'WARNING'}, products(30, []), 2, 4,
+                                   marketplace=AmazonMarketplacesConst.US, product_url=product_url)
+
+    assert result.exit_codes == [0, 0]
+    assert not result.complete
+    assert result.failed
+    assert not result.items
+
+
+def test_crawl_sizes_process_pool(monkeypatch):
+    monkeypatch.setattr('sellgo_core.webcrawl.scrapy.crawl_amazon_product_listing.cpu_count', lambda: 2)
+    calls = []
+
+    def mock_crawl_in_process_pool(spider_cls, settings, products_to_crawl, num_proc, batch_size, **kwargs):
+        calls.append((settings, len(consumed), list(products_to_crawl), num_proc, batch_size))
+        return CrawlResult([], {}, [0] * num_proc)
+
+    monkeypatch.setattr('sellgo_core.webcrawl.scrapy.crawl_amazon_product_listing.crawl_in_process_pool',
+                        mock_crawl_in_process_pool)
+    consumed = []
+    result = crawl(products(30, consumed), enable_multiproc=True, multiproc_enable_threshold=10,
+                   multiproc_min_urls_per_proc=5, multiproc_batch_size=4, custom_settings={'DOWNLOAD_DELAY': 0.01})
+
+    [(settings, read_ahead, products_to_crawl, num_proc, batch_size)] = calls
+    assert not result.failed
+    # only the products needed to size the pool are read before the workers start
+    assert read_ahead == 10
+    assert [product['product_id'] for product in products_to_crawl] == list(range(30))
+    assert (num_proc, batch_size) == (2, 4)
+    assert settings['DOWNLOAD_DELAY'] == 0.02
+
+
+def test_run_crawler_keeps_spider_settings(monkeypatch):
+    crawlers = []
+
+    class MockCrawlerProcess:
+        def __init__(self, settings):
+            self.settings = settings
+
+        def create_crawler(self, spider_cls):
+            crawlers.append(get_crawler(spider_cls, self.settings))
+            return crawlers[-1]
+
+        def crawl(self, crawler, **kwargs):
+            pass
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr('sellgo_core.webcrawl.scrapy.process_pool.CrawlerProcess', MockCrawlerProcess)
+    run_crawler(AmazonProductListingSpider, {'DOWNLOAD_DELAY': 3})
+
+    assert crawlers[0].settings.getfloat('DOWNLOAD_DELAY') == 3
+    assert AmazonProductListingSpider.custom_settings is None
+
+
+class MockQueue:
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    def get(self, *args, **kwargs):
+        raise AssertionError('the reactor must never wait on the queue')
+
+    def get_nowait(self):
+        if not self.batches:
+            raise queue.Empty
+        return self.batches.pop(0)
+
+
+class MockEngine:
+    def __init__(self):
+        self.slot = type('MockSlot', (), {'scheduler': []})()
+        self.downloader = type('MockDownloader', (), {'active': set()})()
+
+    def crawl(self, request):
+        self.slot.scheduler.append(request)
+
+
+class QueueSpider(ProductQueueMixin):
+    def __init__(self, product_queue):
+        self.product_queue = product_queue
+        self.product_queue_low_watermark = 3
+        self.crawler = get_crawler()
+        self.crawler.engine = MockEngine()
+
+    def make_product_request(self, product):
+        return product
+
+
+def test_product_queue_refills_below_low_watermark():
+    spider = QueueSpider(MockQueue([[1, 2], [3, 4], [5, 6]]))
+    scheduler = spider.crawler.engine.slot.scheduler
+
+    # batches are taken until the backlog reaches the low watermark
+    spider.take_batches()
+    assert scheduler == [1, 2, 3, 4]
+
+    # the backlog drains below the watermark before the spider is idle
+    del scheduler[:2]
+    spider.take_batches()
+    assert scheduler == [3, 4, 5, 6]
+
+    # nothing queued yet: the spider stays open without waiting
+    scheduler.clear()
+    with pytest.raises(DontCloseSpider):
+        spider.take_next_batch()
+
+    spider.product_queue.batches.append(None)
+    spider.take_next_batch()
+    assert spider.product_queue is None
+    assert spider.crawler.stats.get_value('product_queue/batches') == 3
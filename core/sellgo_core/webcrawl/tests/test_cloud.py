@@ -1,6 +1,8 @@
+import threading
+
 from boto3.resources.base import ServiceResource
 
-from sellgo_core.webcrawl.cloud import AWS
+from sellgo_core.webcrawl.cloud import AWS, BackgroundUploader
 
 
 def test_aws():
@@ -14,3 +16,30 @@ def test_aws():
 
     assert s3 is not None
     assert isinstance(s3, ServiceResource)
+
+
+def test_background_uploader_bounds_pending_uploads():
+    release = threading.Event()
+    running = []
+
+    def upload(name):
+        running.append(name)
+        release.wait(5)
+        return name.upper()
+
+    uploader = BackgroundUploader(upload, max_workers=2, max_pending=3)
+    for name in 'abc':
+        uploader.submit(name)
+
+    # a fourth upload waits for a slot
+    submitted = threading.Event()
+    producer = threading.Thread(target=lambda: (uploader.submit('d'), submitted.set()))
+    producer.start()
+    assert not submitted.wait(0.2)
+    assert sorted(running) == ['a', 'b']
+
+    release.set()
+    assert submitted.wait(5)
+    producer.join()
+    assert uploader.close() == [(('a',), 'A'), (('b',), 'B'), (('c',), 'C'), (('d',), 'D')]
+    assert uploader.upload_time > 0
@@ -0,0 +1,111 @@
+import asyncio
+import os
+
+import pytest
+from aiohttp import web
+
+from sellgo_core import AmazonWebCrawl
+from sellgo_core.utils.parser import parse_amazon_product_listing_page
+from sellgo_core.webcrawl.scrapers import AsyncAmazonScraper, TokenBucket, InvalidASINError, BadStatusCodeError
+
+PRODUCT_LISTING = os.path.join(os.path.dirname(__file__), '..', '..', 'utils', 'tests', 'test_parser',
+                               'product_listing.txt')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket(monkeypatch):
+    clock = FakeClock()
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+    bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+
+    async def acquire(times):
+        for _ in range(times):
+            await bucket.acquire()
+
+    asyncio.run(acquire(2))
+    assert slept == []
+
+    asyncio.run(acquire(5))
+    assert clock.now == pytest.approx(0.5)
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get('/dp/{asin}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, 'http://127.0.0.1:%s/dp/%%s' % port
+
+
+def test_async_scraper(monkeypatch):
+    page = open(PRODUCT_LISTING).read()
+    attempts = {}
+
+    async def handler(request):
+        asin = request.match_info['asin']
+        attempts[asin] = attempts.get(asin, 0) + 1
+        if asin == 'INVALID':
+            return web.Response(text='Page Not Found', status=404)
+        if asin == 'DOWN' or (asin == 'FLAKY' and attempts[asin] == 1):
+            return web.Response(text='busy', status=503)
+        return web.Response(text=page, content_type='text/html')
+
+    async def run():
+        runner, url = await serve(handler)
+        monkeypatch.setattr(AsyncAmazonScraper, 'PRODUCT_DP_URL', url)
+        try:
+            async with AsyncAmazonScraper(concurrency=4, rate=1000, retry_sleep=0.001) as scraper:
+                results = await asyncio.gather(scraper.scrape('B000000001'), scraper.scrape('FLAKY'))
+                with pytest.raises(InvalidASINError):
+                    await scraper.scrape('INVALID')
+                with pytest.raises(BadStatusCodeError):
+                    await scraper.scrape('DOWN')
+            return results
+        finally:
+            await runner.cleanup()
+
+    results = asyncio.run(run())
+    expected = parse_amazon_product_listing_page(page)
+    assert results == [dict(expected, asin='B000000001'), dict(expected, asin='FLAKY')]
+    assert attempts['FLAKY'] == 2
+
+
+def test_crawl_many(monkeypatch):
+    page = open(PRODUCT_LISTING).read()
+
+    async def handler(request):
+        if request.match_info['asin'] == 'INVALID':
+            return web.Response(text='Page Not Found', status=404)
+        return web.Response(text=page, content_type='text/html')
+
+    async def run():
+        runner, url = await serve(handler)
+        monkeypatch.setattr(AsyncAmazonScraper, 'PRODUCT_DP_URL', url)
+        webcrawl = AmazonWebCrawl(logger=False)
+        products = [{'asin': 'B00000000%s' % i, 'product_id': i} for i in range(5)]
+        products.append({'asin': 'INVALID', 'product_id': 99})
+        try:
+            return [history async for history in webcrawl.crawl_many(products, concurrency=3)]
+        finally:
+            await runner.cleanup()
+
+    histories = asyncio.run(run())
+    assert sorted(history['product_id'] for history in histories) == [0, 1, 2, 3, 4]
+    assert all(history['asin'] == 'B00000000%s' % history['product_id'] for history in histories)
+    assert all(history['cdate'] == history['udate'] for history in histories)
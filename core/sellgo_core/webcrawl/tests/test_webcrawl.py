@@ -0,0 +1,97 @@
+import threading
+import time
+
+from sellgo_core import AmazonWebCrawl
+
+
+class FakeScraper:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def scrape(self, asin, raw_html=False):
+        time.sleep(self.delay)
+        item = {'asin': asin, 'title': 'Product %s' % asin}
+        if raw_html:
+            item['raw_html'] = '<html>%s</html>' % asin
+        return item
+
+
+class FakeAWS:
+    def __init__(self, delay, fail=()):
+        self.delay = delay
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.uploads = {}
+
+    def upload_to_s3(self, bucket_name, target_file_name, source_text=None):
+        time.sleep(self.delay)
+        if target_file_name.startswith(self.fail):
+            raise IOError('upload failed')
+        with self.lock:
+            self.uploads[target_file_name] = source_text
+
+
+def make_webcrawl(upload_workers, fail=()):
+    webcrawl = AmazonWebCrawl(logger=False, upload_to_s3=True, upload_workers=upload_workers)
+    webcrawl.scraper = FakeScraper(delay=0.02)
+    webcrawl.aws = FakeAWS(delay=0.05, fail=fail)
+    return webcrawl
+
+
+def test_crawl_uploads_inline():
+    webcrawl = make_webcrawl(upload_workers=0)
+    histories = webcrawl.crawl([{'asin': 'A%s' % i, 'product_id': i} for i in range(3)])
+
+    assert [history['product_id'] for history in histories] == [0, 1, 2]
+    assert all('raw_html' not in history and '_s3_upload_time' not in history for history in histories)
+    assert sorted(webcrawl.aws.uploads) == sorted(history['s3_file_name'] for history in histories)
+    assert webcrawl.crawl_timings['products'] == 3
+    assert webcrawl.crawl_timings['s3_upload_time'] >= 0.15
+
+
+def test_crawl_uploads_in_background():
+    webcrawl = make_webcrawl(upload_workers=4, fail=('A3',))
+    products = [{'asin': 'A%s' % i, 'product_id': i} for i in range(8)]
+
+    started = time.time()
+    histories = webcrawl.crawl(products)
+    elapsed = time.time() - started
+
+    # every upload is flushed before crawl returns
+    assert len(webcrawl.aws.uploads) == 7
+    for history in histories:
+        assert 'raw_html' not in history
+        if history['asin'] == 'A3':
+            assert 's3_file_name' not in history
+        else:
+            assert webcrawl.aws.uploads[history['s3_file_name']] == '<html>%s</html>' % history['asin']
+
+    # scraping and uploading overlap: 8 x (0.02 + 0.05)s one after the other
+    assert elapsed < 0.4
+    timings = webcrawl.crawl_timings
+    assert timings['products'] == 8
+    assert timings['s3_upload_time'] >= 0.4
+    assert timings['total_time'] < timings['scrape_time'] + timings['s3_upload_time']
+
+
+def test_crawl_drops_uploaded_pages():
+    class RecordingScraper(FakeScraper):
+        def __init__(self):
+            super().__init__(delay=0)
+            self.items = []
+            self.holding = []
+
+        def scrape(self, asin, raw_html=False):
+            # pages still held by the items scraped before this one
+            self.holding.append(sum('raw_html' in item for item in self.items))
+            item = super().scrape(asin, raw_html)
+            self.items.append(item)
+            return item
+
+    webcrawl = make_webcrawl(upload_workers=1)
+    webcrawl.scraper = RecordingScraper()
+    webcrawl.crawl([{'asin': 'A%s' % i, 'product_id': i} for i in range(8)])
+
+    # only the queued and running uploads keep their page
+    assert max(webcrawl.scraper.holding) <= 2
+    assert not any('raw_html' in item for item in webcrawl.scraper.items)
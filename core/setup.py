@@ -26,7 +26,11 @@ setup(name='sellgo_core',
           'pytest',
           'lxml',
           'requests',
+          'aiohttp',
           'Scrapy',
           'scrapy-proxycrawl-middleware'
       ],
+      extras_require={
+          'selectolax': ['selectolax']
+      },
       zip_safe=False)
@@ -0,0 +1,83 @@
+"""
+Benchmark of the parser pool scaling with its number of workers.
+
+Parses a mix of the saved offer-listing, seller "about" and seller inventory
+pages through `ParserPool`, from a running reactor like the spider callbacks
+do, and reports pages/sec for each worker count next to parsing inline on the
+reactor thread:
+
+    cd scrapy_project && PYTHONPATH=../core python -m benchmarks.bench_parser_pool [-n 400] [-w 1 2 4]
+"""
+import argparse
+import functools
+import json
+import os
+import pathlib
+import time
+
+from project.parsing import (
+    ParserPool,
+    inventory_page,
+    offer_listing,
+    seller_about,
+)
+from twisted.internet import defer, task
+
+ROOT = pathlib.Path(__file__).parent.parent
+FIXTURES = ROOT / "project" / "tests" / "fixtures"
+CORE_FIXTURES = ROOT.parent / "core" / "sellgo_core" / "utils" / "tests" / "test_parser"
+
+JOBS = [
+    (functools.partial(offer_listing, asin="B008CPQMNO"), CORE_FIXTURES / "aod_sellers_onepage.txt"),
+    (seller_about, FIXTURES / "amazon_seller_about_body.html"),
+    (inventory_page, FIXTURES / "amazon_merchant_inventory_body.txt"),
+]
+
+
+def workload(number):
+    jobs = [(extract, path.read_text(encoding="utf-8")) for extract, path in JOBS]
+    return [jobs[index % len(jobs)] for index in range(number)]
+
+
+def bench_inline(pages):
+    started = time.perf_counter()
+    for extract, text in pages:
+        extract(text)
+    return len(pages) / (time.perf_counter() - started)
+
+
+@defer.inlineCallbacks
+def bench_pool(pages, workers, max_pending):
+    pool = ParserPool(max_workers=workers, max_pending=max_pending)
+    try:
+        # start the workers and import the parsers before timing
+        yield defer.DeferredList([pool.run(extract, text) for extract, text in pages[: workers * len(JOBS)]])
+
+        started = time.perf_counter()
+        yield defer.DeferredList([pool.run(extract, text) for extract, text in pages], fireOnOneErrback=True)
+        return len(pages) / (time.perf_counter() - started)
+    finally:
+        pool.stop()
+
+
+@defer.inlineCallbacks
+def run(reactor, args):
+    pages = workload(args.number)
+    results = {"cores": os.cpu_count(), "pages": len(pages), "inline_pages_per_sec": round(bench_inline(pages), 1)}
+    for workers in args.workers:
+        pages_per_sec = yield bench_pool(pages, workers, args.max_pending)
+        results[f"pool_{workers}_pages_per_sec"] = round(pages_per_sec, 1)
+    print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--number", type=int, default=400, help="pages per run")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--max-pending", type=int, default=100)
+    args = parser.parse_args()
+    task.react(run, (args,))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Microbenchmark of the seller "about" page parsing.
+
+Compares the compiled single-pass extractor with the previous Selector based
+implementation on the saved fixture pages:
+
+    cd scrapy_project && python -m benchmarks.bench_seller_about [-n 500] [pages ...]
+"""
+import argparse
+import json
+import pathlib
+import time
+import urllib.parse as urlparse
+from urllib.parse import parse_qs
+
+import scrapy
+from project.spiders.amazon_merchant import AmazonMerchantSpider
+from project.utils import safe_cast
+
+FIXTURES = pathlib.Path(__file__).parent.parent / "project" / "tests" / "fixtures"
+URL = "https://www.amazon.com/sp?seller=A1ACMEOUTLET&asin=B008CPQMNO&isAmazonFulfilled=1&marketplaceID=ATVPDKIKX0DER"
+
+
+class MockSpider:
+    us_states = [{"state": "California", "code": "CA"}, {"state": "Calif", "code": "CA"}]
+
+
+def legacy_get_seller_data(self, url, raw_html):
+    """`AmazonMerchantSpider.get_seller_data` before the compiled extractor, kept as reference."""
+    response = scrapy.Selector(text=raw_html)
+    url_params = urlparse.urlparse(url)
+    url_params = parse_qs(url_params.query)
+
+    seller_id = url_params.get("seller")
+    seller_id = seller_id[0] if seller_id else None
+
+    asin = url_params.get("asin")
+    asin = asin[0] if asin else None
+
+    fba = url_params.get("isAmazonFulfilled")
+    fba = fba[0] if fba else None
+
+    marketplace_id = url_params.get("marketplaceID")
+    marketplace_id = marketplace_id[0] if marketplace_id else None
+
+    seller_name = response.css("h1[id='sellerName']").css("::text").extract_first()
+    seller_logo = response.xpath("//img[@id='sellerLogo']/@src").get()
+
+    try:
+        business_name = (
+            response.css("ul[class='a-unordered-list a-nostyle a-vertical']")
+            .css("li span")[0]
+            .css("::text")
+            .extract()[1]
+        )
+    except Exception:
+        business_name = None
+
+    try:
+        business_addresses = (
+            response.css("ul[class='a-unordered-list a-nostyle a-vertical']")[1].css("li").css("::text").extract()
+        )
+
+    except Exception:
+        business_addresses = None
+
+    try:
+        address = business_addresses[:-4]  # type: ignore
+        address = " ".join(address)
+    except Exception:
+        address = None
+
+    try:
+        city = business_addresses[-4]  # type: ignore
+    except Exception:
+        city = None
+
+    try:
+        state = business_addresses[-3]  # type: ignore
+    except Exception:
+        state = None
+
+    try:
+        zip_code = business_addresses[-2]  # type: ignore
+    except Exception:
+        zip_code = None
+
+    try:
+        country = business_addresses[-1]  # type: ignore
+    except Exception:
+        country = None
+
+    phone = response.css("span[id='seller-contact-phone']").css("::text").get()
+
+    # front_url = response.css("div[id='storefront-link'] a").xpath("@href").get()
+
+    seller_rating = response.css("span[class='a-icon-alt']").css("::text").get()
+    if seller_rating:
+        index_o = seller_rating.index("o")
+        seller_rating = seller_rating[:index_o]
+
+    review_ratings = response.css("b").css("::text").get()
+    if review_ratings:
+        review_ratings = "".join(filter(str.isdigit, review_ratings))
+        review_ratings = f"{review_ratings}"
+
+    rating_table = response.css("table[id='feedback-summary-table']")
+
+    table_heading = rating_table.css("th[class='a-text-right']")
+    positive_rating = rating_table.css("span[class='a-color-success']")
+    neutral_rating = rating_table.css("span[class='a-color-secondary']")
+    negative_rating = rating_table.css("span[class='a-color-error']")
+
+    # Positive Table
+    positive_data = [
+        {heading.css("::text").get(): rating.css("::text").get()}
+        for heading, rating in zip(table_heading, positive_rating)
+    ]
+
+    try:
+        positive_30_days = positive_data[0]["30 days"]
+    except Exception:
+        positive_30_days = None
+
+    try:
+        positive_90_days = positive_data[1]["90 days"]
+    except Exception:
+        positive_90_days = None
+
+    try:
+        positive_12_month = positive_data[2]["12 months"]
+    except Exception:
+        positive_12_month = None
+
+    try:
+        positive_lifetime = positive_data[3]["Lifetime"]
+    except Exception:
+        positive_lifetime = None
+
+    # Neutral Ratings
+    neutral_data = [
+        {heading.css("::text").get(): rating.css("::text").get()}
+        for heading, rating in zip(table_heading, neutral_rating)
+    ]
+
+    try:
+        neutral_30_days = neutral_data[0]["30 days"]
+    except Exception:
+        neutral_30_days = None
+
+    try:
+        neutral_90_days = neutral_data[1]["90 days"]
+    except Exception:
+        neutral_90_days = None
+
+    try:
+        neutral_12_month = neutral_data[2]["12 months"]
+    except Exception:
+        neutral_12_month = None
+
+    try:
+        neutral_lifetime = neutral_data[3]["Lifetime"]
+    except Exception:
+        neutral_lifetime = None
+
+    # Negative Ratings
+    negative_data = [
+        {heading.css("::text").get(): rating.css("::text").get()}
+        for heading, rating in zip(table_heading, negative_rating)
+    ]
+    try:
+        negative_30_days = negative_data[0]["30 days"]
+    except Exception:
+        negative_30_days = None
+
+    try:
+        negative_90_days = negative_data[1]["90 days"]
+    except Exception:
+        negative_90_days = None
+
+    try:
+        negative_12_month = negative_data[2]["12 months"]
+    except Exception:
+        negative_12_month = None
+
+    try:
+        negative_lifetime = negative_data[3]["Lifetime"]
+    except Exception:
+        negative_lifetime = None
+
+    # Count Table
+    try:
+        count_row = rating_table.css("tr")[4].css("::text").extract()
+        count_30_days = int("".join(filter(str.isdigit, count_row[1])))
+        count_90_days = int("".join(filter(str.isdigit, count_row[2])))
+        count_12_month = int("".join(filter(str.isdigit, count_row[3])))
+        count_lifetime = int("".join(filter(str.isdigit, count_row[4])))
+
+    except Exception:
+        count_30_days = None
+        count_90_days = None
+        count_12_month = None
+        count_lifetime = None
+
+    if count_12_month and int(count_12_month) != 0:
+        launched = ">1Y"
+    elif count_90_days and int(count_90_days) != 0:
+        launched = "90D-1Y"
+    elif count_30_days and int(count_30_days) != 0:
+        launched = "30D-90D"
+    else:
+        launched = "<30D"
+
+    inventory_link = response.xpath("//li[@id='products-link']/a").xpath("@href").get()
+    if inventory_link:
+        inventory_link = f"https://www.amazon.com{inventory_link}"
+    else:
+        inventory_link = ""
+
+    # Feedback
+    feeback_table = response.xpath("//table[@id='feedback-table']//tr")
+    feedback_data = []
+
+    for feedback in feeback_table:
+        stars = feedback.xpath('//span[@class="a-icon-alt"]').css("::text").get()
+        comment = feedback.css("#-text::text").get()
+        comment_by = (
+            feedback.xpath('//span[@class="a-size-base ' 'a-color-secondary feedback-rater"]').css("::text").get()
+        )
+
+        data = {"stars": stars, "comment": comment, "comment_by": comment_by}
+        feedback_data.append(data)
+
+    is_isbn = False
+    try:
+        if asin and int(asin[0]):
+            is_isbn = True
+    except ValueError:
+        pass
+
+    if str(country).upper() == "US":
+        if state:
+            state = str(state).replace(".", "")
+            state = state.title()
+
+            for x in self.us_states:
+                if len(state) == 2:
+                    if state.upper() == x["code"]:
+                        state = x["code"]
+                        break
+
+                if state == x["state"]:
+                    state = x["code"]
+                    break
+
+    data = {
+        "inventory_link": inventory_link,
+        "seller_link": url,
+        "asin": asin,
+        "is_isbn": is_isbn,
+        "seller_id": seller_id,
+        "seller_name": seller_name,
+        "seller_logo": seller_logo,
+        "business_name": business_name,
+        "address": address,
+        "city": city,
+        "state": state,
+        "zip_code": zip_code,
+        "country": country,
+        "phone": phone,
+        "seller_rating": safe_cast(seller_rating, float),
+        "review_ratings": safe_cast(review_ratings, int),
+        "positive_30_days": safe_cast(positive_30_days, int),
+        "positive_90_days": safe_cast(positive_90_days, int),
+        "positive_12_month": safe_cast(positive_12_month, int),
+        "positive_lifetime": safe_cast(positive_lifetime, int),
+        "neutral_30_days": safe_cast(neutral_30_days, int),
+        "neutral_90_days": safe_cast(neutral_90_days, int),
+        "neutral_12_month": safe_cast(neutral_12_month, int),
+        "neutral_lifetime": safe_cast(neutral_lifetime, int),
+        "negative_30_days": safe_cast(negative_30_days, int),
+        "negative_90_days": safe_cast(negative_90_days, int),
+        "negative_12_month": safe_cast(negative_12_month, int),
+        "negative_lifetime": safe_cast(negative_lifetime, int),
+        "count_30_days": safe_cast(count_30_days, int),
+        "count_90_days": safe_cast(count_90_days, int),
+        "count_12_month": safe_cast(count_12_month, int),
+        "count_lifetime": safe_cast(count_lifetime, int),
+        "launched": launched,
+        "marketplace_id": "ATVPDKIKX0DER",
+        "feedback": json.dumps(feedback_data),
+    }
+    return data
+
+
+def bench(func, pages, number):
+    started = time.process_time()
+    for _ in range(number):
+        for page in pages:
+            func(MockSpider, URL, page)
+    return (time.process_time() - started) / (number * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", type=pathlib.Path, default=[FIXTURES / "amazon_seller_about_body.html"])
+    parser.add_argument("-n", "--number", type=int, default=500)
+    args = parser.parse_args()
+
+    pages = [path.read_bytes() for path in args.pages]
+    legacy = bench(legacy_get_seller_data, pages, args.number)
+    compiled = bench(AmazonMerchantSpider.get_seller_data, pages, args.number)
+
+    print(
+        json.dumps(
+            {
+                "pages": len(pages),
+                "legacy_ms_per_page": round(legacy * 1000, 4),
+                "compiled_ms_per_page": round(compiled * 1000, 4),
+                "speedup": round(legacy / compiled, 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Offline benchmark suite of the HTML extractors, with a stored baseline.
+
+Every case runs one extractor over a saved fixture page and reports its
+throughput (pages/sec) and the peak Python memory it allocates per page. Throughput is
+also normalised by a fixed calibration workload, so a baseline recorded on one
+machine can gate runs on another:
+
+    cd scrapy_project && PYTHONPATH=../core python -m benchmarks.suite [-k offers] [--tolerance 0.2]
+    cd scrapy_project && PYTHONPATH=../core python -m benchmarks.suite --save-baseline
+
+The run exits with status 1 when a case is slower than its baseline by more than
+the tolerance.
+"""
+import argparse
+import importlib.util
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+from lxml import html
+from project.spiders.amazon_merchant import AmazonMerchantSpider
+from project.spiders.amazon_merchant_inventory import (
+    AmazonMerchantInventorySpider,
+)
+from sellgo_core.utils.extraction import get_backend  # type:ignore
+from sellgo_core.utils.parser import (  # type:ignore
+    get_offers,
+    get_pinned_offer,
+    parse_amazon_product_listing_page,
+    parse_offer_sellers_page_count,
+)
+
+ROOT = pathlib.Path(__file__).parent.parent
+FIXTURES = ROOT / "project" / "tests" / "fixtures"
+CORE_FIXTURES = ROOT.parent / "core" / "sellgo_core" / "utils" / "tests" / "test_parser"
+BASELINE = pathlib.Path(__file__).parent / "baseline.json"
+
+ASIN = "B008CPQMNO"
+SELLER_URL = (
+    "https://www.amazon.com/sp?seller=A1ACMEOUTLET&asin=B008CPQMNO&isAmazonFulfilled=1&marketplaceID=ATVPDKIKX0DER"
+)
+
+Case = namedtuple("Case", ["name", "fixture", "run"])
+
+
+class MockMerchantSpider:
+    us_states = [{"state": "California", "code": "CA"}, {"state": "Calif", "code": "CA"}]
+    get_asins_from_inventory = AmazonMerchantSpider.get_asins_from_inventory
+
+
+class MockInventorySpider:
+    _job = "bench"
+    _project = "bench"
+    _spider = "bench"
+    _total_expected_len = 0
+    _total_yield = 0
+
+
+def get_inventory_products(page, backend="parsel"):
+    return [
+        AmazonMerchantInventorySpider.get_product_data(MockInventorySpider, product)
+        for product in AmazonMerchantInventorySpider.get_products(page, get_backend(backend))
+    ]
+
+
+CASES = [
+    Case("get_offers", CORE_FIXTURES / "aod_sellers_onepage.txt", lambda page: get_offers(ASIN, page)),
+    Case("get_pinned_offer", CORE_FIXTURES / "aod_sellers_onepage.txt", lambda page: get_pinned_offer(ASIN, page)),
+    Case("parse_offer_sellers_page_count", CORE_FIXTURES / "aod_sellers_onepage.txt", parse_offer_sellers_page_count),
+    Case("parse_amazon_product_listing_page", CORE_FIXTURES / "product_listing.txt", parse_amazon_product_listing_page),
+    Case(
+        "get_seller_data",
+        FIXTURES / "amazon_seller_about_body.html",
+        lambda page: AmazonMerchantSpider.get_seller_data(MockMerchantSpider(), SELLER_URL, page),
+    ),
+    Case(
+        "get_inventory_info",
+        FIXTURES / "amazon_merchant_inventory_body.txt",
+        lambda page: AmazonMerchantSpider.get_inventory_info(MockMerchantSpider(), page),
+    ),
+    Case("get_product_data", FIXTURES / "amazon_merchant_inventory_body.txt", get_inventory_products),
+]
+if importlib.util.find_spec("selectolax"):
+    CASES.append(
+        Case(
+            "get_product_data[selectolax]",
+            FIXTURES / "amazon_merchant_inventory_body.txt",
+            lambda page: get_inventory_products(page, "selectolax"),
+        )
+    )
+
+CALIBRATION_PAGE = "<html><body>{}</body></html>".format(
+    "".join(f"<div class='row'><span id='s{i}'>item {i}</span><a href='/dp/{i}'>link</a></div>" for i in range(200))
+)
+
+
+def calibration_workload():
+    """Fixed parse-and-walk workload, the unit the throughput is normalised by."""
+    return [element.text for element in html.fromstring(CALIBRATION_PAGE).iter()]
+
+
+def throughput(func, min_time):
+    """Calls per CPU second of `func`, called for at least `min_time` seconds."""
+    calls = 0
+    started = time.process_time()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.process_time() - started
+    return calls / elapsed
+
+
+def peak_allocated(func):
+    """Peak Python heap memory, in KiB, allocated by one call of `func` (lxml C allocations are not traced)."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run(cases, min_time, rounds=5):
+    """Measure every case against the calibration workload.
+
+    Each round times the calibration right before the case, and the normalised
+    throughput is the median of the per round ratios, so load changes during the
+    run cancel out.
+    """
+    results = {}
+    for case in cases:
+        page = case.fixture.read_text(encoding="utf-8")
+
+        def call():
+            return case.run(page)
+
+        call()
+        measured = []
+        for _ in range(rounds):
+            calibration = throughput(calibration_workload, min_time)
+            measured.append((throughput(call, min_time), calibration))
+        ratios = sorted(pages_per_sec / calibration for pages_per_sec, calibration in measured)
+
+        results[case.name] = {
+            "pages_per_sec": round(max(pages_per_sec for pages_per_sec, _ in measured), 2),
+            "normalised": round(ratios[len(ratios) // 2], 6),
+            "peak_kib_per_page": round(peak_allocated(call), 1),
+        }
+    return {"cases": results}
+
+
+def compare(results, baseline, tolerance):
+    """Print the results against `baseline` and return the names of the regressed cases."""
+    regressed = []
+    print(f"{'case':<36}{'pages/sec':>12}{'KiB/page':>12}{'vs baseline':>14}")
+    for name, result in results["cases"].items():
+        reference = baseline.get("cases", {}).get(name)
+        change = ""
+        if reference:
+            ratio = result["normalised"] / reference["normalised"]
+            change = f"{ratio - 1:+.1%}"
+            if ratio < 1 - tolerance:
+                regressed.append(name)
+                change += " !"
+        print(f"{name:<36}{result['pages_per_sec']:>12.1f}{result['peak_kib_per_page']:>12.1f}{change:>14}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--keyword", help="only run the cases whose name contains KEYWORD")
+    parser.add_argument("--min-time", type=float, default=0.2, help="CPU seconds per measurement")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput loss, 0.2 for 20%%")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the new baseline")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if not args.keyword or args.keyword in case.name]
+    results = run(cases, args.min_time)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressed = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        baseline.setdefault("cases", {}).update(results["cases"])
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"baseline saved to {args.baseline}")
+    elif regressed:
+        print(f"regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
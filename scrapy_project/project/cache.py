@@ -0,0 +1,102 @@
+import hashlib
+import math
+from collections import OrderedDict
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Sized for ``capacity`` items at ``error_rate`` false positives. Going over the
+    capacity keeps it correct, only the false positive rate grows.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def __len__(self):
+        return self.count
+
+
+class LRUSet:
+    """Exact set keeping the ``max_size`` most recently used members."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.members = OrderedDict()
+
+    def add(self, value):
+        self.members[value] = None
+        self.members.move_to_end(value)
+        if len(self.members) > self.max_size:
+            self.members.popitem(last=False)
+
+    def __contains__(self, value):
+        if value in self.members:
+            self.members.move_to_end(value)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self.members)
+
+
+class SellerIdCache:
+    """Process-local membership of the seller ids already known to MongoDB.
+
+    Every seller id loaded at startup or added since goes into the Bloom filter, so
+    an id it does not contain is new to this process. It may still have been
+    inserted meanwhile by another crawl, so writes of `new` ids must not overwrite
+    an existing document. A probable hit is confirmed by the exact LRU set, and
+    only ids missing from it need a MongoDB lookup.
+    """
+
+    def __init__(self, capacity=10_000_000, error_rate=0.001, lru_size=1_000_000):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.recent = LRUSet(lru_size)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            capacity=settings.getint("SELLER_CACHE_CAPACITY", 10_000_000),
+            error_rate=settings.getfloat("SELLER_CACHE_ERROR_RATE", 0.001),
+            lru_size=settings.getint("SELLER_CACHE_LRU_SIZE", 1_000_000),
+        )
+
+    def add(self, seller_id):
+        self.bloom.add(seller_id)
+        self.recent.add(seller_id)
+
+    def update(self, seller_ids):
+        for seller_id in seller_ids:
+            self.add(seller_id)
+
+    def classify(self, seller_ids):
+        """Split `seller_ids` into ``(known, probable, new)``.
+        Only the `probable` ids have to be looked up in MongoDB.
+        """
+        known, probable, new = [], [], []
+        for seller_id in dict.fromkeys(seller_ids):
+            if seller_id not in self.bloom:
+                new.append(seller_id)
+            elif seller_id in self.recent:
+                known.append(seller_id)
+            else:
+                probable.append(seller_id)
+        return known, probable, new
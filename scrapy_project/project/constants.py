@@ -25,3 +25,8 @@ class AmazonMerchantAutoStats(Base):
     INSERTED_SELLER_COUNT = "result/inserted_seller_count"
     PRIVATE_LABEL_ASINS_COUNT = "result/private_label_asins_count"
     PRIVATE_LABEL_PAGES_COUNT = "result/private_label_pages_count"
+    SELLER_CACHE_KNOWN_COUNT = "seller_cache/known_count"
+    SELLER_CACHE_PROBABLE_COUNT = "seller_cache/probable_count"
+    SELLER_CACHE_NEW_COUNT = "seller_cache/new_count"
+    LEASED_COUNT = "lease/leased_count"
+    LEASE_RECLAIMED_COUNT = "lease/reclaimed_count"
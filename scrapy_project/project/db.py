@@ -1,6 +1,22 @@
+import datetime
 import os
+import socket
+import uuid
+from collections import defaultdict
+from logging import getLogger
 
 import pymongo
+from pymongo.errors import (
+    AutoReconnect,
+    BulkWriteError,
+    ExecutionTimeout,
+    WTimeoutError,
+)
+from scrapy.utils.log import failure_to_exc_info
+from twisted.internet import defer, threads
+from twisted.python.threadpool import ThreadPool
+
+logger = getLogger(__name__)
 
 
 class DB:
@@ -13,4 +29,216 @@ class DB:
         self.db = self.db_client["scrapy-cluster"]
 
 
+class MongoThreadPool:
+    """Run blocking pymongo calls in a bounded thread pool, off the reactor thread.
+
+    At most ``max_pending`` calls are queued or running; further calls wait on a
+    ``DeferredSemaphore``, so pipelines returning these Deferreds apply backpressure
+    to the crawl instead of piling up writes.
+    """
+
+    def __init__(self, max_threads=10, max_pending=100):
+        self.threadpool = ThreadPool(minthreads=1, maxthreads=max_threads, name="mongo")
+        self.semaphore = defer.DeferredSemaphore(max_pending)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            max_threads=settings.getint("MONGO_THREADPOOL_MAXSIZE", 10),
+            max_pending=settings.getint("MONGO_MAX_PENDING", 100),
+        )
+
+    def start(self):
+        from twisted.internet import reactor
+
+        if not self.threadpool.started:
+            self.threadpool.start()
+            reactor.addSystemEventTrigger("during", "shutdown", self.threadpool.stop)
+
+    def run(self, func, *args, **kwargs):
+        from twisted.internet import reactor
+
+        self.start()
+        return self.semaphore.run(threads.deferToThreadPool, reactor, self.threadpool, func, *args, **kwargs)
+
+
+def get_mongo_pool(crawler):
+    """Return the `MongoThreadPool` of the crawler, created on first use."""
+    if not hasattr(crawler, "mongo_pool"):
+        crawler.mongo_pool = MongoThreadPool.from_settings(crawler.settings)
+    return crawler.mongo_pool
+
+
+class BulkWriter:
+    """Write-behind buffer of ``UpdateOne`` operations.
+
+    Operations are grouped per collection and sent as one unordered ``bulk_write``
+    per collection by :meth:`flush`, which the pipeline calls once ``max_size``
+    operations are buffered (:meth:`flush_if_full`), on a timer and at ``close_spider``.
+    With a ``pool`` the writes run in the `MongoThreadPool`; :meth:`flush` always
+    returns a Deferred.
+
+    A bulk that fails on a transient error (lost connection, no primary, timeout)
+    is put back in the buffer and sent again with the next flush; the operations
+    are idempotent upserts and updates, so parts already applied may be applied
+    twice. :meth:`close` keeps flushing until the buffer is empty.
+    """
+
+    TRANSIENT_ERRORS = (AutoReconnect, ExecutionTimeout, WTimeoutError)
+
+    def __init__(self, database, max_size=1000, stats=None, pool=None):
+        self.database = database
+        self.max_size = max_size
+        self.stats = stats
+        self.pool = pool
+        self.operations = defaultdict(list)
+
+    def __len__(self):
+        return sum(len(operations) for operations in self.operations.values())
+
+    def add(self, collection_name, operation):
+        self.operations[collection_name].append(operation)
+
+    def flush_if_full(self):
+        if len(self) >= self.max_size:
+            return self.flush()
+        return defer.succeed(None)
+
+    def flush(self):
+        operations, self.operations = self.operations, defaultdict(list)
+
+        deferreds = []
+        for collection_name, collection_operations in operations.items():
+            if self.pool:
+                d = self.pool.run(self._bulk_write, collection_name, collection_operations)
+            else:
+                d = defer.maybeDeferred(self._bulk_write, collection_name, collection_operations)
+            d.addCallback(self._bulk_write_done, len(collection_operations))
+            d.addErrback(self._bulk_write_failed, collection_name, collection_operations)
+            deferreds.append(d)
+
+        return defer.DeferredList(deferreds)
+
+    def close(self, attempts=3):
+        """Flush, and flush again what transient errors put back, up to ``attempts`` times.
+        Whatever is still buffered then is dropped and counted as lost.
+        """
+        d = self.flush()
+        for _ in range(attempts - 1):
+            d.addCallback(lambda _: self.flush() if len(self) else None)
+        d.addCallback(lambda _: self._drop())
+        return d
+
+    def _drop(self):
+        lost_count = len(self)
+        if lost_count:
+            logger.error(f"@bulk_writer: {lost_count} operations lost")
+            self._inc_stats("mongo/bulk_write/lost_count", lost_count)
+        self.operations = defaultdict(list)
+
+    def _bulk_write(self, collection_name, operations):
+        try:
+            self.database[collection_name].bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: the rest of the batch has been applied, only log what failed
+            logger.error(f"@bulk_writer: {collection_name} -- {len(e.details['writeErrors'])} write errors")
+            return len(e.details["writeErrors"])
+        return 0
+
+    def _bulk_write_done(self, error_count, operation_count):
+        self._inc_stats("mongo/bulk_write/count")
+        self._inc_stats("mongo/bulk_write/operation_count", operation_count)
+        if error_count:
+            self._inc_stats("mongo/bulk_write/error_count", error_count)
+
+    def _bulk_write_failed(self, failure, collection_name, operations):
+        if failure.check(*self.TRANSIENT_ERRORS):
+            # Ahead of what was added since, so a later update of the same document still wins
+            self.operations[collection_name][:0] = operations
+            logger.warning(f"@bulk_writer: {collection_name} -- {failure.getErrorMessage()}, retrying")
+            self._inc_stats("mongo/bulk_write/retry_count")
+            return
+
+        logger.error(
+            f"@bulk_writer: {collection_name} -- {failure.getErrorMessage()}", exc_info=failure_to_exc_info(failure)
+        )
+        self._inc_stats("mongo/bulk_write/failed_count")
+
+    def _inc_stats(self, key, count=1):
+        if self.stats:
+            self.stats.inc_value(key, count)
+
+
+class LeasedQueue:
+    """Hand out the pending documents of a collection under time-limited leases.
+
+    `claim` atomically stamps up to ``limit`` pending documents, oldest first,
+    with this owner, a batch token and a lease expiry; documents under another
+    owner's live lease are skipped, so several crawls can drain one collection
+    without fetching the same work. Work is done once the document is no longer
+    pending, see :meth:`done`. A lease that expires before that, because its
+    crawl failed or stopped, makes the document claimable again.
+    """
+
+    LEASE_FIELDS = ("lease_owner", "lease_token", "lease_expires")
+
+    def __init__(self, collection, match=None, owner=None, duration=3600, sort=(("created_at", pymongo.ASCENDING),)):
+        self.collection = collection
+        self.match = match or {}
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.duration = duration
+        self.sort = list(sort)
+
+    @classmethod
+    def done(cls, values):
+        """Update document marking a leased document as done with ``values``."""
+        return {"$set": dict(values, pending=False), "$unset": {field: "" for field in cls.LEASE_FIELDS}}
+
+    def claimable(self, now):
+        return {
+            "$and": [
+                self.match,
+                {"pending": True},
+                # None also matches documents never leased
+                {"$or": [{"lease_expires": None}, {"lease_expires": {"$lt": now}}]},
+            ]
+        }
+
+    def claim(self, limit, projection=None):
+        """Lease up to ``limit`` documents. Returns ``(documents, reclaimed)``, ``reclaimed`` counting the
+        documents whose previous lease had expired."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        candidates = list(
+            self.collection.find(self.claimable(now), {"_id": 1, "lease_owner": 1}, sort=self.sort, limit=limit)
+        )
+        if not candidates:
+            return [], 0
+
+        # Filtered again on update: a candidate leased meanwhile by another owner is left to it
+        token = uuid.uuid4().hex
+        self.collection.update_many(
+            {"$and": [{"_id": {"$in": [doc["_id"] for doc in candidates]}}, self.claimable(now)]},
+            {
+                "$set": {
+                    "lease_owner": self.owner,
+                    "lease_token": token,
+                    "lease_expires": now + datetime.timedelta(seconds=self.duration),
+                }
+            },
+        )
+        documents = list(self.collection.find({"lease_token": token}, projection, sort=self.sort))
+
+        claimed_ids = {doc["_id"] for doc in documents}
+        reclaimed = sum(1 for doc in candidates if doc["_id"] in claimed_ids and doc.get("lease_owner"))
+        return documents, reclaimed
+
+    def release(self):
+        """Drop the leases of this owner on documents still pending, so other crawls can claim them now."""
+        result = self.collection.update_many(
+            {"$and": [self.match, {"pending": True, "lease_owner": self.owner}]},
+            {"$unset": {field: "" for field in self.LEASE_FIELDS}},
+        )
+        return result.modified_count
+
+
 db = DB().db
@@ -0,0 +1,81 @@
+"""
+Streaming exports for the pipelines that post their whole output at the end of a job
+"""
+import csv
+import datetime
+import io
+import json
+import tempfile
+
+
+class StreamingCsvExporter:
+    """Write items as CSV rows to a spooled temporary file while the crawl runs.
+
+    Only `fields` are exported, and when `key` is given an item whose key fields
+    were already exported is skipped, keeping the first one like
+    `DataFrame.drop_duplicates`. With `keep_records` the exported rows are also
+    spooled as JSON lines, so `records` can rebuild the raw callback payload.
+    The file stays in memory up to `max_memory` bytes and rolls over to disk.
+    """
+
+    def __init__(self, fields, key=None, keep_records=False, max_memory=8 * 1024 * 1024):
+        self.fields = fields
+        self.key = key
+        self.seen = set()
+        self.count = 0
+
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_memory, mode="w+b")
+        self._text = io.TextIOWrapper(self.file, encoding="utf-8", newline="")
+        self._writer = csv.writer(self._text, lineterminator="\n")
+        self._writer.writerow(fields)
+
+        self._records = None
+        if keep_records:
+            self._records = tempfile.SpooledTemporaryFile(max_size=max_memory, mode="w+", encoding="utf-8")
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def serialize(value):
+        if isinstance(value, datetime.datetime):
+            return value.isoformat()
+        return value
+
+    def export_item(self, item):
+        if self.key:
+            key = tuple(item.get(field) for field in self.key)
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+
+        row = [self.serialize(item.get(field)) for field in self.fields]
+        self._writer.writerow(row)
+        if self._records is not None:
+            self._records.write(json.dumps(dict(zip(self.fields, row)), default=str) + "\n")
+
+        self.count += 1
+        return True
+
+    def records(self):
+        """Read back the exported rows as dicts, for the `get_raw` payload."""
+        self._records.seek(0)
+        return [json.loads(line) for line in self._records]
+
+    def fileobj(self):
+        """Return the finished CSV as a binary file object positioned at its start."""
+        self._text.flush()
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self._text.close()
+        if self._records is not None:
+            self._records.close()
+
+
+def to_records(output):
+    """Rows of a pipeline output, either a DataFrame or a `StreamingCsvExporter`."""
+    if isinstance(output, StreamingCsvExporter):
+        return output.records()
+    return output.to_dict(orient="records")
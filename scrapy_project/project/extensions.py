@@ -1,7 +1,12 @@
 import os
 
 import sentry_sdk
+from scrapy import signals
 from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from .db import db, get_mongo_pool
+from .schema import ensure_indexes
 
 
 class SentryLogging(object):
@@ -24,3 +29,86 @@ class SentryLogging(object):
             sentry_sdk.init(sentry_dsn, environment=sentry_environment)
         # return the extension object
         return ext
+
+
+class Frontier:
+    """
+    Keep the crawl saturated: every FRONTIER_CHECK_INTERVAL seconds, ask the spider to `refill` once the scheduled
+    and downloading requests fall below FRONTIER_LOW_WATERMARK, instead of waiting for `spider_idle`.
+    """
+
+    def __init__(self, crawler, low_watermark, interval):
+        self.crawler = crawler
+        self.low_watermark = low_watermark
+        self.interval = interval
+        self.spider = None
+        self.loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        low_watermark = settings.getint("FRONTIER_LOW_WATERMARK", 2 * settings.getint("CONCURRENT_REQUESTS"))
+        if not low_watermark:
+            raise NotConfigured
+
+        ext = cls(crawler, low_watermark, settings.getfloat("FRONTIER_CHECK_INTERVAL", 1))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        if not hasattr(spider, "refill"):
+            return
+
+        self.spider = spider
+        self.loop = task.LoopingCall(self.check)
+        self.loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.loop and self.loop.running:
+            self.loop.stop()
+
+    def backlog(self):
+        """Number of scheduled and downloading requests, None while the engine has no open spider."""
+        engine = self.crawler.engine
+        # `slot` became `_slot` in Scrapy 2.6
+        slot = engine._slot if hasattr(engine, "_slot") else engine.slot
+        if slot is None:
+            return None
+        return len(slot.scheduler) + len(engine.downloader.active)
+
+    def check(self):
+        if getattr(self.spider, "done_scrape", False) or getattr(self.spider, "refilling", False):
+            return
+
+        backlog = self.backlog()
+        if backlog is None or backlog >= self.low_watermark:
+            return
+
+        self.crawler.stats.inc_value("frontier/refill_count")
+        self.spider.refill()
+
+
+class MongoIndexes:
+    """
+    Create the missing indexes of `project.schema` when the spider opens, unless MONGO_ENSURE_INDEXES is off. The
+    crawl starts once they exist.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("MONGO_ENSURE_INDEXES"):
+            raise NotConfigured
+
+        ext = cls(crawler)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        return ext
+
+    def spider_opened(self, spider):
+        d = get_mongo_pool(self.crawler).run(ensure_indexes, db)
+        d.addCallback(lambda failed: failed and spider.logger.warning(f"@mongo_indexes -- not created: {failed}"))
+        d.addErrback(lambda failure: spider.logger.error(f"@mongo_indexes -- {failure.getErrorMessage()}"))
+        return d
@@ -0,0 +1,195 @@
+"""
+Compiled lxml extractors for pages parsed at high volume
+"""
+from lxml import etree, html
+from parsel import Selector
+from scrapy.http import TextResponse
+from sellgo_core.utils.parser import to_selector  # type:ignore
+
+FEEDBACK_PERIODS = ("30 days", "90 days", "12 months", "Lifetime")
+FEEDBACK_PERIOD_FIELDS = ("30_days", "90_days", "12_month", "lifetime")
+
+
+def build_tree(raw_html):
+    """Return the lxml root of `raw_html`.
+
+    A Scrapy response or Selector hands over its already parsed tree; str or bytes
+    are parsed the way `scrapy.Selector(text=...)` does.
+    """
+    if isinstance(raw_html, (Selector, TextResponse)):
+        return to_selector(raw_html).root
+    if isinstance(raw_html, str):
+        raw_html = raw_html.encode("utf-8")
+    body = raw_html.replace(b"\x00", b"").strip() or b"<html/>"
+    parser = html.HTMLParser(recover=True, encoding="utf-8", huge_tree=True)
+    root = etree.fromstring(body, parser=parser)
+    if root is None:
+        root = etree.fromstring(b"<html/>", parser=parser)
+    return root
+
+
+def first(values):
+    return values[0] if values else None
+
+
+def digits(text):
+    return "".join(filter(str.isdigit, text))
+
+
+class SellerAboutExtractor:
+    """Extract the seller fields of a seller "about" page.
+
+    The document is walked once to collect the anchor elements. Every field is
+    then read with a precompiled XPath relative to its anchor, so no query
+    re-scans the whole page.
+    """
+
+    TEXT = etree.XPath("descendant-or-self::text()", smart_strings=False)
+    LI = etree.XPath(".//li")
+    LI_SPAN = etree.XPath(".//li//span")
+    SUMMARY_HEADING = etree.XPath(".//th[@class='a-text-right']")
+    SUMMARY_RATING = etree.XPath(".//span[@class=$css_class]")
+    SUMMARY_ROW = etree.XPath(".//tr")
+    PRODUCTS_LINK = etree.XPath("a/@href", smart_strings=False)
+    FEEDBACK_ROW = etree.XPath(".//tr")
+    FEEDBACK_STARS = etree.XPath(".//span[@class='a-icon-alt']//text()", smart_strings=False)
+    FEEDBACK_COMMENT = etree.XPath("descendant-or-self::*[@id='-text']/text()", smart_strings=False)
+    FEEDBACK_RATER = etree.XPath(
+        ".//span[@class='a-size-base a-color-secondary feedback-rater']//text()", smart_strings=False
+    )
+
+    # (tag, id) of the anchors looked up by id
+    ID_ANCHORS = {
+        ("h1", "sellerName"): "seller_name",
+        ("img", "sellerLogo"): "seller_logo",
+        ("span", "seller-contact-phone"): "phone",
+        ("li", "products-link"): "products_link",
+        ("table", "feedback-summary-table"): "summary_tables",
+        ("table", "feedback-table"): "feedback_tables",
+    }
+    # (tag, class) of the anchors looked up by exact class attribute
+    CLASS_ANCHORS = {
+        ("ul", "a-unordered-list a-nostyle a-vertical"): "address_lists",
+        ("span", "a-icon-alt"): "seller_rating",
+    }
+    RATING_CLASSES = {
+        "positive": "a-color-success",
+        "neutral": "a-color-secondary",
+        "negative": "a-color-error",
+    }
+
+    def __call__(self, raw_html):
+        return self.extract(build_tree(raw_html))
+
+    def collect(self, root):
+        """Single pass over the document, grouping the anchor elements in document order."""
+        anchors = {name: [] for name in (*self.ID_ANCHORS.values(), *self.CLASS_ANCHORS.values(), "review_ratings")}
+
+        for element in root.iter(etree.Element):
+            tag = element.tag
+            name = self.ID_ANCHORS.get((tag, element.get("id")))
+            if name:
+                anchors[name].append(element)
+
+            name = self.CLASS_ANCHORS.get((tag, element.get("class")))
+            if name:
+                anchors[name].append(element)
+
+            if tag == "b":
+                anchors["review_ratings"].append(element)
+
+        return anchors
+
+    def first_text(self, elements):
+        for element in elements:
+            text = self.TEXT(element)
+            if text:
+                return text[0]
+        return None
+
+    def texts(self, elements):
+        return [text for element in elements for text in self.TEXT(element)]
+
+    def extract(self, root):
+        anchors = self.collect(root)
+        data = {
+            "seller_name": self.first_text(anchors["seller_name"]),
+            "seller_logo": first([img.get("src") for img in anchors["seller_logo"] if img.get("src") is not None]),
+            "phone": self.first_text(anchors["phone"]),
+        }
+
+        address_lists = anchors["address_lists"]
+        try:
+            business_name_span = [span for ul in address_lists for span in self.LI_SPAN(ul)][0]
+            data["business_name"] = self.TEXT(business_name_span)[1]
+        except IndexError:
+            data["business_name"] = None
+
+        business_addresses = self.texts(self.LI(address_lists[1])) if len(address_lists) > 1 else None
+        data.update(self.split_address(business_addresses))
+
+        seller_rating = self.first_text(anchors["seller_rating"])
+        if seller_rating:
+            seller_rating = seller_rating[: seller_rating.index("o")]
+        data["seller_rating"] = seller_rating
+
+        review_ratings = self.first_text(anchors["review_ratings"])
+        if review_ratings:
+            review_ratings = digits(review_ratings)
+        data["review_ratings"] = review_ratings
+
+        data.update(self.extract_summary(anchors["summary_tables"]))
+
+        inventory_link = first([href for li in anchors["products_link"] for href in self.PRODUCTS_LINK(li)])
+        data["inventory_link"] = f"https://www.amazon.com{inventory_link}" if inventory_link else ""
+
+        data["feedback"] = [
+            self.extract_feedback(row) for table in anchors["feedback_tables"] for row in self.FEEDBACK_ROW(table)
+        ]
+        return data
+
+    @staticmethod
+    def split_address(business_addresses):
+        fields = {"address": None, "city": None, "state": None, "zip_code": None, "country": None}
+        if business_addresses is None:
+            return fields
+
+        fields["address"] = " ".join(business_addresses[:-4])
+        for index, field in zip((-4, -3, -2, -1), ("city", "state", "zip_code", "country")):
+            if len(business_addresses) >= -index:
+                fields[field] = business_addresses[index]
+        return fields
+
+    def extract_summary(self, tables):
+        headings = [self.first_text([heading]) for table in tables for heading in self.SUMMARY_HEADING(table)]
+
+        data = {}
+        for rating_type, css_class in self.RATING_CLASSES.items():
+            ratings = [
+                self.first_text([span]) for table in tables for span in self.SUMMARY_RATING(table, css_class=css_class)
+            ]
+            by_period = list(zip(headings, ratings))
+            for index, (period, field) in enumerate(zip(FEEDBACK_PERIODS, FEEDBACK_PERIOD_FIELDS)):
+                heading, rating = by_period[index] if index < len(by_period) else (None, None)
+                data[f"{rating_type}_{field}"] = rating if heading == period else None
+
+        counts = dict.fromkeys(f"count_{field}" for field in FEEDBACK_PERIOD_FIELDS)
+        try:
+            rows = [row for table in tables for row in self.SUMMARY_ROW(table)]
+            count_row = self.TEXT(rows[4])
+            for index, key in enumerate(counts, start=1):
+                counts[key] = int(digits(count_row[index]))
+        except (IndexError, ValueError):
+            counts = dict.fromkeys(counts)
+        data.update(counts)
+        return data
+
+    def extract_feedback(self, row):
+        return {
+            "stars": first(self.FEEDBACK_STARS(row)),
+            "comment": first(self.FEEDBACK_COMMENT(row)),
+            "comment_by": first(self.FEEDBACK_RATER(row)),
+        }
+
+
+seller_about_extractor = SellerAboutExtractor()
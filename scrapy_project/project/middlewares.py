@@ -9,7 +9,7 @@ from scrapy.utils.python import global_object_name
 from scrapy.utils.response import response_status_message
 
 from .constants import Base as Constants
-from .db import db
+from .db import LeasedQueue, db, get_mongo_pool
 from .utils import (
     build_proxycrawl,
     build_proxycrawl_js,
@@ -214,7 +214,15 @@ def get_retry_request(
             update_values = update_on_fail["update_values"]
 
             collection = db[update_on_fail["collection"]]
-            collection.update_one({key_name: key_value}, {"$set": update_values})
+            d = get_mongo_pool(spider.crawler).run(
+                collection.update_one, {key_name: key_value}, LeasedQueue.done(update_values)
+            )
+            d.addErrback(
+                lambda failure: logger.error(
+                    f"@update_on_fail: {key_name} = {key_value} -- {failure.getErrorMessage()}",
+                    extra={"spider": spider},
+                )
+            )
 
         stats.inc_value(f"{stats_base_key}/max_reached")
 
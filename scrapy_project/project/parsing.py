@@ -0,0 +1,187 @@
+"""
+Pure page extraction functions, and the process pool that runs them off the reactor thread
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import re
+
+from sellgo_core.utils.parser import (  # type:ignore
+    parse_offer_listing,
+    to_selector,
+)
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+from .extractors import seller_about_extractor
+
+
+def inventory_asins(source):
+    response = to_selector(source)
+    products = response.xpath("//div[@class='a-section a-spacing-medium']")
+    asins = []
+    for product in products:
+        url = product.xpath(".//a[@class='a-link-normal a-text-normal']/@href").extract_first()
+
+        # Get the ASIN from the URL
+        asin_re = re.search(r"\b(dp/)\b", url)  # type: ignore
+        start_asin_index = asin_re.start() + 3
+
+        asin_partial = url[start_asin_index:]  # type: ignore
+        end_asin_index = asin_partial.rindex("/")
+
+        asin = asin_partial[:end_asin_index]
+        if asin:
+            asins.append(asin)
+
+    return asins
+
+
+def inventory_info(source):
+    response = to_selector(source)
+    ic = response.xpath("//span[@class='celwidget slot=UPPER template=RESULT_INFO_BAR widgetId=result-info-bar']")
+    ic = ic.xpath("//span[contains(text(),'result')]").css("::text").get()
+
+    inventory_count = 0
+    if ic and "over" in ic:
+        # index of `r` in `of over`
+        ic_index_r = ic.index("r") + 1
+        ic_partial = ic[ic_index_r:]
+
+        # index of `r` in `results`
+        ic_index_r = ic_partial.index("r")
+        inventory_count = ic_partial[:ic_index_r]
+
+        # extract integers
+    elif ic and "of" in ic:
+        # index of `f` in `of`
+        ic_index_f = ic.index("f") + 1
+        ic_partial = ic[ic_index_f:]
+
+        # index of `r` in `results`
+        ic_index_r = ic_partial.index("r")
+        inventory_count = ic_partial[:ic_index_r]
+
+        # extract integers
+        inventory_count = "".join(filter(str.isdigit, inventory_count))
+    elif ic:
+        # extract integers
+        inventory_count = "".join(filter(str.isdigit, ic))
+
+    if inventory_count != 0:
+        inventory_count = int(re.sub("[^0-9]", "", inventory_count))  # type: ignore
+
+    brands = (
+        response.xpath(
+            "//div[@id='brandsRefinements']"
+            "//span[@class='a-size-base a-color-base' and not(contains(text(), 'Brand'))]"
+        )
+        .css("::text")
+        .extract()
+    )
+    asins = inventory_asins(response)
+    data = {
+        "inventory_count": inventory_count,
+        "brands": brands,
+        "asins": asins,
+    }
+    return data
+
+
+def inventory_pagination(source):
+    """Return ``(current_page, max_page_num, button_pages)`` of a seller inventory page."""
+    response = to_selector(source)
+    pages = response.xpath("//ul[@class='a-pagination']")
+    current_page = pages.xpath("//li[@class='a-selected']").css("::text").get()
+    current_page = int(current_page) if current_page else None
+
+    max_page_num = "".join(pages.xpath("//li[@class='a-disabled']").css("::text").extract())
+    max_page_num = re.sub(r"\D", "", max_page_num)
+
+    button_pages = pages.xpath("//li[@class='a-normal']").css("::text").extract()
+    button_pages = list(map(int, button_pages))
+    return current_page, max_page_num, button_pages
+
+
+def inventory_page(source):
+    """Return ``(inventory_info, inventory_pagination)`` of a seller inventory page, parsed once."""
+    response = to_selector(source)
+    return inventory_info(response), inventory_pagination(response)
+
+
+def offer_listing(source, asin):
+    """Return ``(sellers, pinned_seller, total_offers)`` of an offer-listing page, parsed once."""
+    response = to_selector(source)
+    sellers, pinned_seller = parse_offer_listing(asin, response)
+    total_offers = response.css("#aod-total-offer-count").xpath("@value").get()
+    return sellers, pinned_seller, int(total_offers) if total_offers else 0
+
+
+def seller_about(source):
+    return seller_about_extractor(source)
+
+
+class ParserPool:
+    """Run page extraction functions in a pool of worker processes.
+
+    Each Scrapy job has a single reactor thread, so parsing in the callbacks caps
+    a crawl at one core. `run` sends a function of this module and the page text
+    to a worker and returns a Deferred of its plain result. At most ``max_pending``
+    pages are queued or parsing; further calls wait on a ``DeferredSemaphore``.
+    """
+
+    def __init__(self, max_workers=None, max_pending=100):
+        self.max_workers = max_workers or os.cpu_count()
+        self.semaphore = defer.DeferredSemaphore(max_pending)
+        self.executor = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            max_workers=settings.getint("PARSER_POOL_WORKERS") or None,
+            max_pending=settings.getint("PARSER_POOL_MAX_PENDING", 100),
+        )
+
+    def start(self):
+        from twisted.internet import reactor
+
+        if self.executor is None:
+            # spawned, not forked: the workers must not inherit the reactor and its threads
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            reactor.addSystemEventTrigger("before", "shutdown", self.stop)
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def run(self, func, *args):
+        self.start()
+        return self.semaphore.run(self._submit, func, *args)
+
+    def _submit(self, func, *args):
+        from twisted.internet import reactor
+
+        d = defer.Deferred()
+
+        def done(future):
+            try:
+                result = future.result()
+            except BaseException:
+                reactor.callFromThread(d.errback, Failure())
+            else:
+                reactor.callFromThread(d.callback, result)
+
+        self.executor.submit(func, *args).add_done_callback(done)
+        return d
+
+
+def get_parser_pool(crawler):
+    """Return the `ParserPool` of the crawler, created on first use, or None unless PARSER_POOL_ENABLED."""
+    if not crawler.settings.getbool("PARSER_POOL_ENABLED"):
+        return None
+    if not hasattr(crawler, "parser_pool"):
+        crawler.parser_pool = ParserPool.from_settings(crawler.settings)
+    return crawler.parser_pool
@@ -17,13 +17,89 @@ from project.constants import Flag  # type: ignore
 from pymongo import UpdateOne
 from redis import Redis
 from scrapy.utils.project import get_project_settings
+from twisted.internet import defer, task
 
+from .cache import SellerIdCache
 from .constants import AmazonMerchantAutoStats
-from .db import db
+from .db import BulkWriter, LeasedQueue, db, get_mongo_pool
+from .exporters import StreamingCsvExporter, to_records
 from .spiders.amazon_merchant import AmazonMerchantSpider
 from .spiders.amazon_merchant_autonomous import AmazonMerchantAutonomousSpider
 from .utils import S3, utc_datetime
 
+SELLERS_2A_FIELDS = [
+    "inventory_link",
+    "seller_link",
+    "asin",
+    "seller_id",
+    "seller_name",
+    "seller_logo",
+    "business_name",
+    "address",
+    "city",
+    "state",
+    "zip_code",
+    "country",
+    "phone",
+    "seller_rating",
+    "review_ratings",
+    "positive_30_days",
+    "positive_90_days",
+    "positive_12_month",
+    "positive_lifetime",
+    "neutral_30_days",
+    "neutral_90_days",
+    "neutral_12_month",
+    "neutral_lifetime",
+    "negative_30_days",
+    "negative_90_days",
+    "negative_12_month",
+    "negative_lifetime",
+    "count_30_days",
+    "count_90_days",
+    "count_12_month",
+    "count_lifetime",
+    "launched",
+    "marketplace_id",
+    "inventory_count",
+    "brands",
+    "feedback",
+    "created_at",
+]
+
+SELLERS_2B_FIELDS = [
+    "seller_id",
+    "inventory_count",
+    "asins",
+    "seller_link",
+    "inventory_link",
+    "marketplace_id",
+    "created_at",
+]
+
+SELLER_INVENTORY_FIELDS = [
+    "inventory_link",
+    "seller_link",
+    "seller_id",
+    "asin",
+    "inventory_count",
+    "product_name",
+    "product_url",
+    "current_price",
+    "original_price",
+    "best_seller",
+    "amazon_choice",
+    "reviews_count",
+    "review_stars",
+    "save_and_subscribe",
+    "variation",
+    "category",
+    "marketplace_id",
+    "fba",
+    "fbm",
+    "created_at",
+]
+
 
 class Common:
     def __init__(self):
@@ -57,6 +133,12 @@ class Common:
 
 
 class ProgressPipeline(Common):
+    """Report the job progress to Kafka.
+    Progress is coalesced: a message goes out every `PROGRESS_INTERVAL` seconds or `PROGRESS_ITEMS` items, whichever
+    comes first, with the state of the latest item, and a final one on close. Messages are delivered by the producer's
+    background sender; only the final message is flushed.
+    """
+
     def __init__(self):
         self.create_kafka_producer()
         self.redis = None
@@ -67,46 +149,61 @@ class ProgressPipeline(Common):
 
         # Number of Items that has been scraped
         self.scraped_items_len = 0
+        self.total_expected_len = 0
 
-    def open_spider(self, _):
+        self.items_count = 0
+        self.reported_count = 0
+        self.emit_every = 0
+        self.emit_loop = None
+
+    def open_spider(self, spider):
         settings = get_project_settings()
 
         redis_host = settings["REDIS_HOST"]
         self.redis = Redis(host=redis_host)  # type: ignore
 
+        self.emit_every = spider.crawler.settings.getint("PROGRESS_ITEMS", 1000)
+        self.emit_loop = task.LoopingCall(self.emit)
+        self.emit_loop.start(spider.crawler.settings.getfloat("PROGRESS_INTERVAL", 5), now=False)
+
+    def close_spider(self, _):
+        if self.emit_loop and self.emit_loop.running:
+            self.emit_loop.stop()
+
+        # Pipelines close in reverse order, so the final progress is flushed before the ones set before
+        # this one report the job finished
+        self.emit()
+        self.producer.flush()
+
     def process_item(self, item, spider):
         super().process_item(item, spider)
 
-        if spider._total_expected_len == 0:
-            self.producer.send(
-                f"{self.job_id}-job",
-                {
-                    "project": self.project,
-                    "spider": self.spider,
-                    "job_id": self.job_id,
-                    "status": "running",
-                    "flag": Flag.DONT_MONITOR_PROGRESS,
-                    "total_expected_len": spider._total_expected_len,
-                    "scraped_items_len": self.scraped_items_len,
-                },
-            )
-        else:
-            self.producer.send(
-                f"{self.job_id}-job",
-                {
-                    "project": self.project,
-                    "spider": self.spider,
-                    "job_id": self.job_id,
-                    "status": "running",
-                    "flag": Flag.MONITOR_PROGRESS,
-                    "total_expected_len": spider._total_expected_len,
-                    "scraped_items_len": self.scraped_items_len,
-                },
-            )
-        self.producer.flush()
+        self.total_expected_len = spider._total_expected_len
+        self.items_count += 1
+        if self.emit_every and self.items_count - self.reported_count >= self.emit_every:
+            self.emit()
 
         return item
 
+    def emit(self):
+        """Send the progress, unless no item came since the last message."""
+        if self.items_count == self.reported_count:
+            return
+        self.reported_count = self.items_count
+
+        self.producer.send(
+            f"{self.job_id}-job",
+            {
+                "project": self.project,
+                "spider": self.spider,
+                "job_id": self.job_id,
+                "status": "running",
+                "flag": Flag.MONITOR_PROGRESS if self.total_expected_len else Flag.DONT_MONITOR_PROGRESS,
+                "total_expected_len": self.total_expected_len,
+                "scraped_items_len": self.scraped_items_len,
+            },
+        )
+
 
 class SellersSpiderPipeline(Common, S3):
     def __init__(self):
@@ -117,10 +214,29 @@ class SellersSpiderPipeline(Common, S3):
         self.scraped_items_len = None
         self.data = []
 
+        # Set when STREAMING_EXPORT_ENABLED, replacing `data`
+        self.exporters = None
+
+    def open_spider(self, spider):
+        if spider.crawler.settings.getbool("STREAMING_EXPORT_ENABLED"):
+            max_memory = spider.crawler.settings.getint("STREAMING_EXPORT_MAX_MEMORY", 8 * 1024 * 1024)
+            self.exporters = {
+                "sellers_2a": StreamingCsvExporter(
+                    SELLERS_2A_FIELDS, key=("asin", "seller_id"), keep_records=spider.get_raw, max_memory=max_memory
+                ),
+                "sellers_2b": StreamingCsvExporter(
+                    SELLERS_2B_FIELDS, key=("seller_id",), keep_records=spider.get_raw, max_memory=max_memory
+                ),
+            }
+
     def process_item(self, item, spider):
         super().process_item(item, spider)
 
-        self.data.append(item)
+        if self.exporters:
+            for exporter in self.exporters.values():
+                exporter.export_item(item)
+        else:
+            self.data.append(item)
         return item
 
     @staticmethod
@@ -129,6 +245,8 @@ class SellersSpiderPipeline(Common, S3):
 
     @property
     def output(self):
+        if self.exporters:
+            return self.exporters["sellers_2a"]
         return self.data
 
     def output_dataframe(self):
@@ -138,54 +256,12 @@ class SellersSpiderPipeline(Common, S3):
         if df.empty:
             return None, None
 
-        df_2a = df[
-            [
-                "inventory_link",
-                "seller_link",
-                "asin",
-                "seller_id",
-                "seller_name",
-                "seller_logo",
-                "business_name",
-                "address",
-                "city",
-                "state",
-                "zip_code",
-                "country",
-                "phone",
-                "seller_rating",
-                "review_ratings",
-                "positive_30_days",
-                "positive_90_days",
-                "positive_12_month",
-                "positive_lifetime",
-                "neutral_30_days",
-                "neutral_90_days",
-                "neutral_12_month",
-                "neutral_lifetime",
-                "negative_30_days",
-                "negative_90_days",
-                "negative_12_month",
-                "negative_lifetime",
-                "count_30_days",
-                "count_90_days",
-                "count_12_month",
-                "count_lifetime",
-                "launched",
-                "marketplace_id",
-                "inventory_count",
-                "brands",
-                "feedback",
-                "created_at",
-            ]
-        ]
+        df_2a = df[SELLERS_2A_FIELDS]
         df_2a = df_2a.drop_duplicates(["asin", "seller_id"], ignore_index=True)  # type: ignore
         df_2a["created_at"] = df_2a["created_at"].apply(datetime.datetime.isoformat)  # type: ignore
         df_2a["created_at"] = df_2a["created_at"].astype(str)  # type: ignore
 
-        df_2b = df[
-            ["seller_id", "inventory_count", "asins", "seller_link", "inventory_link", "marketplace_id", "created_at"]
-        ]
+        df_2b = df[SELLERS_2B_FIELDS]
         df_2b = df_2b.drop_duplicates(["seller_id"], ignore_index=True)  # type: ignore
 
         df_2b["created_at"] = df_2b["created_at"].apply(datetime.datetime.isoformat)  # type: ignore
@@ -199,20 +275,12 @@ class SellersSpiderPipeline(Common, S3):
         df_2a_filename = f"{dt_now}-sellers_2a.csv"
         df_2b_filename = f"{dt_now}-sellers_2b.csv"
 
-        self.upload_dataframe_to_s3(df_2a, df_2a_filename, self.bucket_name)
-        self.upload_dataframe_to_s3(df_2b, df_2b_filename, self.bucket_name)
+        self.upload_output_to_s3(df_2a, df_2a_filename, self.bucket_name)
+        self.upload_output_to_s3(df_2b, df_2b_filename, self.bucket_name)
 
         # Callback
-        client = self.create_client()
-        df_2a_url = client.generate_presigned_url(
-            ClientMethod="get_object",
-            Params={"Bucket": self.bucket_name, "Key": df_2a_filename},
-        )
-
-        df_2b_url = client.generate_presigned_url(
-            ClientMethod="get_object",
-            Params={"Bucket": self.bucket_name, "Key": df_2b_filename},
-        )
+        df_2a_url = self.presigned_url(df_2a_filename, self.bucket_name)
+        df_2b_url = self.presigned_url(df_2b_filename, self.bucket_name)
 
         return df_2a_url, df_2b_url
 
@@ -232,8 +300,8 @@ class SellersSpiderPipeline(Common, S3):
         self._notify_kafka_finished(data)
 
         if spider.get_raw and self.output:
-            df_2a_raw = df_2a.to_dict(orient="records")  # type: ignore
-            df_2b_raw = df_2b.to_dict(orient="records")  # type: ignore
+            df_2a_raw = to_records(df_2a)
+            df_2b_raw = to_records(df_2b)
 
             data["data"]["raw"] = [{"sellers_2a": df_2a_raw, "sellers_2b": df_2b_raw}]
         elif spider.get_raw and not self.output:
@@ -254,13 +322,20 @@ class SellersSpiderPipeline(Common, S3):
     def close_spider(self, spider):
         df_2a, df_2b = None, None
 
-        if self.output:
+        if self.exporters:
+            df_2a, df_2b = self.exporters["sellers_2a"], self.exporters["sellers_2b"]
+            self.scraped_items_len = len(df_2a)
+        elif self.output:
             df_2a, df_2b = self.output_dataframe()
 
             # Can't rely on per `yield` count. Because of post-processing
             self.scraped_items_len = len(df_2a.index)  # type: ignore
 
-        self._callback(spider, df_2a, df_2b)
+        try:
+            self._callback(spider, df_2a, df_2b)
+        finally:
+            for exporter in (self.exporters or {}).values():
+                exporter.close()
 
 
 class SellerInventoryPipeline(Common, S3):
@@ -271,41 +346,36 @@ class SellerInventoryPipeline(Common, S3):
         self.bucket_name = os.getenv("SELLER_INVENTORY_BUCKET", "seller-inventory-data")
         self.result = []
 
+        # Set when STREAMING_EXPORT_ENABLED, replacing `result`
+        self.exporter = None
+
+    def open_spider(self, spider):
+        if spider.crawler.settings.getbool("STREAMING_EXPORT_ENABLED"):
+            self.exporter = StreamingCsvExporter(
+                SELLER_INVENTORY_FIELDS,
+                keep_records=spider.get_raw,
+                max_memory=spider.crawler.settings.getint("STREAMING_EXPORT_MAX_MEMORY", 8 * 1024 * 1024),
+            )
+
     def process_item(self, item, spider):
         super().process_item(item, spider)
-        self.result.append(item)
+        if self.exporter is not None:
+            self.exporter.export_item(item)
+        else:
+            self.result.append(item)
         return item
 
     @property
     def output(self):
+        if self.exporter is not None:
+            return self.exporter
         return self.result
 
     def output_dataframe(self):
+        if self.exporter is not None:
+            return self.exporter
         if self.output:
-            df = pd.DataFrame(self.output)[
-                [
-                    "inventory_link",
-                    "seller_link",
-                    "seller_id",
-                    "asin",
-                    "inventory_count",
-                    "product_name",
-                    "product_url",
-                    "current_price",
-                    "original_price",
-                    "best_seller",
-                    "amazon_choice",
-                    "reviews_count",
-                    "review_stars",
-                    "save_and_subscribe",
-                    "variation",
-                    "category",
-                    "marketplace_id",
-                    "fba",
-                    "fbm",
-                    "created_at",
-                ]
-            ]
+            df = pd.DataFrame(self.output)[SELLER_INVENTORY_FIELDS]
             df = df.replace({np.nan: None})
             df["created_at"] = df["created_at"].apply(datetime.datetime.isoformat)  # type: ignore
             df["created_at"] = df["created_at"].astype(str)  # type: ignore
@@ -315,13 +385,9 @@ class SellerInventoryPipeline(Common, S3):
         dt_now = datetime.datetime.now(datetime.timezone.utc).isoformat()
         df_filename = f"seller-inventory-{dt_now}.csv"
 
-        self.upload_dataframe_to_s3(df, df_filename, self.bucket_name)
+        self.upload_output_to_s3(df, df_filename, self.bucket_name)
 
-        client = self.create_client()
-        df_url = client.generate_presigned_url(
-            ClientMethod="get_object",
-            Params={"Bucket": self.bucket_name, "Key": df_filename},
-        )
+        df_url = self.presigned_url(df_filename, self.bucket_name)
 
         return df_url
 
@@ -332,7 +398,7 @@ class SellerInventoryPipeline(Common, S3):
         df = self.output_dataframe()
 
         # Get actual lenght
-        self.scraped_items_len = len(df.index) if self.output else 0
+        self.scraped_items_len = len(df) if self.output else 0
 
         data = {
             "project": project_name,
@@ -346,7 +412,7 @@ class SellerInventoryPipeline(Common, S3):
         self._notify_kafka_finished(data)
 
         if spider.get_raw and self.output:
-            df_raw = df.to_dict(orient="records")  # type: ignore
+            df_raw = to_records(df)
             data["data"]["raw"] = df_raw
         elif spider.get_raw and not self.output:
             data["data"]["raw"] = None
@@ -364,31 +430,44 @@ class SellerInventoryPipeline(Common, S3):
         )
 
     def close_spider(self, spider):
-        self._callback(spider)
+        try:
+            self._callback(spider)
+        finally:
+            if self.exporter is not None:
+                self.exporter.close()
 
 
 class MongoPipeline(Common):
     """Save data to MongoDB.
     Note: This pipeline should be a top priority from any other custom pipelines
+
+    Writes run in the crawler's `MongoThreadPool`, so the returned Deferreds keep
+    the reactor free while MongoDB is slow.
     """
 
     def process_item(self, item, spider):
         super().process_item(item, spider)
         item["created_at"] = utc_datetime()
+        mongo_pool = get_mongo_pool(spider.crawler)
 
         if AmazonMerchantSpider.name == self.spider_name:
             collection = db[AmazonMerchantSpider.name]
-            collection.update_one({"seller_id": item["seller_id"]}, {"$set": item}, upsert=True)
+            d = mongo_pool.run(collection.update_one, {"seller_id": item["seller_id"]}, {"$set": item}, upsert=True)
         elif AmazonMerchantAutonomousSpider.name == self.spider_name:
             return item
         else:
             spider.logger.info(f"@mongo_pipeline: spider_name = {self.spider_name}")
             collection = db[self.spider_name]
-            collection.insert_one(copy.deepcopy(item))
+            d = mongo_pool.run(collection.insert_one, copy.deepcopy(item))
 
-        return item
+        d.addCallback(lambda _: item)
+        return d
 
     def close_spider(self, spider):
+        return get_mongo_pool(spider.crawler).run(self.release_proxies, spider)
+
+    @staticmethod
+    def release_proxies(spider):
         multi_token = os.getenv("PROXY_MULTI_TOKEN", False)
         if multi_token:
             collection = db["proxies"]
@@ -404,15 +483,94 @@ class MongoPipeline(Common):
 
 
 class AmazonMerchantAutonomousPipeline(MongoPipeline):
+    """Save the autonomous crawl results to MongoDB.
+    Writes are buffered in a `BulkWriter` and flushed every `MONGO_BULK_WRITE_SIZE` operations,
+    every `MONGO_BULK_WRITE_INTERVAL` seconds and on close.
+    """
+
     def __init__(self):
         super().__init__()
+        self.mongo_pool = None
+        self.bulk_writer = None
+        self.flush_loop = None
+        self.seller_id_cache = None
+
+    def open_spider(self, spider):
+        settings = spider.crawler.settings
+
+        self.mongo_pool = get_mongo_pool(spider.crawler)
+        self.bulk_writer = BulkWriter(
+            db,
+            max_size=settings.getint("MONGO_BULK_WRITE_SIZE", 1000),
+            stats=spider.crawler.stats,
+            pool=self.mongo_pool,
+        )
+        # The spider flushes before querying for pending work on `spider_idle`
+        spider.bulk_writer = self.bulk_writer
+
+        self.flush_loop = task.LoopingCall(self.bulk_writer.flush)
+        self.flush_loop.start(settings.getfloat("MONGO_BULK_WRITE_INTERVAL", 5), now=False)
+
+        # The crawl starts once the cache is warm
+        self.seller_id_cache = SellerIdCache.from_settings(settings)
+        return self.mongo_pool.run(self.load_seller_ids, self.seller_id_cache)
+
+    def close_spider(self, spider):
+        if self.flush_loop and self.flush_loop.running:
+            self.flush_loop.stop()
+
+        d = self.bulk_writer.close()
+        d.addCallback(lambda _: super(AmazonMerchantAutonomousPipeline, self).close_spider(spider))
+        return d
 
     def process_item(self, item, spider):
         super().process_item(item, spider)
-        yield_type = item.get("yield_type")
 
-        todo_asin_bulk_write_operations = []
-        todo_seller_id_bulk_operations = []
+        known_seller_ids, probable_seller_ids = [], []
+        if item.get("yield_type") == "from_parse_via_asin" and item.get("seller_ids"):
+            known_seller_ids, probable_seller_ids, new_seller_ids = self.seller_id_cache.classify(item["seller_ids"])
+
+            stats = spider.crawler.stats
+            stats.inc_value(AmazonMerchantAutoStats.SELLER_CACHE_KNOWN_COUNT, len(known_seller_ids))
+            stats.inc_value(AmazonMerchantAutoStats.SELLER_CACHE_PROBABLE_COUNT, len(probable_seller_ids))
+            stats.inc_value(AmazonMerchantAutoStats.SELLER_CACHE_NEW_COUNT, len(new_seller_ids))
+
+        # MongoDB is only asked about the cache's probable hits
+        if probable_seller_ids:
+            d = self.mongo_pool.run(self.find_existing_seller_ids, probable_seller_ids)
+        else:
+            d = defer.succeed(([], []))
+
+        d.addCallback(lambda existing_seller_ids: (known_seller_ids, *existing_seller_ids))
+
+        d.addCallback(self.queue_operations, item, spider)
+        d.addCallback(lambda _: self.bulk_writer.flush_if_full())
+        d.addCallback(lambda _: item)
+        return d
+
+    @staticmethod
+    def load_seller_ids(seller_id_cache):
+        for collection_name in ("amazon_merchant_autonomous_todo_seller_id", "amazon_merchant"):
+            for seller in db[collection_name].find({}, {"seller_id": 1, "_id": 0}):
+                if seller.get("seller_id"):
+                    seller_id_cache.add(seller["seller_id"])
+
+    @staticmethod
+    def find_existing_seller_ids(seller_ids):
+        collection = db["amazon_merchant_autonomous_todo_seller_id"]
+        seller_exists = collection.find({"seller_id": {"$in": seller_ids}}, {"seller_id": 1})
+        seller_exists_on_todo = [seller["seller_id"] for seller in seller_exists]
+        new_seller_ids = list(set(seller_ids) - set(seller_exists_on_todo))
+
+        collection = db["amazon_merchant"]
+        seller_exists = collection.find({"seller_id": {"$in": new_seller_ids}}, {"seller_id": 1})
+        seller_exists_merchant = [seller["seller_id"] for seller in seller_exists]
+
+        return seller_exists_on_todo, seller_exists_merchant
+
+    def queue_operations(self, existing_seller_ids, item, spider):
+        seller_exists_on_cache, seller_exists_on_todo, seller_exists_merchant = existing_seller_ids
+        yield_type = item.get("yield_type")
 
         # Insert ASINs from inventory to DB
         if yield_type == "from_parse_inventory_info" and item.get("seller_id"):
@@ -426,7 +584,8 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                     except ValueError:
                         pass
 
-                    todo_asin_bulk_write_operations.append(
+                    self.bulk_writer.add(
+                        "amazon_product",
                         UpdateOne(
                             {"asin": asin},
                             {
@@ -440,32 +599,37 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                                 }
                             },
                             upsert=True,
-                        )
+                        ),
                     )
 
-            collection = db["amazon_merchant"]
-            collection.update_one({"seller_id": item.get("seller_id")}, {"$set": item}, upsert=True)
-
-            todo_seller_id_bulk_operations.append(
+            self.bulk_writer.add(
+                "amazon_merchant",
+                UpdateOne({"seller_id": item.get("seller_id")}, {"$set": dict(item)}, upsert=True),
+            )
+            self.bulk_writer.add(
+                "amazon_merchant_autonomous_todo_seller_id",
                 UpdateOne(
                     {"seller_id": item.get("seller_id")},
-                    {"$set": {"pending": False, "last_scraped": utc_datetime()}},
-                )
+                    LeasedQueue.done({"last_scraped": utc_datetime()}),
+                ),
             )
+            if item.get("seller_id"):
+                self.seller_id_cache.add(item["seller_id"])
             spider.crawler.stats.inc_value(AmazonMerchantAutoStats.INSERTED_SELLER_COUNT)
 
         elif yield_type == "from_parse_via_asin":
             seller_ids = item.get("seller_ids")
             if seller_ids:
-                collection = db["amazon_merchant_autonomous_todo_seller_id"]
-                seller_exists = collection.find({"seller_id": {"$in": seller_ids}}, {"seller_id": 1})
-                seller_exists_on_todo = [seller["seller_id"] for seller in seller_exists]
-                new_seller_ids = list(set(seller_ids) - set(seller_exists_on_todo))
-
-                collection = db["amazon_merchant"]
-                seller_exists = collection.find({"seller_id": {"$in": new_seller_ids}}, {"seller_id": 1})
-                seller_exists_merchant = [seller["seller_id"] for seller in seller_exists]
-                new_seller_ids = list(set(new_seller_ids) - set(seller_exists_merchant))
+                existing = set(seller_exists_on_cache + seller_exists_on_todo + seller_exists_merchant)
+                self.seller_id_cache.update(seller_exists_on_todo + seller_exists_merchant)
+
+                # Ids queued by another item since `classify` are already in the exact set
+                new_seller_ids = [
+                    seller_id
+                    for seller_id in dict.fromkeys(seller_ids)
+                    if seller_id not in existing and seller_id not in self.seller_id_cache.recent
+                ]
+                self.seller_id_cache.update(new_seller_ids)
 
                 if not new_seller_ids:
                     spider.crawler.stats.inc_value(AmazonMerchantAutoStats.ASINS_WITH_ZERO_NEW_SELLERS_COUNT)
@@ -477,8 +641,9 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                     f"ASIN: {item.get('asin')} --\n"
                     f"private_label = {item.get('private_label')}\n"
                     f"received seller_ids = {seller_ids}\n"
+                    f"seller_exists_on_cache = {seller_exists_on_cache}\n"
                     f"seller_exists_on_todo = {seller_exists_on_todo}\n"
-                    f"seller_exists_merchant (seller_ids - seller_exists_on_todo) = {seller_exists_merchant}\n"
+                    f"seller_exists_merchant (probable - seller_exists_on_todo) = {seller_exists_merchant}\n"
                     f"new_seller_ids = {new_seller_ids}"
                 )
 
@@ -491,11 +656,14 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                             AmazonMerchantAutoStats.INSERTED_NON_PRIVATE_LABEL_SELLER_ID_COUNT
                         )
 
-                    todo_seller_id_bulk_operations.append(
+                    self.bulk_writer.add(
+                        "amazon_merchant_autonomous_todo_seller_id",
+                        # `new` only means unknown to this process: a seller inserted since by another
+                        # crawl or spider is left as it is
                         UpdateOne(
                             {"seller_id": seller_id},
                             {
-                                "$set": {
+                                "$setOnInsert": {
                                     "seller_id": seller_id,
                                     "private_label": item.get("private_label"),
                                     "pending": True,
@@ -504,7 +672,7 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                                 }
                             },
                             upsert=True,
-                        )
+                        ),
                     )
             else:
                 spider.crawler.stats.inc_value(AmazonMerchantAutoStats.ASINS_WITH_ZERO_NEW_SELLERS_COUNT)
@@ -512,21 +680,21 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                     AmazonMerchantAutoStats.ASINS_WITH_ZERO_NEW_SELLERS_PAGE_COUNT, item.get("num_page", 0)
                 )
 
-            todo_asin_bulk_write_operations.append(
+            self.bulk_writer.add(
+                "amazon_product",
                 UpdateOne(
                     {"asin": item.get("asin")},
-                    {
-                        "$set": {
+                    LeasedQueue.done(
+                        {
                             "asin": item.get("asin"),
                             "num_offers": item.get("num_offers"),
                             "num_unique_sellers": item.get("num_unique_sellers"),
                             "private_label": item.get("private_label"),
-                            "pending": False,
                             "last_scraped": utc_datetime(),
                             "created_at": utc_datetime(),
                         }
-                    },
-                )
+                    ),
+                ),
             )
         elif yield_type == "parse_next_inventory_page" and item.get("asins"):
             asins = item.get("asins")
@@ -538,7 +706,8 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                 except ValueError:
                     pass
 
-                todo_asin_bulk_write_operations.append(
+                self.bulk_writer.add(
+                    "amazon_product",
                     UpdateOne(
                         {"asin": asin},
                         {
@@ -552,15 +721,5 @@ class AmazonMerchantAutonomousPipeline(MongoPipeline):
                             }
                         },
                         upsert=True,
-                    )
+                    ),
                 )
-
-        if todo_asin_bulk_write_operations:
-            collection = db["amazon_product"]
-            collection.bulk_write(todo_asin_bulk_write_operations, ordered=False)
-
-        if todo_seller_id_bulk_operations:
-            collection = db["amazon_merchant_autonomous_todo_seller_id"]
-            collection.bulk_write(todo_seller_id_bulk_operations, ordered=False)
-
-        return item
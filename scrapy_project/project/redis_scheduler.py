@@ -0,0 +1,252 @@
+"""
+Redis-backed scheduler and request fingerprint set, shared by every instance of a spider
+"""
+import os
+import pickle
+import socket
+import time
+import weakref
+
+from redis import Redis
+from scrapy import signals
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.utils.misc import load_object
+from twisted.internet import task
+
+try:
+    from scrapy.utils.request import request_from_dict
+
+    def request_to_dict(request, spider):
+        return request.to_dict(spider=spider)
+
+except ImportError:  # Scrapy < 2.6
+    from scrapy.utils.reqser import request_from_dict, request_to_dict
+
+
+def get_redis(settings):
+    """Redis connection of REDIS_URL, or else of REDIS_HOST."""
+    return Redis.from_url(settings.get("REDIS_URL") or f"redis://{settings['REDIS_HOST']}")
+
+
+def redis_key(settings, spider, suffix):
+    return f"{settings.get('REDIS_SCHEDULER_KEY', '{spider}').format(spider=spider.name)}:{suffix}"
+
+
+def request_fingerprint(crawler, request):
+    # Scrapy >= 2.7 has a per crawler fingerprinter
+    fingerprinter = getattr(crawler, "request_fingerprinter", None)
+    if fingerprinter is not None:
+        return fingerprinter.fingerprint(request).hex()
+
+    from scrapy.utils.request import request_fingerprint as fingerprint
+
+    return fingerprint(request)
+
+
+class RedisDupeFilter(BaseDupeFilter):
+    """Request fingerprint set in Redis, so a request seen by one instance of a spider is filtered on every other."""
+
+    def __init__(self, server, key=None, crawler=None, debug=False):
+        self.server = server
+        self.key = key
+        self.crawler = crawler
+        self.debug = debug
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(get_redis(crawler.settings), crawler=crawler, debug=crawler.settings.getbool("DUPEFILTER_DEBUG"))
+
+    def open(self):
+        if self.key is None:
+            self.key = redis_key(self.crawler.settings, self.crawler.spider, "dupefilter")
+
+    def clear(self):
+        self.server.delete(self.key)
+
+    def request_seen(self, request):
+        # SADD answers 0 when the fingerprint is already in the set
+        return not self.server.sadd(self.key, request_fingerprint(self.crawler, request))
+
+    def log(self, request, spider):
+        if self.debug:
+            spider.logger.debug(f"Filtered duplicate request: {request}")
+        spider.crawler.stats.inc_value("dupefilter/filtered")
+
+
+class RedisRequestQueue:
+    """FIFO queue of serialized requests in Redis, drained by several consumers.
+
+    `pop` atomically moves a request to the claimed list of its consumer, and
+    `ack` drops it once handled. A consumer keeps a heartbeat key alive while it
+    runs; when the key expires, `recover` hands its claimed requests back to the
+    queue, so the requests of a crashed instance are crawled by another one.
+    """
+
+    def __init__(self, server, key, consumer, claim_timeout=300):
+        self.server = server
+        self.key = key
+        self.consumer = consumer
+        self.claim_timeout = claim_timeout
+
+    def claimed_key(self, consumer):
+        return f"{self.key}:claimed:{consumer}"
+
+    def heartbeat_key(self, consumer):
+        return f"{self.key}:consumer:{consumer}"
+
+    def __len__(self):
+        return self.server.llen(self.key)
+
+    def push(self, data):
+        self.server.lpush(self.key, data)
+
+    def pop(self):
+        return self.server.rpoplpush(self.key, self.claimed_key(self.consumer))
+
+    def ack(self, data):
+        self.server.lrem(self.claimed_key(self.consumer), 1, data)
+
+    def heartbeat(self):
+        pipe = self.server.pipeline()
+        pipe.sadd(f"{self.key}:consumers", self.consumer)
+        pipe.set(self.heartbeat_key(self.consumer), int(time.time()), ex=self.claim_timeout)
+        pipe.execute()
+
+    def release(self, consumer=None):
+        """Move the claimed requests of `consumer`, this one by default, back to the queue. Returns how many."""
+        consumer = consumer or self.consumer
+        released = 0
+        while self.server.rpoplpush(self.claimed_key(consumer), self.key) is not None:
+            released += 1
+        return released
+
+    def recover(self):
+        """Release the claims of the consumers whose heartbeat expired. Returns how many requests were released."""
+        released = 0
+        for consumer in self.server.smembers(f"{self.key}:consumers"):
+            consumer = consumer.decode()
+            if consumer != self.consumer and not self.server.exists(self.heartbeat_key(consumer)):
+                released += self.release(consumer)
+                self.server.srem(f"{self.key}:consumers", consumer)
+        return released
+
+    def leave(self):
+        self.server.delete(self.claimed_key(self.consumer), self.heartbeat_key(self.consumer))
+        self.server.srem(f"{self.key}:consumers", self.consumer)
+
+    def clear(self):
+        self.server.delete(self.key)
+
+
+class RedisScheduler:
+    """Scheduler keeping the frontier in Redis, so several instances of a spider, on any host, drain one queue.
+
+    Enable it with::
+
+        SCHEDULER = "project.redis_scheduler.RedisScheduler"
+        DUPEFILTER_CLASS = "project.redis_scheduler.RedisDupeFilter"
+
+    Every instance pushes the requests it schedules to the shared queue and pops
+    the next one from it. A popped request is claimed by the instance until it
+    leaves the downloader; the claims of an instance that stops without
+    finishing go back to the queue, when it closes or once its heartbeat expires.
+    Requests are served first in, first out, whatever their priority.
+    """
+
+    def __init__(
+        self, server, dupefilter, key=None, consumer=None, claim_timeout=300, flush_on_start=False, stats=None
+    ):
+        self.server = server
+        self.df = dupefilter
+        self.key = key
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}"
+        self.claim_timeout = claim_timeout
+        self.flush_on_start = flush_on_start
+        self.stats = stats
+
+        self.queue = None
+        self.spider = None
+        self.claims = weakref.WeakKeyDictionary()
+        self.heartbeat = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        dupefilter_cls = load_object(settings["DUPEFILTER_CLASS"])
+        if hasattr(dupefilter_cls, "from_crawler"):
+            dupefilter = dupefilter_cls.from_crawler(crawler)
+        else:
+            dupefilter = dupefilter_cls.from_settings(settings)
+
+        scheduler = cls(
+            get_redis(settings),
+            dupefilter,
+            claim_timeout=settings.getint("REDIS_SCHEDULER_CLAIM_TIMEOUT", 300),
+            flush_on_start=settings.getbool("REDIS_SCHEDULER_FLUSH_ON_START"),
+            stats=crawler.stats,
+        )
+        crawler.signals.connect(scheduler.request_done, signal=signals.request_left_downloader)
+        crawler.signals.connect(scheduler.request_done, signal=signals.request_dropped)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        key = self.key or redis_key(spider.settings, spider, "requests")
+        self.queue = RedisRequestQueue(self.server, key, self.consumer, self.claim_timeout)
+        result = self.df.open()
+        if self.flush_on_start:
+            self.queue.clear()
+            if isinstance(self.df, RedisDupeFilter):
+                self.df.clear()
+
+        self.heartbeat = task.LoopingCall(self.beat)
+        self.heartbeat.start(max(1, self.claim_timeout // 3))
+        return result
+
+    def close(self, reason):
+        if self.heartbeat is not None and self.heartbeat.running:
+            self.heartbeat.stop()
+        if reason != "finished":
+            self.queue.release()
+        self.queue.leave()
+        return self.df.close(reason)
+
+    def beat(self):
+        self.queue.heartbeat()
+        released = self.queue.recover()
+        if released:
+            self.spider.logger.info(f"Recovered {released} requests claimed by stopped instances")
+
+    def has_pending_requests(self):
+        return len(self) > 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def enqueue_request(self, request):
+        if not request.dont_filter and self.df.request_seen(request):
+            self.df.log(request, self.spider)
+            return False
+
+        self.queue.push(pickle.dumps(request_to_dict(request, self.spider), protocol=4))
+        self._inc_stats("scheduler/enqueued/redis")
+        return True
+
+    def next_request(self):
+        data = self.queue.pop()
+        if data is None:
+            return None
+
+        request = request_from_dict(pickle.loads(data), spider=self.spider)
+        self.claims[request] = data
+        self._inc_stats("scheduler/dequeued/redis")
+        return request
+
+    def request_done(self, request):
+        data = self.claims.pop(request, None)
+        if data is not None:
+            self.queue.ack(data)
+
+    def _inc_stats(self, key):
+        if self.stats:
+            self.stats.inc_value(key)
@@ -0,0 +1,122 @@
+"""
+Indexes of the crawler collections, and the check that the hot queries use them
+
+Apply and verify from the command line, against $MONGODB:
+
+    cd scrapy_project && python -m project.schema apply
+    cd scrapy_project && python -m project.schema verify
+"""
+import argparse
+import datetime
+import json
+import sys
+from logging import getLogger
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from .db import LeasedQueue, db
+
+logger = getLogger(__name__)
+
+PENDING = {"pending": True}
+
+INDEXES = {
+    "amazon_product": [
+        IndexModel([("asin", ASCENDING)], name="asin_unique", unique=True),
+        # Only pending documents are claimed, oldest first
+        IndexModel([("created_at", ASCENDING)], name="pending_created_at", partialFilterExpression=PENDING),
+        IndexModel([("lease_token", ASCENDING)], name="lease_token", sparse=True),
+    ],
+    "amazon_merchant_autonomous_todo_seller_id": [
+        IndexModel([("seller_id", ASCENDING)], name="seller_id_unique", unique=True),
+        IndexModel([("created_at", ASCENDING)], name="pending_created_at", partialFilterExpression=PENDING),
+        IndexModel([("lease_token", ASCENDING)], name="lease_token", sparse=True),
+    ],
+    "amazon_merchant": [
+        IndexModel([("seller_id", ASCENDING)], name="seller_id_unique", unique=True),
+    ],
+    "proxies": [
+        IndexModel([("token", ASCENDING)], name="token"),
+    ],
+}
+
+
+def hot_queries():
+    """``(collection, filter, sort)`` of the queries run per item, per request or per refill."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    todo_asins = LeasedQueue(None)
+    todo_seller_ids = LeasedQueue(None, match={"private_label": {"$exists": True}})
+    return [
+        ("amazon_product", todo_asins.claimable(now), todo_asins.sort),
+        ("amazon_product", {"asin": "B000000000"}, None),
+        ("amazon_product", {"lease_token": "0"}, [("created_at", ASCENDING)]),
+        ("amazon_merchant_autonomous_todo_seller_id", todo_seller_ids.claimable(now), todo_seller_ids.sort),
+        ("amazon_merchant_autonomous_todo_seller_id", {"seller_id": {"$in": ["A0000000000000"]}}, None),
+        ("amazon_merchant_autonomous_todo_seller_id", {"lease_token": "0"}, [("created_at", ASCENDING)]),
+        ("amazon_merchant", {"seller_id": {"$in": ["A0000000000000"]}}, None),
+        ("proxies", {"token": "0"}, None),
+    ]
+
+
+def ensure_indexes(database, indexes=INDEXES):
+    """Create the missing indexes; existing ones are left as they are.
+
+    Returns the names of the indexes that could not be created, e.g. a unique
+    index over duplicate keys, or one conflicting with an index of other options.
+    """
+    failed = []
+    for collection_name, models in indexes.items():
+        for model in models:
+            name = model.document["name"]
+            try:
+                database[collection_name].create_indexes([model])
+            except OperationFailure as e:
+                logger.error(f"@ensure_indexes: {collection_name}.{name} -- {e}")
+                failed.append(f"{collection_name}.{name}")
+    return failed
+
+
+def plan_stages(plan):
+    """Names of every stage of an explained query plan."""
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+def verify_indexes(database, queries=None):
+    """Explain the hot queries. Returns ``(collection, filter, stages)`` of those scanning their collection."""
+    scans = []
+    for collection_name, query, sort in queries or hot_queries():
+        cursor = database[collection_name].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            scans.append((collection_name, query, stages))
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["apply", "verify"])
+    args = parser.parse_args()
+
+    if args.command == "apply":
+        failed = ensure_indexes(db)
+        print(json.dumps({"failed": failed}, indent=2))
+    else:
+        scans = verify_indexes(db)
+        for collection_name, query, stages in scans:
+            print(f"{collection_name}: {query} -- {' < '.join(stages)}")
+        failed = scans
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,75 @@ NEWSPIDER_MODULE = "project.spiders"
 
 REDIS_HOST = "redis"
 
+# Optional shared frontier: with
+#   SCHEDULER = "project.redis_scheduler.RedisScheduler"
+#   DUPEFILTER_CLASS = "project.redis_scheduler.RedisDupeFilter"
+# every instance of a spider, on any scrapyd host, drains one Redis queue.
+# Requests claimed by an instance whose heartbeat is older than the claim
+# timeout (seconds) go back to the queue
+REDIS_SCHEDULER_KEY = "{spider}"
+REDIS_SCHEDULER_CLAIM_TIMEOUT = 300
+REDIS_SCHEDULER_FLUSH_ON_START = False
+
 # General Pipeline
 ITEM_PIPELINES = {
     "project.pipelines.ProgressPipeline": 300,
     "project.pipelines.MongoPipeline": 400,
 }
 
+# ProgressPipeline sends at most one progress message per interval (seconds)
+# or per number of items, and a final one on close
+PROGRESS_INTERVAL = 5
+PROGRESS_ITEMS = 1000
+
 RETRY_HTTP_CODES = [429, 503, 520]
 
 DB_HOST = ""
 DB_NAME = ""
 DB_USER = ""
 DB_PASSWORD = ""
+
+# Write-behind buffer used by AmazonMerchantAutonomousPipeline
+MONGO_BULK_WRITE_SIZE = 1000
+MONGO_BULK_WRITE_INTERVAL = 5
+
+# Pipelines and retry middleware run pymongo calls in a bounded thread pool
+MONGO_THREADPOOL_MAXSIZE = 10
+MONGO_MAX_PENDING = 100
+
+# The autonomous spider leases the pending ASINs and seller ids it schedules
+# for this many seconds; work still pending once its lease expires is claimed
+# again, by this or another crawl
+AUTONOMOUS_LEASE_DURATION = 3600
+
+# With the Frontier extension, a spider having a `refill` method fetches its
+# next batch of work once fewer requests than the low watermark are scheduled
+# or downloading (default: twice CONCURRENT_REQUESTS), checked every interval
+# (seconds)
+# FRONTIER_LOW_WATERMARK = 3000
+FRONTIER_CHECK_INTERVAL = 1
+
+# The MongoIndexes extension creates the indexes declared in project.schema
+# when a spider opens; `python -m project.schema verify` checks that the hot
+# queries use them
+MONGO_ENSURE_INDEXES = True
+
+# In-memory seller id membership used by AmazonMerchantAutonomousPipeline
+SELLER_CACHE_CAPACITY = 10_000_000
+SELLER_CACHE_ERROR_RATE = 0.001
+SELLER_CACHE_LRU_SIZE = 1_000_000
+
+# Sellers and seller inventory pipelines write rows to a spooled CSV as items
+# arrive, instead of building a DataFrame at close
+STREAMING_EXPORT_ENABLED = False
+STREAMING_EXPORT_MAX_MEMORY = 8 * 1024 * 1024
+
+# HTML backend of the extraction specs, "parsel" or "selectolax" (needs the
+# selectolax package)
+HTML_BACKEND = "parsel"
+
+# Spider callbacks parse pages in a pool of worker processes instead of the
+# reactor thread; PARSER_POOL_WORKERS = 0 starts one worker per core
+PARSER_POOL_ENABLED = False
+PARSER_POOL_WORKERS = 0
+PARSER_POOL_MAX_PENDING = 100
@@ -1,20 +1,18 @@
 """
 Scrape Amazon Sellers
 """
-import re
+import functools
 import urllib.parse as urlparse
 from urllib.parse import parse_qs
 
-import pymongo
 import scrapy
-from sellgo_core.utils.parser import (  # type: ignore
-    get_offers,
-    get_pinned_offer,
-)
+from scrapy.exceptions import DontCloseSpider
+from twisted.internet import defer
 
 from ..constants import AmazonMerchantAutoStats
-from ..db import db
+from ..db import LeasedQueue, db, get_mongo_pool
 from ..middlewares import get_retry_request
+from ..parsing import inventory_page, offer_listing
 from ..utils import get_url_from_proxycrawl, utc_datetime
 from .amazon_merchant import AmazonMerchantSpider
 
@@ -41,7 +39,11 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
         "CONCURRENT_REQUESTS_PER_DOMAIN": 1500,
         "CONCURRENT_ITEMS": 500,
         "DOWNLOAD_TIMEOUT": 600,
-        "EXTENSIONS": {"project.extensions.SentryLogging": -1},
+        "EXTENSIONS": {
+            "project.extensions.SentryLogging": -1,
+            "project.extensions.MongoIndexes": 0,
+            "project.extensions.Frontier": 500,
+        },
         # FIFO
         "DEPTH_PRIORITY": 1,
         "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleFifoDiskQueue",
@@ -53,6 +55,7 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
         "SPIDER_MIDDLEWARES": {"scrapy.spidermiddlewares.referer.RefererMiddleware": None},
     }
     done_scrape = False
+    refilling = False
 
     def __init__(self, _job, proxy, total_expected_len, data, *args, **kwargs):
         super().__init__(_job, proxy, total_expected_len, data, *args, **kwargs)
@@ -62,96 +65,120 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
         from_crawler = super(AmazonMerchantSpider, cls).from_crawler
         spider = from_crawler(crawler, *args, **kwargs)
         crawler.signals.connect(spider.idle, signal=scrapy.signals.spider_idle)  # type: ignore
+
+        # Work is leased, so parallel autonomous crawls never fetch the same ASIN or seller
+        duration = crawler.settings.getint("AUTONOMOUS_LEASE_DURATION", 3600)
+        spider.todo_asins = LeasedQueue(db["amazon_product"], duration=duration)
+        spider.todo_seller_ids = LeasedQueue(
+            db["amazon_merchant_autonomous_todo_seller_id"],
+            match={"private_label": {"$exists": True}},
+            owner=spider.todo_asins.owner,
+            duration=duration,
+        )
         return spider
 
     def idle(self):
-        if not self.done_scrape:
-            # todo_asin
-            collection = db["amazon_product"]
-            todo_asins = collection.aggregate(
-                [
-                    {
-                        "$match": {
-                            "$and": [{"pending": True}],
-                        }
-                    },
-                    {"$project": {"asin": 1, "created_at": 1}},
-                    {"$sort": {"created_at": 1}},
-                    {"$limit": 2000},
-                ],
-                allowDiskUse=True,
-            )
-            todo_asins = [(x["asin"], x.get("created_at")) for x in todo_asins]
-            self.logger.debug(f"@idle -- todo_asins: {todo_asins}")
-
-            collection = db["amazon_merchant_autonomous_todo_seller_id"]
-            todo_seller_ids = collection.aggregate(
-                [
-                    {
-                        "$match": {
-                            "$and": [
-                                {"pending": True},
-                                {"private_label": {"$exists": True}},
-                            ],
-                        }
-                    },
-                    {"$sort": {"created_at": pymongo.ASCENDING}},
-                    {"$limit": 5000},
-                ],
-                allowDiskUse=True,
-            )
-            requests = []
+        if self.done_scrape:
+            return
+
+        # Nothing is in flight: a refill finding no work ends the crawl
+        self.refill(idle=True)
+        raise DontCloseSpider
+
+    def refill(self, idle=False):
+        """Claim the next batch of todo work off the reactor thread and schedule it.
+        Called on `spider_idle`, and by the `Frontier` extension before the backlog runs dry.
+        Returns a Deferred; a call made while a refill is running does nothing.
+        """
+        if self.refilling:
+            return defer.succeed(None)
+        self.refilling = True
+
+        # Buffered writes must land first, otherwise done work still looks pending
+        bulk_writer = getattr(self, "bulk_writer", None)
+        d = bulk_writer.flush() if bulk_writer else defer.succeed(None)
+        d.addCallback(lambda _: get_mongo_pool(self.crawler).run(self.claim_todo))
+        d.addCallback(self.schedule_todo)
+        if idle:
+            d.addCallback(self._check_done)
+        d.addErrback(lambda failure: self.logger.error(f"@refill -- {failure.getErrorMessage()}"))
+        d.addBoth(self._refill_done)
+        return d
+
+    def _check_done(self, scheduled):
+        if not scheduled:
+            self.done_scrape = True
+
+    def _refill_done(self, _):
+        self.refilling = False
+
+    def claim_todo(self):
+        todo_asins, reclaimed_asins = self.todo_asins.claim(2000, {"asin": 1, "created_at": 1})
+        todo_asins = [(x["asin"], x.get("created_at")) for x in todo_asins]
+        self.logger.debug(f"@refill -- todo_asins: {todo_asins}")
+
+        todo_seller_ids, reclaimed_seller_ids = self.todo_seller_ids.claim(5000)
+        return todo_seller_ids, todo_asins, reclaimed_asins + reclaimed_seller_ids
+
+    def schedule_todo(self, todo):
+        """Schedule the requests of the claimed work. Returns how many."""
+        todo_seller_ids, todo_asins, reclaimed = todo
 
-            for seller in todo_seller_ids:
-                url = f"https://www.amazon.com/sp?seller={seller['seller_id']}"
-                request = self.build_request(
-                    url,
-                    # provider="proxycrawl_js",
-                    callback=self.parse_seller_data,
-                    cb_kwargs={"private_label": seller.get("private_label")},
-                    meta={
-                        "proxycrawl_js_enabled": True,
-                        "update_on_fail": {
-                            "collection": "amazon_merchant_autonomous_todo_seller_id",
-                            "key": "seller_id",
-                            "seller_id": seller.get("seller_id"),
-                            "update_values": {
-                                "pending": False,
-                                "last_scraped": utc_datetime().isoformat(),
-                            },
+        stats = self.crawler.stats
+        stats.inc_value(AmazonMerchantAutoStats.LEASED_COUNT, len(todo_asins) + len(todo_seller_ids))
+        stats.inc_value(AmazonMerchantAutoStats.LEASE_RECLAIMED_COUNT, reclaimed)
+
+        requests = []
+
+        for seller in todo_seller_ids:
+            url = f"https://www.amazon.com/sp?seller={seller['seller_id']}"
+            request = self.build_request(
+                url,
+                # provider="proxycrawl_js",
+                callback=self.parse_seller_data,
+                cb_kwargs={"private_label": seller.get("private_label")},
+                meta={
+                    "proxycrawl_js_enabled": True,
+                    "update_on_fail": {
+                        "collection": "amazon_merchant_autonomous_todo_seller_id",
+                        "key": "seller_id",
+                        "seller_id": seller.get("seller_id"),
+                        "update_values": {
+                            "pending": False,
+                            "last_scraped": utc_datetime().isoformat(),
                         },
-                        "page_name": "seller-about",
                     },
-                )
-                requests.append(request)
+                    "page_name": "seller-about",
+                },
+            )
+            requests.append(request)
 
-            for asin, _ in todo_asins:
-                # asin = record['asin']
-                url = f"https://www.amazon.com/gp/aod/ajax/?asin={asin}&pc=dp&isonlyrenderofferlist=false&pageno=1"
-                request = self.build_request(
-                    url,
-                    provider="proxycrawl",
-                    callback=self.parse_via_asin,
-                    meta={
-                        "update_on_fail": {
-                            "collection": "amazon_product",
-                            "key": "asin",
-                            "asin": asin,
-                            "update_values": {
-                                "pending": False,
-                                "last_scraped": utc_datetime(),
-                            },
+        for asin, _ in todo_asins:
+            # asin = record['asin']
+            url = f"https://www.amazon.com/gp/aod/ajax/?asin={asin}&pc=dp&isonlyrenderofferlist=false&pageno=1"
+            request = self.build_request(
+                url,
+                provider="proxycrawl",
+                callback=self.parse_via_asin,
+                meta={
+                    "update_on_fail": {
+                        "collection": "amazon_product",
+                        "key": "asin",
+                        "asin": asin,
+                        "update_values": {
+                            "pending": False,
+                            "last_scraped": utc_datetime(),
                         },
-                        "page_name": "offer-listing",
                     },
-                )
-                requests.append(request)
+                    "page_name": "offer-listing",
+                },
+            )
+            requests.append(request)
 
-            for request in requests:
-                self.crawler.engine.crawl(request, self)
+        for request in requests:
+            self.crawler.engine.crawl(request, self)
 
-            if not todo_asins and not todo_seller_ids:
-                self.done_scrape = True
+        return len(requests)
 
     def parse_via_asin(self, response, total_pages=1, total_offers=0, all_seller_ids=[]):
         url = response.request.url
@@ -172,8 +199,19 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
         asin = url_params["asin"]
         asin = asin[0] if asin else None
 
-        sellers = get_offers(asin, raw_html=response.body)
-        pinned_seller = get_pinned_offer(asin, response.body)
+        return self.parse_with(
+            response,
+            functools.partial(offer_listing, asin=asin),
+            self.handle_offer_listing,
+            url_params,
+            asin,
+            total_pages=total_pages,
+            total_offers=total_offers,
+            all_seller_ids=all_seller_ids,
+        )
+
+    def handle_offer_listing(self, response, page, url_params, asin, total_pages, total_offers, all_seller_ids):
+        sellers, pinned_seller, page_total_offers = page
 
         if not (sellers or pinned_seller):
             yield get_retry_request(
@@ -187,8 +225,7 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
         current_page_seller_ids = []
 
         if current_page == 1:
-            total_offers = response.css("#aod-total-offer-count").xpath("@value").get()
-            total_offers = int(total_offers) if total_offers else 0
+            total_offers = page_total_offers
 
             if pinned_seller and not pinned_seller.get("amazon_as_seller"):
                 self.logger.debug(f"@parse_via_asin -- asin: {asin}\npinned_seller: {pinned_seller}")
@@ -293,7 +330,12 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
             self.crawler.stats.inc_value(key)
             self.crawler.stats.inc_value(AmazonMerchantAutoStats.CRAWLERA_SUCCESS)
 
-        data = next(AmazonMerchantSpider.parse_inventory_info(self, response, **kwargs))
+        return self.parse_with(response, inventory_page, self.handle_inventory_page, **kwargs)
+
+    def handle_inventory_page(self, response, page, **kwargs):
+        inventory_data, (current_page, max_page_num, button_pages) = page
+
+        data = next(AmazonMerchantSpider.handle_inventory_info(self, response, inventory_data, **kwargs))
         data["yield_type"] = "from_parse_inventory_info"
         yield data
 
@@ -301,16 +343,6 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
         private_label = data["private_label"]
 
         # visit other pages
-        pages = response.xpath("//ul[@class='a-pagination']")
-        current_page = pages.xpath("//li[@class='a-selected']").css("::text").get()
-        current_page = int(current_page) if current_page else None
-
-        max_page_num = "".join(pages.xpath("//li[@class='a-disabled']").css("::text").extract())
-        max_page_num = re.sub(r"\D", "", max_page_num)
-
-        button_pages = pages.xpath("//li[@class='a-normal']").css("::text").extract()
-        button_pages = list(map(int, button_pages))
-
         if current_page == 1:
             for num_page in button_pages:
                 url = f"https://www.amazon.com/s?me={seller_id}&page={num_page}"
@@ -333,7 +365,7 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
                     )
 
     def parse_next_inventory_page(self, response, num_page, private_label=False):
-        asins = self.get_asins_from_inventory(response.body)
+        asins = self.get_asins_from_inventory(response)
         data = {
             "jobid": self._job,
             "project": self._project,
@@ -365,6 +397,10 @@ class AmazonMerchantAutonomousSpider(AmazonMerchantSpider):
         return super().parse_seller_data(response, *args, **kwargs)
 
     def closed(self, _):
+        # The pipeline flushed its writes before, leases still held are on unfinished work
+        for todo in (self.todo_asins, self.todo_seller_ids):
+            todo.release()
+
         stats = self.crawler.stats
         total_success_pages_200 = stats.get_value("downloader/response_status_count/200")
 
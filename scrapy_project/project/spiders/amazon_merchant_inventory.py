@@ -5,11 +5,33 @@ import re
 import urllib.parse as urlparse
 from urllib.parse import parse_qs
 
-import scrapy
+from sellgo_core.utils.extraction import (  # type:ignore
+    Field,
+    backend_for,
+    extract,
+    get_backend,
+)
+from sellgo_core.utils.parser import to_selector  # type:ignore
 
 from ..middlewares import get_retry_request
 from ..utils import BaseSpider
 
+PRODUCT_CSS = "div[class='a-section a-spacing-medium']"
+PRODUCT_SPEC = {
+    "is_fba": Field("i[class*='a-icon-prime']", "exists"),
+    "product_url": Field("a[class='a-link-normal a-text-normal']", "attr", "href"),
+    "product_name": Field("span[class='a-size-medium a-color-base a-text-normal']", "own"),
+    "current_price": Field("span[class='a-price']"),
+    "original_price": Field("span[class='a-price a-text-price']"),
+    "best_seller": Field("span[class='a-badge-text']", "exists", contains="Best Seller"),
+    "amazon_choice": Field("span[class='a-badge-text']", "exists", contains="Amazon Choice"),
+    "reviews_count": Field("div[class='a-section a-spacing-none a-spacing-top-micro'] span[class='a-size-base']"),
+    "review_stars": Field("a[class='a-popover-trigger a-declarative'] > i > span"),
+    "save_and_subscribe": Field("span", "exists", contains="Save more with Subscribe & Save"),
+    "variation": Field("span", "exists", contains="Price may vary by"),
+    "category": Field("a[class='a-size-base a-link-normal a-text-bold']"),
+}
+
 
 class AmazonMerchantInventorySpider(BaseSpider):
     name = "amazon_merchant_inventory"
@@ -33,7 +55,7 @@ class AmazonMerchantInventorySpider(BaseSpider):
         "CONCURRENT_REQUESTS": 32,
         "CONCURRENT_REQUESTS_PER_DOMAIN": 32,
         "DOWNLOAD_TIMEOUT": 600,
-        "EXTENSIONS": {"project.extensions.SentryLogging": -1},
+        "EXTENSIONS": {"project.extensions.SentryLogging": -1, "project.extensions.MongoIndexes": 0},
         # FIFO
         "DEPTH_PRIORITY": 1,
         "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleFifoDiskQueue",
@@ -62,48 +84,12 @@ class AmazonMerchantInventorySpider(BaseSpider):
             yield self.build_request(url)
 
     def get_product_data(self, product_raw):
-        selector = scrapy.Selector(text=product_raw)
-        is_fba = selector.xpath("//i[contains(@class, 'a-icon-prime')]").extract_first()
-
-        product_url = selector.xpath("//a[@class='a-link-normal a-text-normal']/@href").extract_first()
-
-        product_name = selector.xpath(
-            "//span[@class='a-size-medium a-color-base a-text-normal']/text()"
-        ).extract_first()
-
-        current_price = selector.xpath("//span[@class='a-price']").css("::text").extract_first()
-
-        original_price = selector.xpath("//span[@class='a-price a-text-price']").css("::text").extract_first()
-
-        best_seller = selector.xpath(
-            "//span[@class='a-badge-text' and contains(text(), 'Best Seller')]"
-        ).extract_first()
-        best_seller = True if best_seller else False
-
-        amazon_choice = selector.xpath(
-            "//span[@class='a-badge-text' and contains(text(), 'Amazon Choice')]"
-        ).extract_first()
-        amazon_choice = True if amazon_choice else False
-
-        reviews_count = (
-            selector.xpath(
-                "//div[@class='a-section a-spacing-none " "a-spacing-top-micro']//span[@class='a-size-base']"
-            )
-            .css("::text")
-            .extract_first()
-        )
-        review_stars = selector.xpath("//a[@class='a-popover-trigger a-declarative']/i/span").css("::text").get()
+        product = extract(PRODUCT_SPEC, product_raw, backend_for(product_raw))
+        is_fba = product["is_fba"]
+        product_url = product["product_url"]
+        review_stars = product["review_stars"]
         review_stars = float(review_stars[:-15]) if review_stars else None
-
-        save_and_subscribe = selector.xpath(
-            "//span[contains(text(), 'Save more with Subscribe & Save')]"
-        ).extract_first()
-        save_and_subscribe = True if save_and_subscribe else False
-
-        variation = selector.xpath("//span[contains(text(), 'Price may vary by')]").get()
-        variation = True if variation else False
-
-        category = selector.xpath("//a[@class='a-size-base a-link-normal a-text-bold']").css("::text").get()
+        category = product["category"]
         category = category.strip() if category else None
 
         # Get the ASIN from the URL
@@ -123,16 +109,16 @@ class AmazonMerchantInventorySpider(BaseSpider):
             "total_expected_len": self._total_expected_len,
             "scraped_items_len": self._total_yield,
             "asin": asin,
-            "product_name": product_name,
+            "product_name": product["product_name"],
             "product_url": product_url,
-            "current_price": current_price,
-            "original_price": original_price,
-            "best_seller": best_seller,
-            "amazon_choice": amazon_choice,
-            "reviews_count": reviews_count,
+            "current_price": product["current_price"],
+            "original_price": product["original_price"],
+            "best_seller": product["best_seller"],
+            "amazon_choice": product["amazon_choice"],
+            "reviews_count": product["reviews_count"],
             "review_stars": review_stars,
-            "save_and_subscribe": save_and_subscribe,
-            "variation": variation,
+            "save_and_subscribe": product["save_and_subscribe"],
+            "variation": product["variation"],
             "category": category,
             "marketplace_id": "ATVPDKIKX0DER",
         }
@@ -148,7 +134,7 @@ class AmazonMerchantInventorySpider(BaseSpider):
         return product_data
 
     def get_inventory_count(self, response_raw):
-        response = scrapy.Selector(text=response_raw)
+        response = to_selector(response_raw)
 
         ic = response.xpath("//span[@class='celwidget slot=UPPER template=RESULT_INFO_BAR widgetId=result-info-bar']")
         ic = ic.xpath("//span[contains(text(),'result')]").css("::text").get()
@@ -186,9 +172,9 @@ class AmazonMerchantInventorySpider(BaseSpider):
         return inventory_count
 
     @staticmethod
-    def get_products(response_raw):
-        response = scrapy.Selector(text=response_raw)
-        return response.xpath("//div[@class='a-section a-spacing-medium']").extract()
+    def get_products(response_raw, backend=None):
+        backend = backend or get_backend()
+        return backend.select(backend.parse(response_raw), PRODUCT_CSS)
 
     def parse(self, response):
         proxy_url = response.request.url
@@ -200,7 +186,7 @@ class AmazonMerchantInventorySpider(BaseSpider):
         url_params = urlparse.urlparse(url)
         url_params = parse_qs(url_params.query)
 
-        products = self.get_products(response.body)
+        products = self.get_products(response, self.html_backend)
 
         if not products:
             yield get_retry_request(
@@ -211,7 +197,7 @@ class AmazonMerchantInventorySpider(BaseSpider):
         seller_id = url_params["me"]
         seller_id = seller_id[0] if seller_id else None
 
-        inventory_count = self.get_inventory_count(response.body)
+        inventory_count = self.get_inventory_count(response)
 
         for product in products:
             product_data = self.get_product_data(product)
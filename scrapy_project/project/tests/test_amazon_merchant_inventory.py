@@ -1,8 +1,12 @@
+import importlib.util
 import pathlib
 
+import pytest
 from project.spiders.amazon_merchant_inventory import (
     AmazonMerchantInventorySpider,
 )
+from scrapy.http import HtmlResponse
+from sellgo_core.utils.extraction import get_backend  # type:ignore
 
 
 def test_get_inventory_count():
@@ -39,3 +43,38 @@ def test_get_product_data():
     assert product_data["asin"] == "B008CPQMNO"
     assert product_data["current_price"] == "$24.49"
     assert product_data["reviews_count"] == "117"
+
+
+def test_get_products_from_response():
+    path = pathlib.Path(__file__).parent.absolute()
+    f = open(f"{path}/fixtures/amazon_merchant_inventory_body.txt", "rb").read()
+    response = HtmlResponse(url="https://www.amazon.com/s?me=A1", body=f, encoding="utf-8")
+
+    assert AmazonMerchantInventorySpider.get_inventory_count(None, response) == (
+        AmazonMerchantInventorySpider.get_inventory_count(None, f)
+    )
+    products = AmazonMerchantInventorySpider.get_products(response)
+    assert len(products) == 16
+    assert products[0].root.getroottree().getroot() is response.selector.root
+
+
+@pytest.mark.skipif(importlib.util.find_spec("selectolax") is None, reason="selectolax is not installed")
+def test_get_product_data_backends():
+    class MockSelf:
+        _job = "test"
+        _project = "test"
+        _spider = "test"
+        _total_expected_len = 0
+        _total_yield = 1
+
+    path = pathlib.Path(__file__).parent.absolute()
+    f = open(f"{path}/fixtures/amazon_merchant_inventory_body.txt", "rb").read()
+
+    parsel_products = AmazonMerchantInventorySpider.get_products(f, get_backend("parsel"))
+    selectolax_products = AmazonMerchantInventorySpider.get_products(f, get_backend("selectolax"))
+    assert len(selectolax_products) == len(parsel_products) == 16
+
+    for parsel_product, selectolax_product in zip(parsel_products, selectolax_products):
+        assert AmazonMerchantInventorySpider.get_product_data(MockSelf, selectolax_product) == (
+            AmazonMerchantInventorySpider.get_product_data(MockSelf, parsel_product)
+        )
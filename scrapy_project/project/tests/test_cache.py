@@ -0,0 +1,34 @@
+from project.cache import BloomFilter, LRUSet, SellerIdCache
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    seller_ids = [f"A{i:012d}" for i in range(1000)]
+    for seller_id in seller_ids:
+        bloom.add(seller_id)
+
+    assert all(seller_id in bloom for seller_id in seller_ids)
+    false_positives = sum(f"B{i:012d}" in bloom for i in range(1000))
+    assert false_positives < 50
+
+
+def test_lru_set_evicts_least_recently_used():
+    recent = LRUSet(2)
+    recent.add("A")
+    recent.add("B")
+    assert "A" in recent
+    recent.add("C")
+
+    assert "A" in recent
+    assert "B" not in recent
+    assert len(recent) == 2
+
+
+def test_seller_id_cache_classify():
+    cache = SellerIdCache(capacity=1000, error_rate=0.001, lru_size=1)
+    cache.update(["KNOWN1", "KNOWN2"])
+
+    known, probable, new = cache.classify(["KNOWN2", "KNOWN1", "NEW", "NEW"])
+    assert known == ["KNOWN2"]
+    assert probable == ["KNOWN1"]
+    assert new == ["NEW"]
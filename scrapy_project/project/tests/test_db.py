@@ -0,0 +1,169 @@
+import datetime
+
+import mongomock
+from project.db import BulkWriter, LeasedQueue
+from pymongo import UpdateOne
+from pymongo.errors import AutoReconnect
+
+
+class MockCollection:
+    def __init__(self):
+        self.bulk_writes = []
+        self.errors = []
+
+    def bulk_write(self, operations, ordered=True):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.bulk_writes.append((operations, ordered))
+
+
+class MockDatabase(dict):
+    def __missing__(self, key):
+        self[key] = MockCollection()
+        return self[key]
+
+
+def test_bulk_writer_flush_on_size():
+    database = MockDatabase()
+    writer = BulkWriter(database, max_size=3)
+
+    writer.add("amazon_product", UpdateOne({"asin": "A"}, {"$set": {"pending": False}}))
+    writer.add("amazon_merchant", UpdateOne({"seller_id": "S"}, {"$set": {"pending": False}}))
+    assert len(writer) == 2
+    assert not database
+
+    writer.flush_if_full()
+    assert len(writer) == 2
+    assert not database
+
+    writer.add("amazon_product", UpdateOne({"asin": "B"}, {"$set": {"pending": False}}))
+    writer.flush_if_full()
+    assert len(writer) == 0
+
+    # One unordered round-trip per collection
+    assert len(database["amazon_product"].bulk_writes) == 1
+    operations, ordered = database["amazon_product"].bulk_writes[0]
+    assert len(operations) == 2
+    assert ordered is False
+    assert len(database["amazon_merchant"].bulk_writes) == 1
+
+
+def test_bulk_writer_stats(stats):
+    database = MockDatabase()
+    writer = BulkWriter(database, stats=stats)
+
+    writer.add("amazon_product", UpdateOne({"asin": "A"}, {"$set": {"pending": False}}))
+    writer.add("amazon_product", UpdateOne({"asin": "B"}, {"$set": {"pending": False}}))
+    writer.flush()
+
+    assert stats.values == {"mongo/bulk_write/count": 1, "mongo/bulk_write/operation_count": 2}
+
+
+def test_bulk_writer_requeues_on_transient_error(stats):
+    database = MockDatabase()
+    database["amazon_product"].errors = [AutoReconnect("primary stepped down")]
+    writer = BulkWriter(database, stats=stats)
+    first = [UpdateOne({"asin": asin}, {"$set": {"pending": False}}) for asin in "AB"]
+    for operation in first:
+        writer.add("amazon_product", operation)
+
+    writer.flush()
+    assert len(writer) == 2
+    assert not database["amazon_product"].bulk_writes
+    assert stats.values == {"mongo/bulk_write/retry_count": 1}
+
+    # Sent again with the next flush, ahead of what was added since
+    second = UpdateOne({"asin": "A"}, {"$set": {"pending": True}})
+    writer.add("amazon_product", second)
+    writer.flush()
+    assert len(writer) == 0
+    assert database["amazon_product"].bulk_writes == [(first + [second], False)]
+
+
+def test_bulk_writer_drops_on_other_errors(stats):
+    database = MockDatabase()
+    database["amazon_product"].errors = [ValueError("invalid operation")]
+    writer = BulkWriter(database, stats=stats)
+    writer.add("amazon_product", UpdateOne({"asin": "A"}, {"$set": {"pending": False}}))
+
+    writer.flush()
+    assert len(writer) == 0
+    assert stats.values == {"mongo/bulk_write/failed_count": 1}
+
+
+def test_bulk_writer_close(stats):
+    database = MockDatabase()
+    database["amazon_product"].errors = [AutoReconnect("no primary")] * 2
+    database["amazon_merchant"].errors = [AutoReconnect("no primary")] * 3
+    writer = BulkWriter(database, stats=stats)
+    writer.add("amazon_product", UpdateOne({"asin": "A"}, {"$set": {"pending": False}}))
+    writer.add("amazon_merchant", UpdateOne({"seller_id": "S"}, {"$set": {"pending": False}}))
+
+    writer.close(attempts=3)
+    assert len(writer) == 0
+    assert len(database["amazon_product"].bulk_writes) == 1
+    assert not database["amazon_merchant"].bulk_writes
+    assert stats.values["mongo/bulk_write/retry_count"] == 5
+    assert stats.values["mongo/bulk_write/lost_count"] == 1
+
+
+def test_bulk_writer_flush_empty():
+    database = MockDatabase()
+    writer = BulkWriter(database)
+    writer.flush()
+    assert not database
+
+
+def make_todo_collection(count):
+    collection = mongomock.MongoClient().db.amazon_product
+    created_at = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+    collection.insert_many(
+        {"asin": f"A{index}", "pending": True, "created_at": created_at + datetime.timedelta(minutes=index)}
+        for index in range(count)
+    )
+    return collection
+
+
+def test_leased_queue_claims_disjoint_batches():
+    collection = make_todo_collection(5)
+    first = LeasedQueue(collection, owner="first")
+    second = LeasedQueue(collection, owner="second")
+
+    documents, reclaimed = first.claim(3, {"asin": 1})
+    assert [doc["asin"] for doc in documents] == ["A0", "A1", "A2"]
+    assert reclaimed == 0
+
+    # Live leases are skipped
+    documents, _ = second.claim(3, {"asin": 1})
+    assert [doc["asin"] for doc in documents] == ["A3", "A4"]
+    assert second.claim(3) == ([], 0)
+
+    # Done work is never claimed again, and its lease is dropped
+    collection.update_one({"asin": "A0"}, LeasedQueue.done({"last_scraped": None}))
+    done = collection.find_one({"asin": "A0"})
+    assert done["pending"] is False
+    assert not set(LeasedQueue.LEASE_FIELDS) & set(done)
+
+    # Released leases are claimable at once
+    assert first.release() == 2
+    documents, reclaimed = second.claim(3, {"asin": 1})
+    assert [doc["asin"] for doc in documents] == ["A1", "A2"]
+    assert reclaimed == 0
+
+
+def test_leased_queue_reclaims_expired_leases():
+    collection = make_todo_collection(2)
+    crashed = LeasedQueue(collection, owner="crashed", duration=-1)
+    assert len(crashed.claim(2)[0]) == 2
+
+    documents, reclaimed = LeasedQueue(collection, owner="other").claim(2)
+    assert [doc["lease_owner"] for doc in documents] == ["other", "other"]
+    assert reclaimed == 2
+
+
+def test_leased_queue_match():
+    collection = make_todo_collection(2)
+    collection.update_one({"asin": "A0"}, {"$set": {"private_label": True}})
+
+    documents, _ = LeasedQueue(collection, match={"private_label": {"$exists": True}}).claim(5)
+    assert [doc["asin"] for doc in documents] == ["A0"]
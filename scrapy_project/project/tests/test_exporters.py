@@ -0,0 +1,48 @@
+import datetime
+import io
+
+import pandas as pd
+from project.exporters import StreamingCsvExporter, to_records
+
+ITEMS = [
+    {"asin": "A1", "seller_id": "S1", "brands": ["Acme", "Kason"], "created_at": datetime.datetime(2021, 3, 1, 12)},
+    {"asin": "A1", "seller_id": "S1", "brands": ["Other"], "created_at": datetime.datetime(2021, 3, 1, 13)},
+    {"asin": "A2", "seller_id": "S1", "brands": None, "created_at": datetime.datetime(2021, 3, 1, 14)},
+]
+FIELDS = ["asin", "seller_id", "brands", "created_at"]
+
+
+def test_streaming_csv_exporter_deduplicates_like_pandas():
+    exporter = StreamingCsvExporter(FIELDS, key=("asin", "seller_id"))
+    for item in ITEMS:
+        exporter.export_item(item)
+
+    df = pd.DataFrame(ITEMS)[FIELDS].drop_duplicates(["asin", "seller_id"], ignore_index=True)
+    df["created_at"] = df["created_at"].apply(datetime.datetime.isoformat)
+
+    assert len(exporter) == 2
+    assert exporter.fileobj().read().decode() == df.to_csv(None, index=False)
+    exporter.close()
+
+
+def test_streaming_csv_exporter_records():
+    exporter = StreamingCsvExporter(FIELDS, key=("seller_id",), keep_records=True)
+    for item in ITEMS:
+        exporter.export_item(item)
+
+    assert to_records(exporter) == [
+        {"asin": "A1", "seller_id": "S1", "brands": ["Acme", "Kason"], "created_at": "2021-03-01T12:00:00"}
+    ]
+    exporter.close()
+
+
+def test_streaming_csv_exporter_rolls_over_to_disk():
+    exporter = StreamingCsvExporter(FIELDS, max_memory=256)
+    for _ in range(100):
+        for item in ITEMS:
+            exporter.export_item(item)
+
+    assert len(exporter) == 300
+    assert not isinstance(exporter.fileobj()._file, io.BytesIO)
+    assert len(pd.read_csv(exporter.fileobj()).index) == 300
+    exporter.close()
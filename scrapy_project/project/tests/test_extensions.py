@@ -0,0 +1,66 @@
+import pytest
+from project.extensions import Frontier
+from scrapy.exceptions import NotConfigured
+
+
+class MockSpider:
+    done_scrape = False
+    refilling = False
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.refills = 0
+
+    def refill(self):
+        self.refills += 1
+        self.engine.slot.scheduler.extend(range(10))
+
+
+def make_frontier(make_crawler, **settings):
+    crawler = make_crawler(**dict({"CONCURRENT_REQUESTS": 2}, **settings))
+    frontier = Frontier.from_crawler(crawler)
+    frontier.spider = MockSpider(crawler.engine)
+    return frontier
+
+
+def test_frontier_refills_below_low_watermark(make_crawler):
+    frontier = make_frontier(make_crawler, FRONTIER_LOW_WATERMARK=5)
+    engine = frontier.crawler.engine
+    spider = frontier.spider
+
+    engine.slot.scheduler.extend(range(3))
+    engine.downloader.active.update(range(2))
+    frontier.check()
+    assert spider.refills == 0
+
+    # The backlog drains before the spider goes idle
+    engine.downloader.active.clear()
+    frontier.check()
+    assert spider.refills == 1
+    assert frontier.crawler.stats.values == {"frontier/refill_count": 1}
+
+    frontier.check()
+    assert spider.refills == 1
+
+
+def test_frontier_skips_running_and_done_spiders(make_crawler):
+    frontier = make_frontier(make_crawler)
+    assert frontier.low_watermark == 4
+
+    frontier.spider.refilling = True
+    frontier.check()
+    frontier.spider.refilling = False
+    frontier.spider.done_scrape = True
+    frontier.check()
+    assert frontier.spider.refills == 0
+
+    # Not open yet, or closed
+    frontier.spider.done_scrape = False
+    frontier.crawler.engine.slot = None
+    frontier.check()
+    assert frontier.spider.refills == 0
+
+
+def test_frontier_disabled(make_crawler):
+    with pytest.raises(NotConfigured):
+        Frontier.from_crawler(make_crawler(FRONTIER_LOW_WATERMARK=0))
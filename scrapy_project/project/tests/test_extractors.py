@@ -0,0 +1,60 @@
+import json
+import pathlib
+
+from project.extractors import seller_about_extractor
+from project.spiders.amazon_merchant import AmazonMerchantSpider
+
+URL = "https://www.amazon.com/sp?seller=A1ACMEOUTLET&asin=B008CPQMNO&isAmazonFulfilled=1&marketplaceID=ATVPDKIKX0DER"
+
+
+def read_fixture():
+    path = pathlib.Path(__file__).parent.absolute()
+    return open(f"{path}/fixtures/amazon_seller_about_body.html", "rb").read()
+
+
+def test_seller_about_extractor():
+    page = seller_about_extractor(read_fixture())
+
+    assert page["seller_name"] == "Acme Outlet"
+    assert page["business_name"] == "Acme Outlet LLC"
+    assert page["address"] == "1200 Market St Suite 400"
+    assert page["state"] == "Calif."
+    assert page["seller_rating"] == "4.6 "
+    assert page["review_ratings"] == "96"
+    assert page["positive_lifetime"] == "95"
+    assert page["negative_12_month"] == "3"
+    assert page["count_12_month"] == 1284
+    assert page["inventory_link"] == "https://www.amazon.com/s?me=A1ACMEOUTLET&marketplaceID=ATVPDKIKX0DER"
+
+
+def test_seller_about_extractor_reads_each_feedback_row():
+    feedback = seller_about_extractor(read_fixture())["feedback"]
+
+    assert [row["stars"] for row in feedback] == ["5 out of 5 stars", "2 out of 5 stars", "4 out of 5 stars"]
+    assert [row["comment_by"] for row in feedback][1] == "By Alex on September 28, 2020."
+    assert feedback[2]["comment"] == "Good seller."
+
+
+def test_seller_about_extractor_empty_page():
+    page = seller_about_extractor(b"")
+
+    assert page["seller_name"] is None
+    assert page["business_name"] is None
+    assert page["inventory_link"] == ""
+    assert page["feedback"] == []
+
+
+def test_get_seller_data():
+    class MockSelf:
+        us_states = [{"state": "Calif", "code": "CA"}]
+
+    data = AmazonMerchantSpider.get_seller_data(MockSelf, URL, read_fixture())
+
+    assert data["seller_id"] == "A1ACMEOUTLET"
+    assert data["asin"] == "B008CPQMNO"
+    assert data["state"] == "CA"
+    assert data["seller_rating"] == 4.6
+    assert data["positive_30_days"] == 97
+    assert data["count_lifetime"] == 5020
+    assert data["launched"] == ">1Y"
+    assert len(json.loads(data["feedback"])) == 3
@@ -0,0 +1,86 @@
+import functools
+import pathlib
+import pickle
+import time
+
+from project.parsing import (
+    ParserPool,
+    inventory_page,
+    offer_listing,
+    seller_about,
+)
+from project.utils import BaseSpider
+from scrapy.http import HtmlResponse
+from sellgo_core.utils.parser import parse_offer_listing  # type:ignore
+from twisted.internet import reactor
+
+FIXTURES = pathlib.Path(__file__).parent.absolute() / "fixtures"
+CORE_FIXTURES = pathlib.Path(__file__).parents[3] / "core" / "sellgo_core" / "utils" / "tests" / "test_parser"
+ASIN = "B008CPQMNO"
+
+
+def read_response(path, url="https://www.amazon.com/"):
+    return HtmlResponse(url, body=path.read_bytes(), encoding="utf-8")
+
+
+def test_inventory_page():
+    response = read_response(FIXTURES / "amazon_merchant_inventory_body.txt")
+    inventory_data, pagination = inventory_page(response)
+
+    assert len(inventory_data["asins"]) == 16
+    assert inventory_data["inventory_count"] == 279
+    assert pagination == (1, "18", [2, 3])
+
+    # the parser pool hands over the page text
+    assert inventory_page(response.text) == (inventory_data, pagination)
+
+
+def test_offer_listing():
+    response = read_response(CORE_FIXTURES / "aod_sellers_onepage.txt")
+    sellers, pinned_seller, total_offers = offer_listing(response, ASIN)
+
+    assert (sellers, pinned_seller) == parse_offer_listing(ASIN, response)
+    assert total_offers == int(response.css("#aod-total-offer-count").xpath("@value").get())
+    assert offer_listing(response.text, ASIN) == (sellers, pinned_seller, total_offers)
+
+
+def test_extract_functions_are_picklable():
+    extract = pickle.loads(pickle.dumps(functools.partial(offer_listing, asin=ASIN)))
+    assert extract.func is offer_listing
+    assert pickle.loads(pickle.dumps(seller_about)) is seller_about
+
+
+def test_parse_with_inline(base_spider, monkeypatch):
+    monkeypatch.setattr(BaseSpider, "parser_pool", None)
+    response = read_response(FIXTURES / "amazon_seller_about_body.html")
+
+    def handle(response, page, suffix):
+        yield page["seller_name"] + suffix
+
+    output = base_spider.parse_with(response, seller_about, handle, "!")
+    assert list(output) == ["Acme Outlet!"]
+
+
+def test_parse_with_parser_pool(base_spider, monkeypatch):
+    pool = ParserPool(max_workers=1, max_pending=2)
+    monkeypatch.setattr(BaseSpider, "parser_pool", pool)
+    # no reactor runs in the tests, deliver the results straight from the pool's thread
+    monkeypatch.setattr(reactor, "callFromThread", lambda func, *args: func(*args))
+    monkeypatch.setattr(reactor, "addSystemEventTrigger", lambda *args: None)
+    response = read_response(FIXTURES / "amazon_seller_about_body.html")
+
+    def handle(response, page):
+        yield page["seller_name"]
+        yield page["business_name"]
+
+    results = []
+    try:
+        d = base_spider.parse_with(response, seller_about, handle)
+        d.addBoth(results.append)
+        deadline = time.time() + 60
+        while not results and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        pool.stop()
+
+    assert results == [["Acme Outlet", "Acme Outlet LLC"]]
@@ -0,0 +1,72 @@
+from project.constants import Flag
+from project.pipelines import ProgressPipeline
+
+
+class MockProducer:
+    def __init__(self):
+        self.messages = []
+        self.flushed = []
+
+    def send(self, topic, value):
+        self.messages.append((topic, value))
+
+    def flush(self):
+        self.flushed.append(len(self.messages))
+
+
+class MockPipeline(ProgressPipeline):
+    def create_kafka_producer(self):
+        self.producer = MockProducer()
+
+
+class MockSpider:
+    _total_expected_len = 4
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+
+def make_item(index):
+    return {"jobid": "job", "project": "project", "spider": "spider", "scraped_items_len": index}
+
+
+def test_progress_pipeline_coalesces_messages(make_crawler):
+    spider = MockSpider(make_crawler(PROGRESS_ITEMS=3, PROGRESS_INTERVAL=60))
+    pipeline = MockPipeline()
+    pipeline.open_spider(spider)
+    producer = pipeline.producer
+
+    for index in range(1, 5):
+        assert pipeline.process_item(make_item(index), spider)["scraped_items_len"] == index
+
+    # One message per 3 items, with the latest state, never flushed per item
+    assert [(topic, value["scraped_items_len"]) for topic, value in producer.messages] == [("job-job", 3)]
+    assert producer.messages[0][1]["flag"] == Flag.MONITOR_PROGRESS
+    assert not producer.flushed
+
+    # The interval sends what came since, and nothing when nothing did
+    pipeline.emit()
+    pipeline.emit()
+    assert [value["scraped_items_len"] for _, value in producer.messages] == [3, 4]
+
+    pipeline.process_item(make_item(5), spider)
+    pipeline.close_spider(spider)
+    assert not pipeline.emit_loop.running
+
+    # The final message carries the same numbers as the last item, and is flushed
+    assert [value["scraped_items_len"] for _, value in producer.messages] == [3, 4, 5]
+    assert producer.flushed == [3]
+
+
+def test_progress_pipeline_without_expected_len(make_crawler):
+    spider = MockSpider(make_crawler())
+    spider._total_expected_len = 0
+    pipeline = MockPipeline()
+    pipeline.open_spider(spider)
+
+    pipeline.process_item(make_item(1), spider)
+    pipeline.close_spider(spider)
+
+    [(_, value)] = pipeline.producer.messages
+    assert value["flag"] == Flag.DONT_MONITOR_PROGRESS
+    assert value["total_expected_len"] == 0
@@ -0,0 +1,111 @@
+import fakeredis
+import pytest
+import scrapy
+from project.redis_scheduler import RedisDupeFilter, RedisScheduler
+from scrapy.utils.test import get_crawler
+
+
+class MockSpider(scrapy.Spider):
+    name = "redis_scheduler_test"
+
+    def parse_page(self, response, page):
+        pass
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeRedis()
+
+
+def open_scheduler(server, consumer, claim_timeout=300):
+    crawler = get_crawler(MockSpider, {"REDIS_HOST": "localhost"})
+    spider = MockSpider.from_crawler(crawler)
+    crawler.spider = spider
+
+    dupefilter = RedisDupeFilter(server, crawler=crawler)
+    scheduler = RedisScheduler(server, dupefilter, consumer=consumer, claim_timeout=claim_timeout)
+    scheduler.open(spider)
+    return scheduler
+
+
+def make_request(spider, page, **kwargs):
+    return scrapy.Request(
+        f"https://www.amazon.com/s?me=SELLER&page={page}",
+        callback=spider.parse_page,
+        cb_kwargs={"page": page},
+        meta={"page_name": "seller-inventory"},
+        **kwargs,
+    )
+
+
+def test_instances_drain_one_frontier(server):
+    first = open_scheduler(server, "host-a:1")
+    second = open_scheduler(server, "host-b:1")
+
+    for page in range(4):
+        assert first.enqueue_request(make_request(first.spider, page))
+    assert len(first) == len(second) == 4
+
+    # first in, first out, and each request is claimed by one instance only
+    requests = [first.next_request(), second.next_request(), second.next_request(), first.next_request()]
+    assert [request.cb_kwargs["page"] for request in requests] == [0, 1, 2, 3]
+    assert first.next_request() is None and second.next_request() is None
+    assert not first.has_pending_requests()
+
+    request = requests[1]
+    assert request.callback == second.spider.parse_page
+    assert request.meta["page_name"] == "seller-inventory"
+    assert server.llen("redis_scheduler_test:requests:claimed:host-b:1") == 2
+
+    second.request_done(request)
+    assert server.llen("redis_scheduler_test:requests:claimed:host-b:1") == 1
+
+    first.close("finished")
+    second.close("finished")
+
+
+def test_fingerprints_are_shared(server):
+    first = open_scheduler(server, "host-a:1")
+    second = open_scheduler(server, "host-b:1")
+
+    assert first.enqueue_request(make_request(first.spider, 1))
+    assert not second.enqueue_request(make_request(second.spider, 1))
+    assert second.enqueue_request(make_request(second.spider, 1, dont_filter=True))
+    assert len(first) == 2
+
+
+def test_claims_go_back_to_the_queue(server):
+    first = open_scheduler(server, "host-a:1")
+    second = open_scheduler(server, "host-b:1")
+    for page in range(3):
+        first.enqueue_request(make_request(first.spider, page))
+
+    # a stopped instance hands its claims back when it closes
+    first.next_request()
+    first.close("shutdown")
+    assert len(second) == 3
+
+    # the claims of a crashed instance are recovered once its heartbeat expires
+    crashed = open_scheduler(server, "host-c:1")
+    crashed.next_request()
+    crashed.next_request()
+    assert len(second) == 1
+    server.delete("redis_scheduler_test:requests:consumer:host-c:1")
+    second.beat()
+    assert len(second) == 3
+    assert sorted(second.next_request().cb_kwargs["page"] for _ in range(3)) == [0, 1, 2]
+
+
+def test_flush_on_start(server):
+    first = open_scheduler(server, "host-a:1")
+    first.enqueue_request(make_request(first.spider, 1))
+    first.close("finished")
+
+    crawler = get_crawler(MockSpider)
+    spider = MockSpider.from_crawler(crawler)
+    crawler.spider = spider
+    scheduler = RedisScheduler(server, RedisDupeFilter(server, crawler=crawler), flush_on_start=True)
+    scheduler.open(spider)
+
+    assert len(scheduler) == 0
+    assert scheduler.enqueue_request(make_request(spider, 1))
@@ -0,0 +1,75 @@
+import mongomock
+from project.schema import (
+    INDEXES,
+    ensure_indexes,
+    hot_queries,
+    plan_stages,
+    verify_indexes,
+)
+
+COLLSCAN_PLAN = {"stage": "LIMIT", "inputStage": {"stage": "COLLSCAN"}}
+IXSCAN_PLAN = {
+    "stage": "LIMIT",
+    "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "pending_created_at"}},
+}
+
+
+class MockCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def limit(self, _):
+        return self
+
+    def sort(self, _):
+        return self
+
+    def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+class MockCollection:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def find(self, query):
+        return MockCursor(self.plan)
+
+
+def test_ensure_indexes_idempotent():
+    database = mongomock.MongoClient().db
+    assert ensure_indexes(database) == []
+    assert ensure_indexes(database) == []
+
+    indexes = database["amazon_product"].index_information()
+    assert {"asin_unique", "pending_created_at", "lease_token"} <= set(indexes)
+    assert set(INDEXES) <= set(database.list_collection_names())
+
+
+def test_ensure_indexes_reports_failures():
+    database = mongomock.MongoClient().db
+    database["amazon_merchant"].insert_many([{"seller_id": "S"}, {"seller_id": "S"}])
+
+    # The other indexes are still created
+    assert ensure_indexes(database) == ["amazon_merchant.seller_id_unique"]
+    assert "seller_id_unique" in database["amazon_merchant_autonomous_todo_seller_id"].index_information()
+
+
+def test_plan_stages():
+    assert plan_stages(IXSCAN_PLAN) == ["LIMIT", "FETCH", "IXSCAN"]
+    assert plan_stages({"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, COLLSCAN_PLAN]}) == [
+        "OR",
+        "IXSCAN",
+        "LIMIT",
+        "COLLSCAN",
+    ]
+    # Slot based execution nests the plan
+    assert plan_stages({"queryPlan": IXSCAN_PLAN, "slotBasedPlan": {}}) == ["LIMIT", "FETCH", "IXSCAN"]
+
+
+def test_verify_indexes():
+    database = {"amazon_product": MockCollection(IXSCAN_PLAN), "proxies": MockCollection(COLLSCAN_PLAN)}
+    queries = [query for query in hot_queries() if query[0] in database]
+
+    scans = verify_indexes(database, queries)
+    assert scans == [("proxies", {"token": "0"}, ["LIMIT", "COLLSCAN"])]
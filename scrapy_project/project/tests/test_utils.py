@@ -1,4 +1,7 @@
+import pandas as pd
+import pytest
 from boto3.resources.base import ServiceResource
+from project.utils import get_s3_client
 
 
 def test_build_proxycrawl(base_spider):
@@ -35,3 +38,61 @@ def test_s3_create_client(s3):
 def test_s3_create_resource(s3):
     obj = s3.create_s3_resource()
     assert isinstance(obj, ServiceResource)
+
+
+@pytest.fixture
+def mock_s3(s3, monkeypatch):
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("MOTO_S3_CUSTOM_ENDPOINTS", "https://sfo2.digitaloceanspaces.com")
+
+    # The cached client has to be created while the mock is active
+    get_s3_client.cache_clear()
+    with moto.mock_aws():
+        s3.create_client().create_bucket(
+            Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": s3.bucket_region}
+        )
+        yield s3
+    get_s3_client.cache_clear()
+
+
+def test_s3_create_client_is_cached(s3):
+    assert s3.create_client() is s3.create_client()
+
+
+def test_s3_upload_dataframe_multipart(mock_s3):
+    mock_s3.multipart_part_size = 5 * 1024 * 1024
+    df = pd.DataFrame({"asin": [f"B{i:09d}" for i in range(300_000)], "seller_id": "A1ACMEOUTLET"})
+
+    mock_s3.upload_dataframe_to_s3(df, "sellers.csv", "test-bucket")
+
+    body = mock_s3.create_client().get_object(Bucket="test-bucket", Key="sellers.csv")["Body"].read()
+    assert len(body) > mock_s3.multipart_part_size
+    assert body.decode() == df.to_csv(None, index=False)
+
+
+def test_s3_upload_rows(mock_s3):
+    rows = ({"asin": f"B{i:09d}", "seller_id": "A1", "brands": None} for i in range(3))
+
+    mock_s3.upload_rows_to_s3(rows, ["asin", "seller_id"], "inventory.csv", "test-bucket")
+
+    body = mock_s3.create_client().get_object(Bucket="test-bucket", Key="inventory.csv")["Body"].read()
+    assert body.decode() == "asin,seller_id\nB000000000,A1\nB000000001,A1\nB000000002,A1\n"
+
+
+def test_s3_upload_aborted_on_error(mock_s3):
+    mock_s3.multipart_part_size = 5 * 1024 * 1024
+    client = mock_s3.create_client()
+
+    with pytest.raises(RuntimeError):
+        with mock_s3.open_s3_stream("broken.csv", "test-bucket") as f:
+            f.write("x" * (6 * 1024 * 1024))
+            raise RuntimeError("scrape failed")
+
+    assert "Contents" not in client.list_objects_v2(Bucket="test-bucket")
+    assert "Uploads" not in client.list_multipart_uploads(Bucket="test-bucket")
+
+
+def test_s3_presigned_url(s3):
+    url = s3.presigned_url("sellers.csv", "test-bucket", expires_in=60)
+    assert url.startswith("https://sfo2.digitaloceanspaces.com/test-bucket/sellers.csv?")
+    assert "X-Amz-Expires=60" in url
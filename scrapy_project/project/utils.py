@@ -1,15 +1,113 @@
+import contextlib
+import csv
 import datetime
+import functools
+import io
 import json
 import os
 import urllib.parse as urlparse
 from urllib.parse import parse_qs, quote, unquote
 
 import boto3  # type: ignore
-import s3fs
 import scrapy
 
+from .exporters import StreamingCsvExporter
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3_client(bucket_region, access_key, secret_key):
+    """One boto3 client, with its connection pool, per process and configuration.
+    boto3 clients are thread-safe, so every pipeline and thread can share it.
+    """
+    session = boto3.Session()
+    return session.client(
+        "s3",
+        region_name=bucket_region,
+        endpoint_url=f"https://{bucket_region}.digitaloceanspaces.com",
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+    )
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """Binary stream uploading what is written to it as an S3 multipart upload.
+
+    At most one part of `part_size` bytes is buffered. An object that never fills a
+    part is sent with a single `put_object`; after `abort` nothing is uploaded.
+    """
+
+    def __init__(self, client, bucket_name, key, part_size):
+        super().__init__()
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.part_size = part_size
+
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.aborted = False
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        if self.aborted:
+            return len(b)
+
+        self.buffer += b
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[: self.part_size]))
+            del self.buffer[: self.part_size]
+        return len(b)
+
+    def _upload_part(self, body):
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket_name, Key=self.key)
+            self.upload_id = response["UploadId"]
+
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id, PartNumber=part_number, Body=body
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def abort(self):
+        self.aborted = True
+        self.buffer.clear()
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id)
+
+    def close(self):
+        if self.closed:
+            return
+
+        try:
+            if self.aborted:
+                pass
+            elif self.upload_id is None:
+                self.client.put_object(Bucket=self.bucket_name, Key=self.key, Body=bytes(self.buffer))
+            else:
+                if self.buffer:
+                    self._upload_part(bytes(self.buffer))
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    MultipartUpload={"Parts": self.parts},
+                )
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.buffer.clear()
+            super().close()
+
 
 class S3:
+    # S3 needs every part but the last to be at least 5 MiB
+    multipart_part_size = 8 * 1024 * 1024
+
     def __init__(self):
         self.bucket_region = os.getenv("BUCKET_REGION")
 
@@ -18,13 +116,14 @@ class S3:
         self.secret_key = os.getenv("BUCKET_SECRET_KEY")
 
     def create_client(self):
-        session = boto3.Session()
-        return session.client(
-            "s3",
-            region_name=self.bucket_region,
-            endpoint_url=f"https://{self.bucket_region}.digitaloceanspaces.com",
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
+        return get_s3_client(self.bucket_region, self.access_key, self.secret_key)
+
+    def presigned_url(self, filename, bucket_name, expires_in=3600):
+        # Signed locally with the cached client's credentials, no request is sent
+        return self.create_client().generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": bucket_name, "Key": filename},
+            ExpiresIn=expires_in,
         )
 
     def create_s3_resource(self):
@@ -37,18 +136,43 @@ class S3:
         )
         return s3
 
+    @contextlib.contextmanager
+    def open_s3_stream(self, filename, bucket_name):
+        """Text stream into `bucket_name/filename`, uploaded part by part while written.
+        The object is complete when the block exits and discarded if it raises.
+        """
+        raw = S3MultipartWriter(self.create_client(), bucket_name, filename, self.multipart_part_size)
+        stream = io.TextIOWrapper(io.BufferedWriter(raw), encoding="utf-8", newline="")
+        try:
+            yield stream
+        except BaseException:
+            raw.abort()
+            raise
+        finally:
+            stream.close()
+
     def upload_dataframe_to_s3(self, df, filename, bucket_name):
 
         # Can't uses .to_excel() due to some unknown errors
-        bytes_to_write = df.to_csv(None, index=False).encode()
-        fs = s3fs.S3FileSystem(
-            key=self.access_key,
-            secret=self.secret_key,
-            client_kwargs={"endpoint_url": f"https://{self.bucket_region}.digitaloceanspaces.com"},
-        )
+        with self.open_s3_stream(filename, bucket_name) as f:
+            df.to_csv(f, index=False)
+
+    def upload_rows_to_s3(self, rows, fields, filename, bucket_name):
+        """Upload an iterable of dict rows as CSV with the `fields` columns."""
+        with self.open_s3_stream(filename, bucket_name) as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore", lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def upload_fileobj_to_s3(self, fileobj, filename, bucket_name):
+        # boto3 reads the file in chunks and switches to a multipart upload for large files
+        self.create_client().upload_fileobj(fileobj, bucket_name, filename)
 
-        with fs.open(f"{bucket_name}/{filename}", "wb") as f:
-            f.write(bytes_to_write)
+    def upload_output_to_s3(self, output, filename, bucket_name):
+        if isinstance(output, StreamingCsvExporter):
+            self.upload_fileobj_to_s3(output.fileobj(), filename, bucket_name)
+        else:
+            self.upload_dataframe_to_s3(output, filename, bucket_name)
 
 
 def get_url_from_proxycrawl(url):
@@ -87,6 +211,34 @@ class BaseSpider(scrapy.Spider):
 
         super().__init__(*args, **kwargs)
 
+    @property
+    def html_backend(self):
+        from sellgo_core.utils.extraction import get_backend  # type:ignore
+
+        return get_backend(self.settings.get("HTML_BACKEND"))
+
+    @property
+    def parser_pool(self):
+        # project.parsing needs sellgo_core, imported only by the spiders that parse with it
+        from .parsing import get_parser_pool
+
+        return get_parser_pool(self.crawler)
+
+    def parse_with(self, response, extract, handle, *args, **kwargs):
+        """Callback output of ``handle(response, extract(response), *args, **kwargs)``.
+
+        With PARSER_POOL_ENABLED, `extract` runs on the page text in the parser
+        pool and the output comes back as a Deferred of a list; `extract` must then
+        be a picklable function of `project.parsing`, or a partial of one.
+        """
+        pool = self.parser_pool
+        if pool is None:
+            return handle(response, extract(response), *args, **kwargs)
+
+        d = pool.run(extract, response.text)
+        d.addCallback(lambda extracted: list(handle(response, extracted, *args, **kwargs)))
+        return d
+
     def build_request(self, url, provider="crawlera", crawlera_endpoint="proxy.crawlera.com:8010", **kwargs):
         proxy_auth = f"{self.proxy_credentials['crawlera']}:"
         crawlera_auth = f"http://{proxy_auth}@{crawlera_endpoint}"